@@ -0,0 +1,80 @@
+"""
+محرك التنبيهات: يُقيَّم مع كل شمعة 1m جديدة ويعيد نصوص تنبيه لإرسالها للمشتركين.
+- انقلاب الانحياز في compute_setup (صاعد/هابط/محايد).
+- إصابة الأهداف T1..T3 أو الوقف لخطة فُتحت عند آخر انقلاب إلى صاعد/هابط.
+- كسر مستويات القمم/القيعان (swing_levels) بين إغلاقين متتاليين.
+"""
+import time
+import pandas as pd
+
+from config import CFG
+from indicators import swing_levels
+
+class AlertEngine:
+    def __init__(self, level_lookback: int = 200, level_cooldown: float = 1800.0):
+        self.level_lookback = level_lookback
+        self.level_cooldown = level_cooldown
+        self.last_bar = None
+        self.bias = None
+        self.plan = None         # {"dir": +1/-1, "entry", "targets", "stop", "hit": set()}
+        self._broken = {}        # مستوى مقرّب -> وقت آخر تنبيه كسر
+
+    def _arm(self, st: dict, direction: int):
+        price = st["price"]
+        risk = CFG["RISK"]
+        # الخطة الهابطة مرآة للصاعدة: أهداف أسفل السعر ووقف فوقه
+        targets = [price * (1 + direction * risk[k]) for k in ("t1", "t2", "t3")]
+        stop = price * (1 - direction * risk["stop"])
+        self.plan = {"dir": direction, "entry": price, "targets": targets, "stop": stop, "hit": set()}
+
+    def evaluate(self, df_1m: pd.DataFrame, st: dict) -> list:
+        """يعيد قائمة نصوص التنبيه — فارغة إن لم تُغلق شمعة جديدة منذ آخر تقييم."""
+        if not st or df_1m is None or len(df_1m) < 3:
+            return []
+        bar = df_1m.index[-2]  # آخر شمعة مكتملة
+        if bar == self.last_bar:
+            return []
+        first = self.last_bar is None
+        self.last_bar = bar
+        close = df_1m["Close"]
+        prev, cur = float(close.iloc[-3]), float(close.iloc[-2])
+        out = []
+
+        if self.bias is not None and st["bias"] != self.bias:
+            out.append(f"🔔 تغيّر الانحياز: {self.bias} ← {st['bias']} عند {st['price']:.2f}")
+            if st["bias"] == "صاعد":
+                self._arm(st, +1)
+            elif st["bias"] == "هابط":
+                self._arm(st, -1)
+            else:
+                self.plan = None
+        self.bias = st["bias"]
+
+        p = self.plan
+        if p and not first:
+            d = p["dir"]
+            for i, tg in enumerate(p["targets"], start=1):
+                if i not in p["hit"] and d * (cur - tg) >= 0:
+                    p["hit"].add(i)
+                    out.append(f"🎯 تحقق الهدف T{i}: {tg:.2f} (دخول {p['entry']:.2f})")
+            if d * (cur - p["stop"]) <= 0:
+                out.append(f"🛡 ضُرب وقف الخسارة: {p['stop']:.2f} (دخول {p['entry']:.2f})")
+                self.plan = None
+            elif len(p["hit"]) == len(p["targets"]):
+                self.plan = None
+
+        if not first:
+            now = time.time()
+            history = close.iloc[:-2].tail(self.level_lookback)
+            for _, lvl in swing_levels(history, lookback=len(history)):
+                key = round(lvl, 2)
+                if now - self._broken.get(key, 0.0) < self.level_cooldown:
+                    continue
+                if prev <= lvl < cur:
+                    out.append(f"⬆️ اختراق مستوى {lvl:.2f} (الإغلاق {cur:.2f})")
+                elif prev >= lvl > cur:
+                    out.append(f"⬇️ كسر مستوى {lvl:.2f} (الإغلاق {cur:.2f})")
+                else:
+                    continue
+                self._broken[key] = now
+        return out
@@ -0,0 +1,191 @@
+"""
+اختبار تاريخي متجه لإشارة compute_setup على شموع 1m المخزنة (BAR_STORE أو CSV).
+- الانحياز لكل شمعة: MACD فوق/تحت الإشارة مع RSI أعلى من rsi_bull / أدنى من rsi_bear.
+- الدخول عند كل انقلاب إلى صاعد/هابط (كما في AlertEngine)، بسعر إغلاق شمعة الإشارة.
+- الخطة: أهداف T1..T3 ووقف بنسب RISK (مرآة للهابط)، تخرج ثلث الصفقة عند كل هدف.
+  تنتهي الخطة بالوقف، أو بالانقلاب التالي، أو بنهاية الجلسة (الباقي بسعر الإغلاق).
+  إن لُمس الوقف وهدف في الشمعة نفسها يُعتبر الوقف أولاً (تقدير متحفظ).
+- أول لمس لكل مستوى = بحث ثنائي على القمة/القاع التراكمي بعد الدخول، لكل مستويات الشبكة دفعة واحدة.
+- الأيام تُوزع على مجمع عمليات، والنتائج تُجمع لكل مجموعة معاملات.
+
+    python backtest.py --symbol ^GSPC --days 120 --t1 0.003,0.005 --stop 0.005,0.01 \
+        --rsi-bull 55,60 --rsi-bear 45,40 --workers 4 --out bt.json
+"""
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from config import CFG
+from indicators import macd, rsi
+
+_MIN_BARS = 50  # نفس حد compute_setup
+_STATS = ("trades", "hit_t1", "hit_t2", "hit_t3", "stops", "wins", "ret_sum", "ret_sq")
+
+def load_bars(symbol: str = None, days: int = None, csv: str = None) -> pd.DataFrame:
+    if csv:
+        df = pd.read_csv(csv, index_col=0)
+        df.index = pd.to_datetime(df.index, utc=True)
+    else:
+        from bar_store import BAR_STORE
+        df = BAR_STORE.frame(symbol or CFG["SYMBOL_INDEX"], "1m")
+    df = df.dropna(subset=["Close"])
+    if days:
+        ny = df.index.tz_convert("America/New_York").normalize()
+        keep = np.unique(ny)[-days:]
+        df = df[ny.isin(keep)]
+    return df
+
+def prepare_days(df: pd.DataFrame) -> list:
+    """يحسب RSI/MACD مرة واحدة على السلسلة كاملة ثم يقسمها إلى أيام تداول (بتوقيت نيويورك)."""
+    close = df["Close"]
+    m, s, _ = macd(close)
+    arrays = {
+        "high": df["High"].to_numpy(dtype=float),
+        "low": df["Low"].to_numpy(dtype=float),
+        "close": close.to_numpy(dtype=float),
+        "rsi": rsi(close).to_numpy(dtype=float),
+        "trend": np.sign((m - s).to_numpy(dtype=float)),
+    }
+    day = df.index.tz_convert("America/New_York").normalize().asi8
+    bounds = np.flatnonzero(np.r_[True, day[1:] != day[:-1], True])
+    out = []
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        a = max(a, _MIN_BARS)  # تسخين المؤشرات
+        if b - a >= 2:
+            out.append({k: v[a:b] for k, v in arrays.items()})
+    return out
+
+def _entries(day: dict, bull: float, bear: float):
+    bias = np.where((day["trend"] > 0) & (day["rsi"] > bull), 1,
+                    np.where((day["trend"] < 0) & (day["rsi"] < bear), -1, 0))
+    change = np.flatnonzero(bias[1:] != bias[:-1]) + 1
+    # نهاية كل خطة = الانقلاب التالي أو آخر شمعة في اليوم
+    ends = np.r_[change[1:], len(bias) - 1]
+    entry = bias[change] != 0
+    return change[entry], ends[entry], bias[change][entry]
+
+def _first_touch(path_max: np.ndarray, levels: np.ndarray) -> np.ndarray:
+    """أول موضع يبلغ فيه الحد التراكمي (غير المتناقص) كل مستوى؛ len(path) إن لم يبلغه."""
+    return np.searchsorted(path_max, levels, side="left")
+
+def run_day(day: dict, rsi_grid: list, risk: np.ndarray) -> np.ndarray:
+    """
+    risk: مصفوفة (R, 4) أعمدتها t1, t2, t3, stop.
+    يعيد مصفوفة (len(rsi_grid), R, len(_STATS)) بمجاميع اليوم.
+    """
+    out = np.zeros((len(rsi_grid), len(risk), len(_STATS)))
+    high, low, close = day["high"], day["low"], day["close"]
+    for g, (bull, bear) in enumerate(rsi_grid):
+        starts, ends, dirs = _entries(day, bull, bear)
+        for i, end, d in zip(starts, ends, dirs):
+            if end <= i:
+                continue
+            entry = close[i]
+            hi = np.maximum.accumulate(high[i + 1:end + 1])
+            lo = np.minimum.accumulate(low[i + 1:end + 1])
+            n = len(hi)
+            up = 1 + risk[:, :3]
+            dn = 1 - risk[:, :3]
+            if d > 0:
+                hit_idx = _first_touch(hi, (entry * up).ravel()).reshape(-1, 3)
+                stop_idx = _first_touch(-lo, -(entry * (1 - risk[:, 3])))
+            else:
+                hit_idx = _first_touch(-lo, -(entry * dn).ravel()).reshape(-1, 3)
+                stop_idx = _first_touch(hi, entry * (1 + risk[:, 3]))
+            stopped = stop_idx < n
+            hit = hit_idx < stop_idx[:, None]
+            k = hit.sum(axis=1)
+            rest = np.where(stopped, -risk[:, 3], d * (close[end] / entry - 1))
+            ret = (hit * risk[:, :3]).sum(axis=1) / 3 + (3 - k) / 3 * rest
+            acc = out[g]
+            acc[:, 0] += 1
+            acc[:, 1:4] += hit
+            acc[:, 4] += stopped & (k < 3)
+            acc[:, 5] += ret > 0
+            acc[:, 6] += ret
+            acc[:, 7] += ret * ret
+    return out
+
+def _run_chunk(args):
+    days, rsi_grid, risk = args
+    total = np.zeros((len(rsi_grid), len(risk), len(_STATS)))
+    for day in days:
+        total += run_day(day, rsi_grid, risk)
+    return total
+
+def sweep(days: list, rsi_grid: list, risk_grid: list, workers: int = None) -> list:
+    """يعيد قائمة نتائج لكل (rsi_bull, rsi_bear, t1, t2, t3, stop) مرتبة حسب التوقع تنازلياً."""
+    risk = np.asarray(risk_grid, dtype=float).reshape(-1, 4)
+    workers = os.cpu_count() if workers is None else workers
+    if workers and len(days) > 1:
+        n = min(workers, len(days))
+        chunks = [(days[i::n], rsi_grid, risk) for i in range(n)]
+        with ProcessPoolExecutor(max_workers=n) as pool:
+            total = sum(pool.map(_run_chunk, chunks))
+    else:
+        total = _run_chunk((days, rsi_grid, risk))
+
+    results = []
+    for g, (bull, bear) in enumerate(rsi_grid):
+        for r, (t1, t2, t3, stop) in enumerate(risk):
+            s = dict(zip(_STATS, total[g, r]))
+            n = s["trades"]
+            mean = s["ret_sum"] / n if n else 0.0
+            results.append({
+                "rsi_bull": bull, "rsi_bear": bear,
+                "t1": float(t1), "t2": float(t2), "t3": float(t3), "stop": float(stop),
+                "trades": int(n),
+                "hit_t1": s["hit_t1"] / n if n else 0.0,
+                "hit_t2": s["hit_t2"] / n if n else 0.0,
+                "hit_t3": s["hit_t3"] / n if n else 0.0,
+                "stop_rate": s["stops"] / n if n else 0.0,
+                "win_rate": s["wins"] / n if n else 0.0,
+                # متوسط العائد لكل صفقة (نسبة من سعر الدخول) وانحرافه المعياري
+                "expectancy_pct": mean * 100,
+                "std_pct": np.sqrt(max(s["ret_sq"] / n - mean * mean, 0.0)) * 100 if n else 0.0,
+            })
+    results.sort(key=lambda x: x["expectancy_pct"], reverse=True)
+    return results
+
+def _floats(text: str, default: float) -> list:
+    return [float(x) for x in text.split(",")] if text else [default]
+
+def main(argv=None):
+    risk, sig = CFG["RISK"], CFG["SIGNAL"]
+    ap = argparse.ArgumentParser(description="vectorized backtest of the compute_setup signal")
+    ap.add_argument("--symbol", default=CFG["SYMBOL_INDEX"])
+    ap.add_argument("--csv", help="ملف CSV لشموع 1m بدل BAR_STORE")
+    ap.add_argument("--days", type=int, help="آخر N يوم تداول فقط")
+    for name in ("t1", "t2", "t3", "stop"):
+        ap.add_argument(f"--{name}", default="", help=f"قيم مفصولة بفواصل (الافتراضي {risk[name]})")
+    ap.add_argument("--rsi-bull", default="", help=f"الافتراضي {sig['rsi_bull']}")
+    ap.add_argument("--rsi-bear", default="", help=f"الافتراضي {sig['rsi_bear']}")
+    ap.add_argument("--workers", type=int, default=None, help="0 = داخل العملية")
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--out", help="ملف JSON لكل النتائج")
+    args = ap.parse_args(argv)
+
+    df = load_bars(args.symbol, args.days, args.csv)
+    days = prepare_days(df)
+    if not days:
+        raise SystemExit("لا توجد شموع كافية — شغّل البوت لتعبئة BAR_STORE أو مرّر --csv")
+    rsi_grid = list(itertools.product(_floats(args.rsi_bull, sig["rsi_bull"]), _floats(args.rsi_bear, sig["rsi_bear"])))
+    risk_grid = [c for c in itertools.product(*(_floats(getattr(args, k), risk[k]) for k in ("t1", "t2", "t3", "stop")))
+                 if c[0] <= c[1] <= c[2]]
+    results = sweep(days, rsi_grid, risk_grid, args.workers)
+
+    print(f"{len(days)} days, {len(results)} parameter sets")
+    for r in results[:args.top]:
+        print(f"rsi {r['rsi_bull']:g}/{r['rsi_bear']:g} t {r['t1']:g}/{r['t2']:g}/{r['t3']:g} stop {r['stop']:g}: "
+              f"n={r['trades']} T1={r['hit_t1']:.0%} T2={r['hit_t2']:.0%} T3={r['hit_t3']:.0%} "
+              f"SL={r['stop_rate']:.0%} E={r['expectancy_pct']:+.3f}%")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+مخزن شموع محلي دائم لكل رمز/فريم بصيغة عمودية (append-only).
+
+كل عمود ملف ثنائي خام داخل DATA_DIR/bars/<symbol>_<interval>/:
+    ts.i8      الطابع الزمني (نانوثانية UTC)
+    open.f8 / high.f8 / low.f8 / close.f8 / volume.f8
+
+- الكتابة إلحاق فقط: نضيف الشموع الأحدث من آخر طابع مخزّن، والشمعة الأخيرة
+  (غير المكتملة عادةً) تُستبدل في مكانها عند وصول نسخة أحدث منها.
+- القراءة عبر np.memmap: الإطار الناتج يشير إلى الملفات مباشرة دون نسخ.
+- الملفات لا تُقصّ أثناء التشغيل (تجنّباً لـ SIGBUS مع memmap مفتوح)؛ الإصلاح
+  بعد انقطاع الكتابة يتم مرة واحدة عند أول فتح للمجلد.
+"""
+import os
+import re
+import threading
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+from config import CFG
+
+COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+_FILES = {
+    "ts": "ts.i8",
+    "Open": "open.f8", "High": "high.f8", "Low": "low.f8",
+    "Close": "close.f8", "Volume": "volume.f8",
+}
+_ITEM = 8  # int64/float64
+
+def _safe(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+class BarStore:
+    def __init__(self, root: str = None):
+        self.root = root or os.path.join(CFG["DATA_DIR"], "bars")
+        self._lock = threading.Lock()
+        self._checked = set()
+
+    def _dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, f"{_safe(symbol)}_{_safe(interval)}")
+
+    def _path(self, d: str, col: str) -> str:
+        return os.path.join(d, _FILES[col])
+
+    def _len(self, d: str) -> int:
+        if d not in self._checked:
+            self._repair(d)
+        try:
+            return os.path.getsize(self._path(d, "ts")) // _ITEM
+        except FileNotFoundError:
+            return 0
+
+    def _repair(self, d: str):
+        # كتابة منقطعة قد تترك أعمدة بأطوال مختلفة: نقصّها لأقصر طول مشترك
+        sizes = []
+        for col in _FILES:
+            p = self._path(d, col)
+            sizes.append(os.path.getsize(p) // _ITEM if os.path.exists(p) else 0)
+        n = min(sizes)
+        if n != max(sizes):
+            for col in _FILES:
+                p = self._path(d, col)
+                if os.path.exists(p):
+                    with open(p, "r+b") as f:
+                        f.truncate(n * _ITEM)
+        self._checked.add(d)
+
+    def _column(self, d: str, col: str, n: int) -> np.ndarray:
+        dtype = np.int64 if col == "ts" else np.float64
+        return np.memmap(self._path(d, col), dtype=dtype, mode="r", shape=(n,))
+
+    def size(self, symbol: str, interval: str) -> int:
+        return self._len(self._dir(symbol, interval))
+
+    def last_ts(self, symbol: str, interval: str) -> Optional[pd.Timestamp]:
+        d = self._dir(symbol, interval)
+        n = self._len(d)
+        if n == 0:
+            return None
+        return pd.Timestamp(int(self._column(d, "ts", n)[-1]), tz="UTC")
+
+    def merge(self, symbol: str, interval: str, df: pd.DataFrame) -> int:
+        """
+        يدمج شموعاً جديدة: ما هو أقدم من آخر طابع مخزّن يُتجاهل، المطابق له
+        يستبدل الشمعة الأخيرة، والأحدث يُلحق. يعيد عدد الصفوف المكتوبة.
+        """
+        if df is None or df.empty:
+            return 0
+        idx = df.index
+        idx = idx.tz_localize("UTC") if idx.tz is None else idx.tz_convert("UTC")
+        ts = idx.asi8
+        order = np.argsort(ts, kind="stable")
+        ts = ts[order]
+        # عند التكرار نحتفظ بآخر نسخة من الشمعة
+        keep = np.append(ts[1:] != ts[:-1], True)
+        ts = ts[keep]
+        cols = {c: df[c].to_numpy(dtype=np.float64)[order][keep] for c in COLUMNS}
+
+        d = self._dir(symbol, interval)
+        with self._lock:
+            os.makedirs(d, exist_ok=True)
+            n = self._len(d)
+            start = n
+            if n:
+                last = int(self._column(d, "ts", n)[-1])
+                sel = ts >= last
+                ts = ts[sel]
+                cols = {c: v[sel] for c, v in cols.items()}
+                if len(ts) and ts[0] == last:
+                    start = n - 1
+            if not len(ts):
+                return 0
+            # الأعمدة أولاً ثم ts: الطول المعتمد يُقرأ من ts
+            for col, arr in list(cols.items()) + [("ts", ts)]:
+                p = self._path(d, col)
+                with open(p, "r+b" if os.path.exists(p) else "wb") as f:
+                    f.seek(start * _ITEM)
+                    f.write(np.ascontiguousarray(arr).tobytes())
+            return len(ts)
+
+    def frame(self, symbol: str, interval: str, tail: int = None, tz=None) -> pd.DataFrame:
+        """إطار OHLCV (آخر tail صفاً) يشير إلى ملفات المخزن دون نسخ — للقراءة فقط."""
+        d = self._dir(symbol, interval)
+        n = self._len(d)
+        if n == 0:
+            return pd.DataFrame()
+        sl = slice(max(n - tail, 0), n) if tail else slice(0, n)
+        ts = self._column(d, "ts", n)[sl]
+        index = pd.DatetimeIndex(ts.view("M8[ns]")).tz_localize("UTC")
+        if tz is not None:
+            index = index.tz_convert(tz)
+        data = {c: self._column(d, c, n)[sl] for c in COLUMNS}
+        return pd.DataFrame(data, index=index, copy=False)
+
+BAR_STORE = BarStore()
@@ -0,0 +1,7 @@
+"""
+قياس أداء المسارات الساخنة على بيانات مسجّلة (بدون شبكة).
+- fixtures: تحميل/توليد البيانات (جلسات 1m، سلاسل خيارات بأحجام مختلفة، دفعات أخبار).
+- record: تسجيل بيانات حقيقية من ياهو إلى نفس الصيغة.
+- run: تشغيل القياسات وإخراج JSON مع مقارنة بخط أساس.
+- equivalence: تطابق المسارات المحسّنة مع المراجع البسيطة التي استبدلتها.
+"""
@@ -0,0 +1,116 @@
+"""
+قياس الإقلاع البارد: زمن أول رد (/start) من لحظة تشغيل `python bot.py` مقابل Bot API وهمي.
+    python -m bench.coldstart [--runs 5] [--budget-ms 1500] [--webhook] [--out cold.json]
+مع --webhook يعمل البوت بوضع الـ webhook (خادم aiohttp محلي) ويدفع الـ API الوهمي التحديثات إليه.
+يقرأ أيضاً سطور "startup:" و "warm-up done:" من سجل البوت لعرض مراحل الإقلاع.
+يخرج بالرمز 1 إن تجاوز الوسيط --budget-ms.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import signal
+import socket
+import sys
+import tempfile
+import time
+import numpy as np
+
+from bench.fake_telegram import FakeBotAPI
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PHASES = re.compile(r"(\w+_ms)=(\d+)")
+
+async def _read_log(stream, phases: dict, warm: asyncio.Event):
+    while True:
+        line = await stream.readline()
+        if not line:
+            return
+        text = line.decode(errors="replace")
+        if "startup:" in text or "warm-up done:" in text:
+            phases.update({k: float(v) for k, v in _PHASES.findall(text)})
+            if "warm-up done:" in text:
+                warm.set()
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def bot_env(base_url: str, webhook: bool = False) -> dict:
+    """بيئة تشغيل bot.py مقابل الـ API الوهمي (بلا شبكة، بيانات في مجلد مؤقت)."""
+    env = dict(os.environ, TELEGRAM_BOT_TOKEN="123456:COLDSTART", TELEGRAM_API_URL=base_url,
+               METRICS_PORT="0", DATA_DIR=tempfile.mkdtemp(prefix="coldstart-"), PYTHONUNBUFFERED="1")
+    if webhook:
+        port = free_port()
+        env.update(WEBHOOK_URL=f"http://127.0.0.1:{port}", WEBHOOK_HOST="127.0.0.1", WEBHOOK_PORT=str(port),
+                   WEBHOOK_SECRET="coldstart")
+    else:
+        env.pop("WEBHOOK_URL", None)
+    return env
+
+async def one_run(timeout: float, webhook: bool = False) -> dict:
+    api = FakeBotAPI()
+    base = await api.start()
+    api.command("/start")
+    env = bot_env(base, webhook)
+    t0 = time.monotonic()
+    proc = await asyncio.create_subprocess_exec(sys.executable, "bot.py", cwd=ROOT, env=env,
+                                                stdout=asyncio.subprocess.DEVNULL,
+                                                stderr=asyncio.subprocess.PIPE)
+    phases, warm = {}, asyncio.Event()
+    reader = asyncio.create_task(_read_log(proc.stderr, phases, warm))
+    try:
+        (t_reply, _, _), = await api.wait_sent(1, timeout)
+        try:
+            await asyncio.wait_for(warm.wait(), timeout)
+            t_warm = time.monotonic()
+        except asyncio.TimeoutError:
+            t_warm = float("nan")
+    finally:
+        proc.send_signal(signal.SIGINT)
+        try:
+            await asyncio.wait_for(proc.wait(), 10)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+        reader.cancel()
+        await api.stop()
+    return {"first_reply_ms": (t_reply - t0) * 1000, "warm_ms": (t_warm - t0) * 1000, "phases": phases}
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="cold-start time-to-first-reply benchmark")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--timeout", type=float, default=30.0)
+    ap.add_argument("--budget-ms", type=float, default=0, help="حد أقصى لوسيط زمن أول رد (0 = بلا حد)")
+    ap.add_argument("--webhook", action="store_true", help="وضع الـ webhook بدل الاستطلاع الطويل")
+    ap.add_argument("--out")
+    args = ap.parse_args(argv)
+
+    runs = []
+    for i in range(args.runs):
+        r = asyncio.run(one_run(args.timeout, args.webhook))
+        runs.append(r)
+        print(f"run {i + 1}: first reply {r['first_reply_ms']:.0f} ms, warm {r['warm_ms']:.0f} ms", file=sys.stderr)
+    ttfr = np.array([r["first_reply_ms"] for r in runs])
+    report = {
+        "mode": "webhook" if args.webhook else "polling",
+        "runs": runs,
+        "first_reply_ms": {"median": float(np.median(ttfr)), "min": float(ttfr.min()), "max": float(ttfr.max())},
+        "warm_ms_median": float(np.nanmedian([r["warm_ms"] for r in runs])),
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.budget_ms and report["first_reply_ms"]["median"] > args.budget_ms:
+        print(f"first reply median {report['first_reply_ms']['median']:.0f} ms exceeds budget {args.budget_ms:.0f} ms",
+              file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""
+فحوص تكافؤ على bench/fixtures: كل تطبيق متجه/تراكمي مقابل المرجع البسيط الذي استبدله، بتطابق تام
+(نفس المستويات/الشموع/الاختيار بما فيه كسر التعادل؛ المؤشرات التراكمية ضمن 1e-8 والدلتا ضمن 1e-7) لا بالزمن:
+    python -m bench.equivalence [--filter swing]
+يخرج بالرمز 1 عند أي اختلاف. المراجع هنا نسخ من الكود القديم ولا يستوردها البوت، عدا rsi/macd الدفعية من indicators.
+"""
+import argparse
+import math
+import sys
+import warnings
+import numpy as np
+import pandas as pd
+
+import bench.fixtures as fixtures
+from indicators import macd, rsi
+
+CHECKS = {}
+
+def check(fn):
+    CHECKS[fn.__name__] = fn
+    return fn
+
+# ===== swing_levels (قبل المتجهة) =====
+def _swing_levels_loop(close: pd.Series, lookback=50):
+    if close.empty:
+        return []
+    s = close.tail(lookback)
+    levels = []
+    for i in range(2, len(s)-2):
+        if s.iloc[i] == max(s.iloc[i-2:i+3]):
+            levels.append((s.index[i], float(s.iloc[i])))
+        if s.iloc[i] == min(s.iloc[i-2:i+3]):
+            levels.append((s.index[i], float(s.iloc[i])))
+    levels_sorted = sorted(levels, key=lambda x: x[1])
+    pruned = []
+    for t, price in levels_sorted:
+        if not pruned or abs(price - pruned[-1][1]) > np.mean(s)*0.003:
+            pruned.append((t, price))
+    return pruned[-12:]
+
+@check
+def swing_levels(fx) -> list:
+    from indicators import swing_levels, swing_levels_batch
+    days = list(fx.sessions().values())
+    all_1m = pd.concat(days)
+    hour = all_1m["Close"].resample("60min").last().dropna()
+    series = {f"session{i}": d["Close"] for i, d in enumerate(days)}
+    series["hour"] = hour
+    # أسعار مقرّبة: قمم/قيعان مسطحة وتعادلات في السعر لاختبار ترتيب الحلقة
+    series["rounded"] = all_1m["Close"].tail(600).round(0)
+    # خطوة أكبر من عتبة الدمج (0.3% من المتوسط): السعر نفسه قمة في شمعة وقاع في أخرى ويبقى بعد الدمج
+    series["coarse"] = (all_1m["Close"].tail(600) / 25).round() * 25
+    series["short"] = days[0]["Close"].head(4)
+    bad = []
+    lookbacks = (5, 20, 50, 200)
+    for name, close in series.items():
+        for lb in lookbacks:
+            if swing_levels(close, lookback=lb) != _swing_levels_loop(close, lookback=lb):
+                bad.append(f"{name} lookback={lb}")
+    batch = swing_levels_batch(series, lookbacks=lookbacks)
+    for (name, lb), levels in batch.items():
+        if levels != _swing_levels_loop(series[name], lookback=lb):
+            bad.append(f"batch {name} lookback={lb}")
+    return bad
+
+# ===== compact_timeframes (قبل التجميع المتتالي) =====
+def _resample(df_1m: pd.DataFrame, n: int) -> pd.DataFrame:
+    return df_1m.resample(f"{n}min").agg({
+        "Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"
+    }).dropna()
+
+def _frames_differ(got: pd.DataFrame, want: pd.DataFrame) -> bool:
+    try:
+        pd.testing.assert_frame_equal(got[list(want.columns)], want, check_freq=False, check_exact=True)
+        return False
+    except AssertionError:
+        return True
+
+@check
+def timeframes(fx) -> list:
+    import asyncio
+    from data_providers import compact_timeframes
+    minutes = {"5m": 5, "15m": 15, "1h": 60}
+    all_1m = pd.concat(list(fx.sessions().values()))
+    # فجوات داخل الجلسة (دقائق ناقصة) إضافة إلى فجوات الليل بين الجلسات، وإغلاق مفقود
+    holes = all_1m.drop(all_1m.index[np.random.default_rng(0).choice(len(all_1m), 150, replace=False)])
+    nan_close = all_1m.copy()
+    nan_close.iloc[::97, nan_close.columns.get_loc("Close")] = np.nan
+    loop = asyncio.new_event_loop()
+    bad = []
+
+    def compare(tag, df):
+        packs = loop.run_until_complete(compact_timeframes(df))
+        for tf, n in minutes.items():
+            if _frames_differ(packs[tf], _resample(df[df["Close"].notna()], n)):
+                bad.append(f"{tag} {tf}")
+
+    try:
+        for name, src in (("full", all_1m), ("holes", holes), ("nan_close", nan_close)):
+            compare(name, src)
+            # نوافذ منزلقة تبدأ وسط الحاويات، وشمعة أخيرة يتغير إغلاقها قبل اكتمالها
+            window = 600
+            for i in range(300, 450):
+                df = src.iloc[i:i + window].copy()
+                compare(f"{name} window {i}", df)
+                df.iloc[-1, df.columns.get_loc("Close")] += 0.25
+                df.iloc[-1, df.columns.get_loc("High")] = df.iloc[-1][["High", "Close"]].max()
+                compare(f"{name} window {i} revised", df)
+    finally:
+        loop.close()
+    return bad
+
+# ===== IndicatorSet / IncrementalRSI / IncrementalMACD مقابل rsi / macd =====
+_IND_TOL = 1e-8  # ترتيب عمليات الفاصلة العائمة يختلف؛ الحالة نفسها لا تنحرف
+
+def _ind_ref(close: pd.Series) -> dict:
+    r = rsi(close)
+    m, s, h = macd(close)
+    return {"rsi": r.iloc[-1], "macd": m.iloc[-1], "signal": s.iloc[-1], "hist": h.iloc[-1]}
+
+def _ind_differ(got: dict, want: dict) -> bool:
+    return set(got) != set(want) or not all(
+        np.isclose(got[k], want[k], rtol=0, atol=_IND_TOL, equal_nan=True) for k in want)
+
+@check
+def indicators(fx) -> list:
+    from indicators import IncrementalMACD, IncrementalRSI, IndicatorSet
+    days = list(fx.sessions().values())
+    all_1m = pd.concat(days)
+    frames = {"1m": all_1m, "5m": _resample(all_1m, 5), "15m": _resample(all_1m, 15)}
+    # إغلاقات مسطحة (down = 0 ⇒ RSI = NaN) وبداية قصيرة
+    frames["flat"] = all_1m.tail(400).assign(Close=all_1m["Close"].tail(400).round(-1))
+    bad = []
+    for name, df in frames.items():
+        close = df["Close"]
+        # السلسلة كاملة: seed على جزء ثم update شمعة شمعة
+        for k in (1, 2, 30):
+            ri = IncrementalRSI().seed(close.iloc[:k])
+            mi = IncrementalMACD().seed(close.iloc[:k])
+            got_r = [ri.value] + [ri.update(x) for x in close.iloc[k:]]
+            got_m = [mi.value[0]] + [mi.update(x)[0] for x in close.iloc[k:]]
+            want_r = rsi(close).iloc[k - 1:].to_numpy()
+            want_m = macd(close)[0].iloc[k - 1:].to_numpy()
+            if not np.allclose(got_r, want_r, rtol=0, atol=_IND_TOL, equal_nan=True):
+                bad.append(f"{name} IncrementalRSI seed={k}")
+            if not np.allclose(got_m, want_m, rtol=0, atol=_IND_TOL, equal_nan=True):
+                bad.append(f"{name} IncrementalMACD seed={k}")
+        # المسار الحي: IndicatorSet.sync على نافذة منزلقة مع شمعة جارية تتغير (peek) ثم فجوة تعيد التهيئة
+        ind = IndicatorSet()
+        window, start = 200, 0
+        for i in range(start, min(start + 150, len(df) - window)):
+            cur = df.iloc[i:i + window + 1].copy()
+            hist = df.iloc[start:i + window]
+            if _ind_differ(ind.sync(cur.iloc[:-1]), _ind_ref(hist["Close"])):
+                bad.append(f"{name} IndicatorSet step {i}")
+            cur.iloc[-1, cur.columns.get_loc("Close")] += 0.25
+            if _ind_differ(ind.sync(cur), _ind_ref(pd.concat([hist, cur.iloc[-1:]])["Close"])):
+                bad.append(f"{name} IndicatorSet step {i} peek")
+        gap = df.iloc[-window:]
+        if len(df) > 2 * window and _ind_differ(ind.sync(gap), _ind_ref(gap["Close"])):
+            bad.append(f"{name} IndicatorSet reseed")
+    return bad
+
+# ===== bs_greeks / implied_vol (قبل الحساب المتجه) =====
+def _bs_delta_scalar(spot: float, strike: float, t_years: float, iv: float, rate: float, side: str) -> float:
+    if spot <= 0 or strike <= 0 or iv <= 0 or t_years <= 0:
+        return 0.0
+    d1 = (math.log(spot/strike) + (rate + 0.5*iv*iv)*t_years) / (iv*math.sqrt(t_years))
+    nd1 = 0.5 * (1.0 + math.erf(d1 / math.sqrt(2.0)))
+    return nd1 if side == "CALL" else nd1 - 1.0
+
+_DELTA_TOL = 1e-7  # تقريب erfc (خطأ نسبي < 1.2e-7) مقابل math.erf
+_IV_TOL = 1e-5     # implied_vol يتوقف عند فرق سعر 1e-6، و vega (لكل 1.0 تذبذب) > 1 في الصفوف المفحوصة
+
+@check
+def greeks(fx) -> list:
+    from greeks import bs_greeks, bs_price, implied_vol
+    bad = []
+    for name, (raw, spot, t0) in fx.chains().items():
+        strike = raw["strike"].to_numpy(dtype=float)
+        is_call = (raw["side"] == "CALL").to_numpy()
+        # IV المصدر كما هو (بما فيه الصغير جداً) وصفوف غير صالحة تعطي صفراً في الحالتين
+        iv = raw["iv"].to_numpy(dtype=float).copy()
+        iv[::23] = 0.0
+        for t in (t0, 0.0, 1 / 365, 7 / 365, 30 / 365):
+            for rate in (0.0, 0.05):
+                got = bs_greeks(spot, strike, t, iv, rate, is_call)
+                want = np.array([_bs_delta_scalar(spot, k, t, v, rate, sd)
+                                 for k, v, sd in zip(strike, iv, raw["side"])])
+                err = np.abs(got["delta"] - want).max()
+                if not err <= _DELTA_TOL:
+                    bad.append(f"{name} t={t:.5f} rate={rate} delta max err {err:.2e}")
+                # IV ذهاباً وإياباً حيث السعر حساس للتذبذب
+                sel = got["vega"] > 0.01
+                if not sel.any():
+                    continue
+                price = bs_price(spot, strike[sel], t, iv[sel], rate, is_call[sel])
+                solved = implied_vol(price, spot, strike[sel], t, rate, is_call[sel])
+                err = np.nanmax(np.abs(solved - iv[sel])) if np.isfinite(solved).all() else np.inf
+                if not err <= _IV_TOL:
+                    bad.append(f"{name} t={t:.5f} rate={rate} implied_vol max err {err:.2e}")
+    return bad
+
+# ===== pick_best_strike (قبل ChainSnapshot) =====
+def _pick_best_strike_pandas(options_df: pd.DataFrame, price: float,
+                             dmin=0.2, dmax=0.35, max_spread=0.3,
+                             min_vol=200, min_oi=500):
+    from options import BestStrike, OptionCandidate
+    if options_df is None or options_df.empty:
+        return BestStrike(underlying=price, call=None, put=None)
+
+    options_df = options_df.copy()
+    options_df["spread"] = (options_df["ask"] - options_df["bid"]).clip(lower=0)
+
+    def choose(side):
+        sub = options_df[(options_df["side"]==side) &
+                         (options_df["delta"].between(dmin, dmax, inclusive='both')) &
+                         (options_df["spread"] <= max_spread) &
+                         (options_df["volume"] >= min_vol) &
+                         (options_df["oi"] >= min_oi)]
+        if sub.empty:
+            return None
+        sub = sub.assign(kdist=(sub["strike"] - price).abs())
+        sub = sub.sort_values(["kdist", "spread", "volume"], ascending=[True, True, False])
+        r = sub.iloc[0]
+        return OptionCandidate(symbol=r["symbol"], strike=float(r["strike"]), side=side,
+                               delta=float(r["delta"]), bid=float(r["bid"]), ask=float(r["ask"]),
+                               spread=float(r["spread"]), volume=int(r["volume"]), oi=int(r["oi"]),
+                               expiry=str(r["expiry"]))
+
+    return BestStrike(underlying=price, call=choose("CALL"), put=choose("PUT"))
+
+@check
+def best_strike(fx) -> list:
+    from options import ChainSnapshot
+    from options_provider import add_greeks
+    chains = {}
+    for name, (raw, spot, t_years) in fx.chains().items():
+        chain = add_greeks(raw.copy(), spot, t_years)
+        chains[name] = (chain, spot)
+    # تعادلات: صفوف مكررة تختلف في oi فقط (يُختار الأسبق)، وحجم/سبريد مقرّبان، و delta مفقودة
+    chain, spot = chains["SPY_large"]
+    ties = pd.concat([chain, chain.assign(oi=chain["oi"] + 1)], ignore_index=True)
+    ties["volume"] = (ties["volume"] // 1000) * 1000
+    ties["ask"] = ties["bid"] + (ties["ask"] - ties["bid"]).round(1)
+    ties.loc[ties.index % 17 == 0, "delta"] = np.nan
+    chains["ties"] = (ties, spot)
+
+    filters = [dict(), dict(min_vol=0, min_oi=0, max_spread=1e9),
+               dict(max_spread=0.05, min_vol=1000, min_oi=0)]
+    bands = [(0.0, 1.0), (0.2, 0.35), (0.1, 0.1), (0.45, 0.55), (0.9, 1.0)]
+    bad = []
+    for name, (chain, spot) in chains.items():
+        snap = ChainSnapshot.from_df(chain)
+        for price in (spot, spot * 0.99, spot * 1.013):
+            for f in filters:
+                for dmin, dmax in bands:
+                    kw = dict(f, dmin=dmin, dmax=dmax)
+                    if snap.best(price, **kw) != _pick_best_strike_pandas(chain, price, **kw):
+                        bad.append(f"{name} price={price:.2f} {kw}")
+    return bad
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="equivalence checks of optimized paths against their reference")
+    ap.add_argument("--fixtures", default=fixtures.FIXTURES_DIR)
+    ap.add_argument("--filter", default="", help="تشغيل الفحوص التي يحتوي اسمها هذا النص فقط")
+    args = ap.parse_args(argv)
+    warnings.simplefilter("ignore")
+
+    fx = fixtures.load(args.fixtures)
+    failed = 0
+    for name, fn in CHECKS.items():
+        if args.filter not in name:
+            continue
+        bad = fn(fx)
+        print(f"{'FAIL' if bad else 'ok':4s} {name}", file=sys.stderr)
+        for b in bad[:20]:
+            print(f"     {b}", file=sys.stderr)
+        failed += bool(bad)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+خادم Bot API وهمي (aiohttp) لقياس البوت دون شبكة ودون توكن حقيقي.
+يكفي لـ python-telegram-bot: getMe, getUpdates (استطلاع طويل), sendMessage/sendPhoto،
+setWebhook/deleteWebhook، وأي طريقة أخرى تعيد true.
+بعد setWebhook تُدفع التحديثات إلى عنوان الـ webhook (مع ترويسة السر) بدل getUpdates.
+شغّل البوت مع TELEGRAM_API_URL=<base_url> (انظر start).
+"""
+import asyncio
+import json
+import time
+import aiohttp
+from aiohttp import web
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "SPX", "username": "spx_test_bot"}
+
+class FakeBotAPI:
+    def __init__(self):
+        self.updates = []          # تحديثات لم تُسلَّم بعد
+        self.sent = []             # (وقت الاستلام، الطريقة، المعاملات)
+        self._next_update = 1
+        self._next_message = 1
+        self._new_update = asyncio.Event()
+        self._new_sent = asyncio.Event()
+        self._runner = None
+        self._pusher = None
+        self._waiters = {}         # chat_id -> Future لأول رد في المحادثة (انظر ask)
+        self.base_url = ""
+        self.webhook = None        # معاملات setWebhook الأخيرة (url, secret_token, allowed_updates ...)
+
+    # ===== جانب الاختبار =====
+    def command(self, text: str, chat_id: int = 1000, user_id: int = None) -> dict:
+        """يضيف رسالة أمر (مثل "/start") إلى طابور getUpdates ويعيد التحديث."""
+        cmd = text.split()[0]
+        upd = {
+            "update_id": self._next_update,
+            "message": {
+                "message_id": self._next_message,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "group"},
+                "from": {"id": user_id or abs(chat_id), "is_bot": False, "first_name": "user"},
+                "text": text,
+                "entities": [{"type": "bot_command", "offset": 0, "length": len(cmd)}],
+            },
+        }
+        self._next_update += 1
+        self._next_message += 1
+        self.updates.append(upd)
+        self._new_update.set()
+        return upd
+
+    async def wait_sent(self, n: int = 1, timeout: float = 30.0) -> list:
+        """ينتظر حتى يصل عدد الرسائل المرسلة إلى n."""
+        deadline = time.monotonic() + timeout
+        while len(self.sent) < n:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise asyncio.TimeoutError(f"only {len(self.sent)} of {n} messages sent")
+            self._new_sent.clear()
+            try:
+                await asyncio.wait_for(self._new_sent.wait(), left)
+            except asyncio.TimeoutError:
+                pass
+        return self.sent[:n]
+
+    async def ask(self, text: str, chat_id: int, timeout: float = 30.0) -> float:
+        """يرسل أمراً من المحادثة وينتظر أول رد فيها؛ يعيد زمن الرد بالثواني."""
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters[chat_id] = fut
+        t0 = time.monotonic()
+        self.command(text, chat_id=chat_id)
+        try:
+            return await asyncio.wait_for(fut, timeout) - t0
+        finally:
+            self._waiters.pop(chat_id, None)
+
+    async def _push(self):
+        """في وضع الـ webhook: يرسل التحديثات المعلقة إلى البوت بالتوازي كما يفعل تيليجرام."""
+        async with aiohttp.ClientSession() as session:
+            async def post(upd, hook):
+                headers = {"X-Telegram-Bot-Api-Secret-Token": hook["secret_token"]} if hook.get("secret_token") else {}
+                async with session.post(hook["url"], json=upd, headers=headers) as r:
+                    await r.read()
+            while True:
+                await self._new_update.wait()
+                self._new_update.clear()
+                hook = self.webhook
+                if hook is None:
+                    continue
+                batch, self.updates = self.updates, []
+                await asyncio.gather(*(post(u, hook) for u in batch), return_exceptions=True)
+
+    # ===== جانب البوت =====
+    @staticmethod
+    async def _params(request) -> dict:
+        if request.content_type == "application/json":
+            return await request.json()
+        return {k: v for k, v in (await request.post()).items()}
+
+    def _message(self, params: dict, **extra) -> dict:
+        msg = {"message_id": self._next_message, "date": int(time.time()),
+               "chat": {"id": int(params.get("chat_id", 0)), "type": "private"}, **extra}
+        self._next_message += 1
+        return msg
+
+    async def _get_updates(self, params: dict) -> list:
+        offset = int(params.get("offset") or 0)
+        self.updates = [u for u in self.updates if u["update_id"] >= offset]
+        if not self.updates:
+            self._new_update.clear()
+            try:
+                await asyncio.wait_for(self._new_update.wait(), float(params.get("timeout") or 0))
+            except asyncio.TimeoutError:
+                pass
+        return list(self.updates)
+
+    async def handle(self, request):
+        method = request.match_info["method"]
+        params = await self._params(request)
+        if method == "getMe":
+            result = BOT_USER
+        elif method == "getUpdates":
+            result = await self._get_updates(params)
+        elif method == "setWebhook":
+            self.webhook = params
+            self._new_update.set()  # تسليم ما تراكم قبل التسجيل
+            result = True
+        elif method == "deleteWebhook":
+            self.webhook = None
+            result = True
+        elif method == "sendMessage":
+            result = self._message(params, text=params.get("text", ""))
+        elif method == "sendPhoto":
+            n = self._next_message
+            photo = params.get("photo")
+            file_id = photo if isinstance(photo, str) else f"photo-{n}"
+            result = self._message(params, photo=[{"file_id": file_id, "file_unique_id": f"u{n}",
+                                                   "width": 1000, "height": 500}])
+        else:
+            result = True
+        if method.startswith("send"):
+            now = time.monotonic()
+            self.sent.append((now, method, {k: v for k, v in params.items() if isinstance(v, str)}))
+            self._new_sent.set()
+            fut = self._waiters.get(int(params.get("chat_id", 0)))
+            if fut is not None and not fut.done():
+                fut.set_result(now)
+        return web.Response(text=json.dumps({"ok": True, "result": result}), content_type="application/json")
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """يشغّل الخادم ويعيد base_url المناسب لـ TELEGRAM_API_URL."""
+        app = web.Application(client_max_size=20 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}/bot"
+        self._pusher = asyncio.create_task(self._push())
+        return self.base_url
+
+    async def stop(self):
+        if self._pusher is not None:
+            self._pusher.cancel()
+            self._pusher = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,172 @@
+"""
+بيانات القياس: مجلد فيه manifest.json + ملفات CSV/JSON.
+- sessions: شموع 1m لكل جلسة (Open/High/Low/Close/Volume بفهرس tz-aware).
+- chains: سلاسل خيارات بصيغة options_chain_df قبل حساب الإغريقيات (مع spot و t_years).
+- news: دفعات عناصر أخبار خام (title/source/url/ts).
+المجموعة في bench/fixtures مُضمّنة في المستودع ليُقاس الجميع على البيانات نفسها وخط الأساس bench/baseline.json؛
+record.py يكتب بيانات حقيقية بنفس الصيغة إلى bench/recordings (محلي) ما لم يُمرَّر --out.
+"""
+import gzip
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from greeks import bs_price
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")  # المجموعة المشتركة في المستودع
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")  # تسجيلات محلية (مُتجاهلة)
+CHAIN_COLUMNS = ["symbol", "strike", "side", "bid", "ask", "volume", "oi", "expiry", "iv", "lastprice"]
+
+class Fixtures:
+    def __init__(self, path: str = FIXTURES_DIR):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.kind = self.manifest.get("kind", "recorded")
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def sessions(self) -> dict:
+        """{اسم الجلسة: إطار 1m}"""
+        tz = self.manifest["tz"]
+        out = {}
+        for name, fn in self.manifest["sessions"].items():
+            df = pd.read_csv(self._file(fn), index_col=0)
+            df.index = pd.to_datetime(df.index, utc=True).tz_convert(tz)
+            out[name] = df
+        return out
+
+    def chains(self) -> dict:
+        """{اسم السلسلة: (إطار، spot، t_years)}"""
+        out = {}
+        for name, meta in self.manifest["chains"].items():
+            df = pd.read_csv(self._file(meta["file"]))
+            out[name] = (df, float(meta["spot"]), float(meta["t_years"]))
+        return out
+
+    def news(self) -> dict:
+        """{اسم الدفعة: [مجموعات عناصر لكل مصدر]}"""
+        out = {}
+        for name, fn in self.manifest["news"].items():
+            opener = gzip.open if fn.endswith(".gz") else open
+            with opener(self._file(fn), "rt", encoding="utf-8") as f:
+                out[name] = json.load(f)
+        return out
+
+def write_manifest(path: str, manifest: dict):
+    os.makedirs(path, exist_ok=True)
+    tmp = os.path.join(path, "manifest.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, os.path.join(path, "manifest.json"))
+
+# ========= توليد اصطناعي =========
+def _session(rng, day: str, tz: str, open_price: float) -> pd.DataFrame:
+    # جلسة نيويورك كاملة (390 شمعة) بحركة عشوائية هندسية وتذبذب داخل الشمعة
+    idx = pd.date_range(f"{day} 09:30", periods=390, freq="1min", tz="America/New_York").tz_convert(tz)
+    ret = rng.normal(0, 0.0006, len(idx))
+    close = open_price * np.exp(np.cumsum(ret))
+    prev = np.r_[open_price, close[:-1]]
+    wick = np.abs(rng.normal(0, 0.0004, len(idx))) * close
+    return pd.DataFrame({
+        "Open": prev,
+        "High": np.maximum(prev, close) + wick,
+        "Low": np.minimum(prev, close) - wick,
+        "Close": close,
+        "Volume": rng.integers(5_000, 200_000, len(idx)).astype(float),
+    }, index=idx)
+
+def _chain(rng, symbol: str, spot: float, step: float, strikes: int, expiries: int, t_years: float) -> pd.DataFrame:
+    base = np.round(spot / step) * step
+    k = base + step * (np.arange(strikes) - strikes // 2)
+    rows = []
+    for e in range(expiries):
+        t = t_years + e / 365.0
+        expiry = (pd.Timestamp("2026-01-05") + pd.Timedelta(days=e)).date().isoformat()
+        for side in ("CALL", "PUT"):
+            is_call = side == "CALL"
+            # ابتسامة تذبذب بسيطة حول السعر
+            iv = 0.15 + 0.5 * ((k / spot) - 1.0) ** 2 * 100
+            fair = bs_price(spot, k, t, iv, 0.0, is_call)
+            half = np.maximum(0.01, fair * rng.uniform(0.005, 0.05, len(k)))
+            bid = np.maximum(0.0, np.round(fair - half, 2))
+            ask = np.round(fair + half, 2) + 0.01
+            # نحو خُمس الصفوف بلا IV من المصدر (مثل قيم ياهو شبه الصفرية) لاختبار الحلّال
+            src_iv = np.where(rng.random(len(k)) < 0.2, 1e-5, iv)
+            rows.append(pd.DataFrame({
+                "symbol": symbol, "strike": k, "side": side, "bid": bid, "ask": ask,
+                "volume": rng.integers(0, 5_000, len(k)), "oi": rng.integers(0, 20_000, len(k)),
+                "expiry": expiry, "iv": src_iv, "lastprice": np.round(fair, 2),
+            }))
+    return pd.concat(rows, ignore_index=True)[CHAIN_COLUMNS]
+
+_HEADLINES = (
+    "Fed officials signal patience ahead of FOMC meeting",
+    "S&P 500 edges higher as Treasury yields slip",
+    "CPI report shows inflation cooling for third month",
+    "Nvidia leads chipmakers higher after earnings beat",
+    "Apple and Microsoft weigh on Nasdaq",
+    "Oil prices steady as traders eye supply data",
+    "SPX options volume hits record on 0DTE demand",
+    "Dollar firms against yen after jobs data",
+)
+
+def _news(rng, n: int, sources: int = 3) -> list:
+    # عناوين متكررة عبر المصادر (بحالة أحرف/علامات ترقيم مختلفة) لاختبار إزالة التكرار
+    groups = []
+    for s in range(sources):
+        items = []
+        for i in range(n):
+            j = int(rng.integers(0, n))
+            title = f"{_HEADLINES[j % len(_HEADLINES)]} #{j}"
+            if s % 2:
+                title = title.upper() + "!"
+            items.append({"title": title, "source": f"src{s}",
+                          "url": f"https://www.example{s}.com/news/{j}?utm_source=x{i}",
+                          "ts": 1_760_000_000 + int(rng.integers(0, 86_400))})
+        groups.append(items)
+    return groups
+
+def synthesize(path: str = FIXTURES_DIR, seed: int = 7, tz: str = "Asia/Riyadh") -> Fixtures:
+    """يكتب بيانات اصطناعية بنفس صيغة record.py (نفس البذرة = نفس الملفات)."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(path, exist_ok=True)
+    manifest = {"kind": "synthetic", "seed": seed, "tz": tz, "sessions": {}, "chains": {}, "news": {}}
+
+    price = 5800.0
+    for day in pd.bdate_range("2026-01-05", periods=5):
+        name = day.date().isoformat()
+        df = _session(rng, name, tz, price)
+        price = float(df["Close"].iloc[-1])
+        fn = f"bars_{name}.csv.gz"
+        df.to_csv(os.path.join(path, fn))
+        manifest["sessions"][name] = fn
+
+    t_years = 3.0 / (365 * 24)  # ثلاث ساعات حتى الإغلاق
+    for symbol, spot, step in (("SPY", price / 10, 1.0), ("^SPX", price, 5.0)):
+        for size, strikes, expiries in (("small", 40, 1), ("medium", 200, 1), ("large", 200, 10)):
+            name = f"{symbol.lstrip('^')}_{size}"
+            fn = f"chain_{name}.csv.gz"
+            _chain(rng, symbol, spot, step, strikes, expiries, t_years).to_csv(os.path.join(path, fn), index=False)
+            manifest["chains"][name] = {"file": fn, "spot": spot, "t_years": t_years}
+
+    for name, n in (("small", 50), ("large", 1000)):
+        fn = f"news_{name}.json.gz"
+        with gzip.open(os.path.join(path, fn), "wt", encoding="utf-8") as f:
+            json.dump(_news(rng, n), f)
+        manifest["news"][name] = fn
+
+    write_manifest(path, manifest)
+    return Fixtures(path)
+
+def load(path: str = FIXTURES_DIR) -> Fixtures:
+    """يحمّل البيانات المسجلة، أو يولّد الاصطناعية إن لم يوجد manifest."""
+    if not os.path.exists(os.path.join(path, "manifest.json")):
+        return synthesize(path)
+    return Fixtures(path)
+
+if __name__ == "__main__":
+    fx = synthesize()
+    print(f"wrote synthetic fixtures to {fx.path}")
@@ -0,0 +1,258 @@
+"""
+اختبار حمل للبوت الحقيقي (Application + المعالجات) مقابل Bot API وهمي ومزوّدات بيانات بديلة:
+    python -m bench.loadtest [--chats 50] [--duration 30] [--mix status=4,chart=2,strike=2,news=2]
+                             [--think 1.0] [--price-latency 0.3] [--options-latency 0.8] [--news-latency 0.5]
+                             [--ttl SECONDS] [--webhook] [--budget-p95-ms 2000] [--out load.json]
+- N محادثة، كل منها: أمر عشوائي حسب --mix ← انتظار الرد ← تفكير (توزيع أُسّي بمتوسط --think).
+- البدائل تحل محل الاستدعاءات الحاجبة فقط (yf.download، انتهاءات/سلاسل الخيارات وسعر الأصل، أخبار yfinance)
+  بزمن انتظار ثابت وبيانات bench/fixtures؛ الكاشات والمجمعات والحساب والرسم كلها حقيقية.
+- الـ API الوهمي والمحادثات في خيط منفصل؛ البوت وحده على الحلقة الرئيسية التي يُقاس تأخرها.
+- الناتج: الإنتاجية، p50/p95/p99 لكل أمر، تأخر الحلقة، ومقاييس البوت (METRICS.collect).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import warnings
+import numpy as np
+
+import bench.fixtures as fixtures
+from bench.fake_telegram import FakeBotAPI
+
+COMMANDS = {"status": "/status", "chart": "/chart", "strike": "/strike", "news": "/news", "scan": "/scan"}
+
+def _mix(text: str) -> dict:
+    out = {}
+    for part in text.split(","):
+        name, _, w = part.partition("=")
+        if name not in COMMANDS:
+            raise SystemExit(f"unknown command in --mix: {name}")
+        out[name] = float(w or 1)
+    return out
+
+def _pct(values) -> dict:
+    if not len(values):
+        return {"n": 0}
+    ms = np.asarray(values) * 1e3
+    return {"n": len(ms), "p50": round(float(np.percentile(ms, 50)), 1), "p95": round(float(np.percentile(ms, 95)), 1),
+            "p99": round(float(np.percentile(ms, 99)), 1), "max": round(float(ms.max()), 1)}
+
+# ===== المزوّدات البديلة =====
+def install_stubs(fx: fixtures.Fixtures, price_latency: float, options_latency: float, news_latency: float):
+    """يستبدل الاستدعاءات الحاجبة للمزوّدات (تعمل في مجمع EXECUTOR كالأصلية) ببيانات الـ fixtures."""
+    import pandas as pd
+    import data_providers
+    import news
+    import options_provider
+    from bar_store import BAR_STORE
+    from config import CFG
+
+    bars = pd.concat(list(fx.sessions().values()))
+    scale = {CFG["SYMBOL_ETF"]: 0.1, CFG["SYMBOL_FUTURES"]: 1.002}
+
+    def sync_batch(self, symbols, interval):
+        time.sleep(price_latency)
+        for sym in symbols:
+            if BAR_STORE.size(sym, interval) == 0:
+                df = bars.copy()
+                df[["Open", "High", "Low", "Close"]] *= scale.get(sym, 1.0)
+                BAR_STORE.merge(sym, interval, df)
+    data_providers.PriceProvider._sync_batch = sync_batch
+
+    chains = fx.chains()
+    name = next((n for n in chains if n.startswith(CFG["OPTIONS_UNDERLYING"])), next(iter(chains)))
+    raw, spot, _ = chains[name]
+    # انتهاءات الـ fixture تُعاد تسميتها بأيام العمل القادمة (تدويراً إن قلّت) ليجد pick_expiries 0dte/1dte/weekly
+    src = sorted(raw["expiry"].unique())
+    days = pd.bdate_range(pd.Timestamp.now(tz=options_provider.NY).normalize().tz_localize(None), periods=6)
+    relabel = {d.date().isoformat(): src[i % len(src)] for i, d in enumerate(days)}
+
+    def list_expiries(self, tk):
+        time.sleep(options_latency)
+        return tuple(relabel)
+
+    def chain(self, tk, expiry):
+        time.sleep(options_latency)
+        df = raw[raw["expiry"] == relabel[expiry]].copy()
+        df["expiry"] = expiry
+        return df
+
+    def spot_price(self, tk=None):
+        time.sleep(options_latency)
+        return spot
+    options_provider.YFinanceOptionsProvider.list_expiries = list_expiries
+    options_provider.YFinanceOptionsProvider.chain = chain
+    options_provider.YFinanceOptionsProvider.spot_price = spot_price
+
+    items = [x for g in next(iter(fx.news().values())) for x in g]
+
+    def via_yfinance(limit: int = 5):
+        time.sleep(news_latency)
+        return list(items)
+    news._via_yfinance = via_yfinance
+
+# ===== المحادثات (خيط الـ API الوهمي) =====
+async def simulate(api: FakeBotAPI, chats: int, duration: float, mix: dict, think: float,
+                   timeout: float, seed: int) -> dict:
+    names, weights = list(mix), list(mix.values())
+    results = {n: [] for n in names}
+    timeouts = {n: 0 for n in names}
+    deadline = time.monotonic() + duration
+
+    async def chat(cid: int):
+        rnd = random.Random(seed + cid)
+        await asyncio.sleep(rnd.uniform(0, think))  # توزيع البدايات
+        while time.monotonic() < deadline:
+            cmd = rnd.choices(names, weights)[0]
+            try:
+                results[cmd].append(await api.ask(COMMANDS[cmd], cid, timeout))
+            except asyncio.TimeoutError:
+                # رد متأخر قد يُنسب خطأً للأمر التالي — نوقف المحادثة
+                timeouts[cmd] += 1
+                return
+            if think:
+                await asyncio.sleep(rnd.expovariate(1 / think))
+
+    t0 = time.monotonic()
+    await asyncio.gather(*(chat(1000 + i) for i in range(chats)))
+    return {"results": results, "timeouts": timeouts, "wall_s": time.monotonic() - t0}
+
+# ===== البوت (الحلقة الرئيسية) =====
+async def _lag_monitor(interval: float, samples: list, stop: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        t = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(loop.time() - t - interval, 0.0))
+
+async def _run_polling(application, allowed_updates, stop: asyncio.Event):
+    # مثل run_polling لكن داخل الحلقة القائمة
+    await application.initialize()
+    try:
+        await application.post_init(application)
+        await application.updater.start_polling(poll_interval=0, timeout=10, allowed_updates=allowed_updates)
+        await application.start()
+        await stop.wait()
+    finally:
+        if application.updater.running:
+            await application.updater.stop()
+        if application.running:
+            await application.stop()
+        await application.shutdown()
+        await application.post_shutdown(application)
+
+async def run(args, api: FakeBotAPI, api_loop: asyncio.AbstractEventLoop) -> dict:
+    import bot
+    import webserver
+    from config import CFG
+    from metrics import METRICS
+
+    application = bot.build_application(CFG["TELEGRAM_TOKEN"])
+    stop = asyncio.Event()
+    if args.webhook:
+        server = asyncio.create_task(webserver.serve(application, CFG["WEBHOOK"], bot.ALLOWED_UPDATES,
+                                                     bot._health, stop))
+    else:
+        server = asyncio.create_task(_run_polling(application, bot.ALLOWED_UPDATES, stop))
+    # القياس على حالة مستقرة: خط البيانات محمّل ومهام التحديث مثبتة
+    while "warmup" not in application.bot_data:
+        await asyncio.sleep(0.01)
+    await application.bot_data["warmup"]
+    if args.ttl is not None:
+        m = await bot.market()
+        m.INTERVALS = {k: args.ttl for k in m.INTERVALS}
+
+    lag = []
+    monitor = asyncio.create_task(_lag_monitor(args.lag_interval, lag, stop))
+    sim = await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+        simulate(api, args.chats, args.duration, _mix(args.mix), args.think, args.timeout, args.seed), api_loop))
+    stop.set()
+    await monitor
+    await server
+
+    results, timeouts = sim["results"], sim["timeouts"]
+    done = sum(len(v) for v in results.values())
+    return {
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "requests": done,
+        "timeouts": sum(timeouts.values()),
+        "wall_s": round(sim["wall_s"], 2),
+        "throughput_rps": round(done / sim["wall_s"], 2) if sim["wall_s"] else 0.0,
+        "latency_ms": {"all": _pct([x for v in results.values() for x in v]),
+                       **{n: {**_pct(v), "timeouts": timeouts[n]} for n, v in results.items()}},
+        "loop_lag_ms": _pct(lag),
+        "bot": METRICS.collect(),
+    }
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="load test the bot against a fake Bot API and stubbed providers")
+    ap.add_argument("--chats", type=int, default=50)
+    ap.add_argument("--duration", type=float, default=30.0, help="ثوانٍ")
+    ap.add_argument("--mix", default="status=4,chart=2,strike=2,news=2")
+    ap.add_argument("--think", type=float, default=1.0, help="متوسط زمن التفكير بين أوامر المحادثة (ثوانٍ)")
+    ap.add_argument("--timeout", type=float, default=30.0)
+    ap.add_argument("--price-latency", type=float, default=0.3)
+    ap.add_argument("--options-latency", type=float, default=0.8)
+    ap.add_argument("--news-latency", type=float, default=0.5)
+    ap.add_argument("--ttl", type=float, default=None, help="مدة صلاحية STATE لكل load_* (0 = جلب في كل أمر)")
+    ap.add_argument("--webhook", action="store_true", help="وضع الـ webhook بدل الاستطلاع الطويل")
+    ap.add_argument("--lag-interval", type=float, default=0.01)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--fixtures", default=fixtures.FIXTURES_DIR)
+    ap.add_argument("--budget-p95-ms", type=float, default=0, help="يخرج بالرمز 1 إن تجاوز p95 الكلي هذا الحد")
+    ap.add_argument("--out")
+    args = ap.parse_args(argv)
+    warnings.simplefilter("ignore")
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s", level=logging.WARNING)
+
+    api = FakeBotAPI()
+    api_loop = asyncio.new_event_loop()
+    threading.Thread(target=api_loop.run_forever, daemon=True).start()
+    base = asyncio.run_coroutine_threadsafe(api.start(), api_loop).result()
+
+    # config يقرأ البيئة عند أول استيراد
+    os.environ.update(TELEGRAM_BOT_TOKEN="123456:LOADTEST", TELEGRAM_API_URL=base, METRICS_PORT="0",
+                      DATA_DIR=tempfile.mkdtemp(prefix="loadtest-"))
+    if args.webhook:
+        from bench.coldstart import free_port
+        port = free_port()
+        os.environ.update(WEBHOOK_URL=f"http://127.0.0.1:{port}", WEBHOOK_HOST="127.0.0.1",
+                          WEBHOOK_PORT=str(port), WEBHOOK_SECRET="loadtest")
+    else:
+        os.environ.pop("WEBHOOK_URL", None)
+    install_stubs(fixtures.load(args.fixtures), args.price_latency, args.options_latency, args.news_latency)
+
+    report = asyncio.run(run(args, api, api_loop))
+    asyncio.run_coroutine_threadsafe(api.stop(), api_loop).result()
+    api_loop.call_soon_threadsafe(api_loop.stop)
+
+    lat = report["latency_ms"]
+    print(f"{report['requests']} requests in {report['wall_s']} s = {report['throughput_rps']} req/s, "
+          f"{report['timeouts']} timeouts", file=sys.stderr)
+    for name, r in lat.items():
+        if r["n"]:
+            print(f"{name:8s} n={r['n']:5d}  p50 {r['p50']:8.1f}  p95 {r['p95']:8.1f}  p99 {r['p99']:8.1f} ms",
+                  file=sys.stderr)
+    lag = report["loop_lag_ms"]
+    if lag["n"]:
+        print(f"loop lag p50 {lag['p50']} p99 {lag['p99']} max {lag['max']} ms", file=sys.stderr)
+
+    text = json.dumps(report, indent=2, default=float)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.budget_p95_ms and lat["all"].get("p95", 0) > args.budget_p95_ms:
+        print(f"p95 {lat['all']['p95']:.0f} ms exceeds budget {args.budget_p95_ms:.0f} ms", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+تسجيل بيانات حقيقية للقياس (يحتاج شبكة):
+    python -m bench.record [--out bench/recordings] [--expiries 10]
+- جلسات 1m لآخر 5 أيام لـ SYMBOL_INDEX.
+- سلاسل SPY و ^SPX: خُمس أقرب انتهاء حول السعر (small)، أقرب انتهاء كاملاً (medium)، وعدة انتهاءات (large).
+- أخبار yfinance لـ SPY و ^GSPC (و Finnhub إن وُجد مفتاح).
+"""
+import argparse
+import gzip
+import json
+import os
+import time
+import pandas as pd
+import yfinance as yf
+
+from config import CFG
+from options_provider import _years_to_close
+from bench.fixtures import CHAIN_COLUMNS, RECORDINGS_DIR, Fixtures, write_manifest
+
+def record_sessions(path: str, manifest: dict):
+    df = yf.download(CFG["SYMBOL_INDEX"], period="5d", interval="1m", progress=False, auto_adjust=False)
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    df = df[["Open", "High", "Low", "Close", "Volume"]].dropna(subset=["Close"])
+    df.index = df.index.tz_convert(manifest["tz"])
+    for day, part in df.groupby(df.index.tz_convert("America/New_York").date):
+        name = day.isoformat()
+        fn = f"bars_{name}.csv.gz"
+        part.to_csv(os.path.join(path, fn))
+        manifest["sessions"][name] = fn
+
+def _raw_chain(tk: yf.Ticker, symbol: str, expiry: str) -> pd.DataFrame:
+    chain = tk.option_chain(expiry)
+    parts = []
+    for df, side in ((chain.calls, "CALL"), (chain.puts, "PUT")):
+        df = df.rename(columns=str.lower)
+        parts.append(pd.DataFrame({
+            "symbol": symbol, "strike": df["strike"].astype(float), "side": side,
+            "bid": df["bid"].fillna(0.0).astype(float), "ask": df["ask"].fillna(0.0).astype(float),
+            "volume": df["volume"].fillna(0).astype(int), "oi": df["openinterest"].fillna(0).astype(int),
+            "expiry": expiry, "iv": df["impliedvolatility"].astype(float),
+            "lastprice": df["lastprice"].astype(float),
+        }))
+    out = pd.concat(parts, ignore_index=True)
+    # نفس تصفية options_chain_df
+    return out[(out["ask"] >= out["bid"]) & (out["ask"] > 0)][CHAIN_COLUMNS]
+
+def record_chains(path: str, manifest: dict, expiries: int):
+    t_years = _years_to_close()
+    for symbol in ("SPY", "^SPX"):
+        tk = yf.Ticker(symbol)
+        opts = list(tk.options or [])
+        if not opts:
+            continue
+        spot = tk.fast_info.get("last_price")
+        if spot is None:
+            spot = float(tk.history(period="1d")["Close"].iloc[-1])
+        first = _raw_chain(tk, symbol, opts[0])
+        dist = (first["strike"] - spot).abs()
+        sizes = {
+            "small": first[dist <= dist.quantile(0.2)],
+            "medium": first,
+            "large": pd.concat([first] + [_raw_chain(tk, symbol, e) for e in opts[1:expiries]], ignore_index=True),
+        }
+        for size, df in sizes.items():
+            name = f"{symbol.lstrip('^')}_{size}"
+            fn = f"chain_{name}.csv.gz"
+            df.to_csv(os.path.join(path, fn), index=False)
+            manifest["chains"][name] = {"file": fn, "spot": float(spot), "t_years": t_years}
+
+def record_news(path: str, manifest: dict):
+    from news import _via_yfinance
+    groups = [_via_yfinance()]
+    key = CFG["API_KEYS"].get("finnhub", "")
+    if key:
+        import requests
+        js = requests.get("https://finnhub.io/api/v1/news",
+                          params={"category": "general", "token": key}, timeout=10).json()
+        groups.append([{"title": x.get("headline", ""), "source": x.get("source", ""),
+                        "url": x.get("url", ""), "ts": x.get("datetime") or 0} for x in js])
+    fn = "news_live.json.gz"
+    with gzip.open(os.path.join(path, fn), "wt", encoding="utf-8") as f:
+        json.dump(groups, f, ensure_ascii=False)
+    manifest["news"]["live"] = fn
+
+def main():
+    ap = argparse.ArgumentParser(description="record live market fixtures for bench.run")
+    ap.add_argument("--out", default=RECORDINGS_DIR, help="bench/fixtures لاستبدال المجموعة المشتركة")
+    ap.add_argument("--expiries", type=int, default=10, help="عدد الانتهاءات في السلسلة الكبيرة")
+    args = ap.parse_args()
+    os.makedirs(args.out, exist_ok=True)
+    manifest = {"kind": "recorded", "recorded_at": int(time.time()), "tz": CFG["TZ"],
+                "sessions": {}, "chains": {}, "news": {}}
+    record_sessions(args.out, manifest)
+    record_chains(args.out, manifest, args.expiries)
+    record_news(args.out, manifest)
+    write_manifest(args.out, manifest)
+    fx = Fixtures(args.out)
+    print(f"recorded {len(fx.manifest['sessions'])} sessions, {len(fx.manifest['chains'])} chains, "
+          f"{len(fx.manifest['news'])} news payloads to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+تشغيل القياسات على بيانات bench/fixtures (تُولَّد اصطناعياً إن لم تُسجَّل):
+    python -m bench.run [--out results.json] [--baseline bench/baseline.json] [--save-baseline]
+                        [--threshold 0.25] [--filter greeks] [--min-time 0.3]
+- الناتج JSON: meta + results (median/min/p95/mean بالمللي ثانية لكل حالة).
+- مع --baseline: مقارنة الوسيط بخط الأساس؛ نسبة > 1 + threshold تُعد تراجعاً ويخرج البرنامج بالرمز 1.
+  عتبات خاصة لكل حالة توضع في baseline["thresholds"] = {"اسم الحالة": 0.5}.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+import warnings
+from dataclasses import dataclass
+from typing import Callable, Optional
+import numpy as np
+import pandas as pd
+
+import bench.fixtures as fixtures
+
+@dataclass
+class Case:
+    name: str
+    fn: Callable
+    setup: Optional[Callable] = None  # يُستدعى قبل كل تشغيل خارج التوقيت ويعيد وسيطات fn
+    items: int = 1                    # عدد العناصر في التشغيل الواحد (لحساب الزمن لكل عنصر)
+    max_runs: int = 1000
+
+def _hour(df: pd.DataFrame) -> pd.DataFrame:
+    return df.resample("60min").agg({"Open": "first", "High": "max", "Low": "min",
+                                     "Close": "last", "Volume": "sum"}).dropna()
+
+def build_cases(fx: fixtures.Fixtures) -> list:
+    from market import compute_setup
+    import data_providers
+    from indicators import pivot_points, swing_levels
+    from charting import ChartTemplate, plot_hourly_with_targets
+    from options import ChainSnapshot, pick_best_strike
+    from options_provider import add_greeks
+    from news import FinnhubIngester, merge_items
+
+    sessions = fx.sessions()
+    days = list(sessions.values())
+    all_1m = pd.concat(days)
+    cases = []
+
+    # ===== الأسعار والمؤشرات =====
+    cases.append(Case("compute_setup", lambda: [compute_setup(d) for d in days], items=len(days)))
+
+    loop = asyncio.new_event_loop()
+    # نافذة fetch_prices الفعلية (get_recent بـ lookback 600 ⇒ 1800 شمعة)
+    tail = all_1m.tail(1800)
+    cases.append(Case("compact_timeframes",
+                      lambda: loop.run_until_complete(data_providers.compact_timeframes(tail))))
+
+    closes = [d["Close"] for d in days]
+    for lb in (50, 200):
+        cases.append(Case(f"swing_levels/lb{lb}",
+                          lambda lb=lb: [swing_levels(c, lookback=lb) for c in closes], items=len(closes)))
+
+    hlc = [(float(d["High"].max()), float(d["Low"].min()), float(d["Close"].iloc[-1])) for d in days]
+    cases.append(Case("pivot_points", lambda: [pivot_points(*x) for x in hlc], items=len(hlc)))
+
+    # ===== الخيارات =====
+    for name, (raw, spot, t_years) in fx.chains().items():
+        cases.append(Case(f"greeks/{name}", lambda df, s=spot, t=t_years: add_greeks(df, s, t),
+                          setup=lambda raw=raw: (raw.copy(),), items=len(raw)))
+        chain = add_greeks(raw.copy(), spot, t_years)
+        cases.append(Case(f"pick_best_strike/{name}", lambda c=chain, s=spot: pick_best_strike(c, s),
+                          items=len(chain)))
+        cases.append(Case(f"chain_snapshot/build/{name}", lambda c=chain: ChainSnapshot.from_df(c),
+                          items=len(chain)))
+        snap = ChainSnapshot.from_df(chain)
+        bands = [(0.10 + 0.05 * i, 0.25 + 0.05 * i) for i in range(5)]
+        cases.append(Case(f"chain_snapshot/query/{name}",
+                          lambda sn=snap, s=spot: [sn.best(s, dmin=a, dmax=b) for a, b in bands],
+                          items=len(bands)))
+
+    # ===== الشارت =====
+    df_h = _hour(all_1m)
+    last = float(df_h["Close"].iloc[-1])
+    targets = [last * 1.005, last * 1.01, last * 1.015]
+    stop = last * 0.99
+    cases.append(Case("plot_hourly_with_targets",
+                      lambda: plot_hourly_with_targets(df_h, targets, stop), max_runs=50))
+    template = ChartTemplate(str(df_h.index.tz))
+    args = (df_h.index.asi8.copy(), df_h["Close"].to_numpy(dtype=float),
+            df_h["High"].to_numpy(dtype=float), df_h["Low"].to_numpy(dtype=float))
+    cases.append(Case("chart_template",
+                      lambda: template.render(*args, targets, stop, "SPX H1"), max_runs=50))
+
+    # ===== الأخبار =====
+    for name, groups in fx.news().items():
+        n = sum(len(g) for g in groups)
+        cases.append(Case(f"merge_items/{name}", lambda g=groups: merge_items(g), items=n))
+        texts = [x["title"] for g in groups for x in g]
+        cases.append(Case(f"keyword_match/{name}",
+                          lambda t=texts: [FinnhubIngester.match(x) for x in t], items=n))
+    return cases
+
+def measure(case: Case, min_time: float, min_runs: int = 5) -> dict:
+    args = case.setup() if case.setup else ()
+    case.fn(*args)  # تسخين (استيرادات كسولة، كاشات داخلية)
+    samples = []
+    spent = 0.0
+    while len(samples) < case.max_runs and (len(samples) < min_runs or spent < min_time):
+        args = case.setup() if case.setup else ()
+        t0 = time.perf_counter()
+        case.fn(*args)
+        dt = time.perf_counter() - t0
+        samples.append(dt)
+        spent += dt
+    ms = np.asarray(samples) * 1e3
+    median = float(np.median(ms))
+    return {
+        "median_ms": round(median, 4),
+        "min_ms": round(float(ms.min()), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "mean_ms": round(float(ms.mean()), 4),
+        "runs": len(samples),
+        "items": case.items,
+        "per_item_us": round(median * 1e3 / case.items, 3),
+    }
+
+def compare(results: dict, baseline: dict, threshold: float) -> dict:
+    """حالة كل قياس مقابل خط الأساس: ok / regression / improved / new."""
+    base = baseline.get("results", {})
+    thresholds = baseline.get("thresholds", {})
+    out = {}
+    for name, r in results.items():
+        b = base.get(name)
+        if not b:
+            out[name] = {"status": "new"}
+            continue
+        thr = float(thresholds.get(name, threshold))
+        ratio = r["median_ms"] / b["median_ms"] if b["median_ms"] > 0 else float("inf")
+        status = "regression" if ratio > 1 + thr else "improved" if ratio < 1 - thr else "ok"
+        out[name] = {"status": status, "baseline_ms": b["median_ms"], "ratio": round(ratio, 3), "threshold": thr}
+    return out
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="benchmark hot paths on recorded fixtures")
+    ap.add_argument("--fixtures", default=fixtures.FIXTURES_DIR)
+    ap.add_argument("--out", help="ملف JSON للنتائج (الافتراضي stdout)")
+    ap.add_argument("--baseline", help="ملف نتائج سابق للمقارنة")
+    ap.add_argument("--save-baseline", action="store_true", help="كتابة النتائج في ملف --baseline")
+    ap.add_argument("--threshold", type=float, default=0.25, help="أقصى تباطؤ نسبي مسموح (0.25 = 25%%)")
+    ap.add_argument("--filter", default="", help="تشغيل الحالات التي يحتوي اسمها هذا النص فقط")
+    ap.add_argument("--min-time", type=float, default=0.3, help="أقل زمن قياس لكل حالة (ثوانٍ)")
+    args = ap.parse_args(argv)
+    # تحذيرات pandas/numpy المتكررة داخل حلقات القياس تشوّه الأزمنة والمخرجات
+    warnings.simplefilter("ignore")
+
+    fx = fixtures.load(args.fixtures)
+    cases = [c for c in build_cases(fx) if args.filter in c.name]
+    results = {}
+    for case in cases:
+        results[case.name] = measure(case, args.min_time)
+        r = results[case.name]
+        print(f"{case.name:40s} {r['median_ms']:10.3f} ms  (p95 {r['p95_ms']:.3f}, n={r['runs']})", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "timestamp": int(time.time()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "fixtures": fx.kind,
+        },
+        "results": results,
+    }
+    code = 0
+    if args.baseline and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("fixtures") != fx.kind:
+            print("warning: baseline was measured on different fixtures", file=sys.stderr)
+        report["comparison"] = compare(results, baseline, args.threshold)
+        bad = [n for n, c in report["comparison"].items() if c["status"] == "regression"]
+        for n in bad:
+            c = report["comparison"][n]
+            print(f"REGRESSION {n}: {c['ratio']:.2f}x baseline ({c['baseline_ms']} ms)", file=sys.stderr)
+        code = 1 if bad else 0
+
+    text = json.dumps(report, indent=2)
+    if args.save_baseline and args.baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            f.write(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    elif not args.save_baseline:
+        print(text)
+    return code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,74 +3,74 @@
 # يرسل ملخص/شارت ساعة/أخبار/ترشيح Strike 0DTE
 # يعتمد yfinance للسعر والخيارات (SPY) في التطوير المجاني
 
-import pandas as pd
-from datetime import datetime
-from zoneinfo import ZoneInfo
+import time
+_T0 = time.perf_counter()  # بداية الإقلاع (لقياس مراحله)
+
+import asyncio
+import importlib
+import logging
 from telegram import Update
-from telegram.ext import Application, CommandHandler, ContextTypes
+from telegram.error import BadRequest
+from telegram.ext import Application, CommandHandler, ContextTypes, TypeHandler
 
 from config import CFG
-from data_providers import PriceProvider, compact_timeframes
-from indicators import rsi, macd
-from charting import plot_hourly_with_targets
-from options import pick_best_strike
-from news import fetch_top_news
-from utils import now_local
+from utils import now_local, market_open_now_riyadh
+from executor import EXECUTOR
+from state import STATE, RESPONSES
+from scheduler import install_refresh_jobs
+from subscriptions import SUBSCRIBERS
+from broadcast import BROADCAST
+from metrics import METRICS
+
+log = logging.getLogger(__name__)
 
 INDEX_SYMBOL = CFG["SYMBOL_INDEX"]  # ^GSPC افتراضياً
+# كل المعالجات أوامر نصية — لا داعي لاستلام بقية أنواع التحديثات (edited_message, callback_query, ...)
+ALLOWED_UPDATES = [Update.MESSAGE]
+
+# أزمنة مراحل الإقلاع بالمللي ثانية (تظهر في السجل و /metrics)
+STARTUP = {"imports_ms": (time.perf_counter() - _T0) * 1000}
+
+METRICS.register("startup", lambda: dict(STARTUP))
+METRICS.register("state", STATE.stats)
+METRICS.register("responses", RESPONSES.stats)
+METRICS.register("broadcast", lambda: {"sent": BROADCAST.sent, "failed": BROADCAST.failed,
+                                       "throttled": BROADCAST.throttled, "backlog": BROADCAST.backlog(),
+                                       "subscribers": len(SUBSCRIBERS)})
+
+# ========= تحميل كسول لخط البيانات =========
+# market.py يجرّ pandas/matplotlib/yfinance/aiohttp (~1.5 ثانية). يُستورد في خيط بعد أن يبدأ
+# البوت بالرد؛ الأوامر التي تحتاجه تنتظر نفس المهمة دون حجب الحلقة.
+_MARKET = None
+
+def _load_market():
+    m = importlib.import_module("market")
+    if CFG["SNAPSHOT"]["interval"]:
+        # اللقطة تُستعاد قبل أن يصل أي أمر إلى خط البيانات
+        try:
+            import snapshot
+            METRICS.register("snapshot", lambda: dict(snapshot.STATS))
+            snapshot.restore_file()
+        except Exception:
+            log.exception("snapshot restore failed")
+    return m
 
-# ========= Helpers =========
-def market_open_now_riyadh() -> bool:
-    """
-    تقدير بسيط لساعات السوق الأمريكي بتوقيت الرياض:
-    الإثنين-الجمعة 16:30–23:00 (قد يتأثر بالتوقيت الصيفي، لكنها كافية للتنبيه).
-    """
-    tz = ZoneInfo(CFG["TZ"])
-    now = datetime.now(tz)
-    if now.weekday() >= 5:  # 5=السبت, 6=الأحد
-        return False
-    hm = now.hour * 100 + now.minute
-    return 1630 <= hm <= 2305
-
-async def fetch_prices():
-    async with PriceProvider() as prov:
-        # نجلب 1m مع فترة واسعة ليظهر آخر جلسة حتى لو السوق مغلق
-        df_1m = await prov.get_recent(INDEX_SYMBOL, interval="1m", lookback_minutes=600)
-        packs = await compact_timeframes(df_1m)
-        return packs
-
-def compute_setup(df_1m: pd.DataFrame):
-    if df_1m.empty or len(df_1m) < 50:
-        return None
-    close = df_1m['Close']
-    r = rsi(close)
-    m, s, _ = macd(close)
-    last = close.iloc[-1]
-
-    t1 = last * (1 + CFG['RISK']['t1'])
-    t2 = last * (1 + CFG['RISK']['t2'])
-    t3 = last * (1 + CFG['RISK']['t3'])
-    sl = last * (1 - CFG['RISK']['stop'])
-
-    bias = "محايد"
-    if m.iloc[-1] > s.iloc[-1] and r.iloc[-1] > 55:
-        bias = "صاعد"
-    elif m.iloc[-1] < s.iloc[-1] and r.iloc[-1] < 45:
-        bias = "هابط"
-
-    return {
-        "price": float(last),
-        "targets": [float(t1), float(t2), float(t3)],
-        "stop": float(sl),
-        "bias": bias
-    }
-
-async def make_chart(df_1m: pd.DataFrame, targets: list, stop: float) -> bytes:
-    # شارت ساعة مجمّع من 1m (سيُظهر آخر جلسة عند إغلاق السوق)
-    df_h = df_1m.resample('60T').agg({
-        'Open':'first','High':'max','Low':'min','Close':'last','Volume':'sum'
-    }).dropna()
-    return plot_hourly_with_targets(df_h, targets, stop, title="SPX H1 — Targets & S/R")
+def _market_task() -> asyncio.Future:
+    global _MARKET
+    if _MARKET is None:
+        _MARKET = asyncio.ensure_future(asyncio.to_thread(_load_market))
+    return _MARKET
+
+async def market():
+    return await asyncio.shield(_market_task())
+
+def _health() -> dict:
+    return {"market_loaded": _MARKET is not None and _MARKET.done() and not _MARKET.cancelled()
+                             and _MARKET.exception() is None,
+            "subscribers": len(SUBSCRIBERS)}
+
+def _risk_key() -> tuple:
+    return tuple(sorted(CFG["RISK"].items()))
 
 # ========= Commands =========
 async def cmd_start(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
@@ -82,13 +82,27 @@ async def cmd_start(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
         "/status — ملخص السوق\n"
         "/chart — شارت الساعة مع الأهداف\n"
         "/news — أهم الأخبار المؤثرة (مثال: /news ar)\n"
-        "/strike — اختيار Strike (0DTE) إرشادي"
+        "/strike — اختيار Strike إرشادي 0DTE/1DTE/أسبوعي (مثال: /strike weekly 0.15 0.25)\n"
+        "/scan — ترتيب الأصول حسب قوة الإشارة (مثال: /scan 5)\n"
+        "/subscribe — تفعيل التنبيهات الفورية\n"
+        "/unsubscribe — إيقاف التنبيهات"
     )
 
+async def cmd_subscribe(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    if SUBSCRIBERS.add(update.effective_chat.id):
+        await update.message.reply_text("✅ تم الاشتراك في التنبيهات (انقلاب الانحياز، الأهداف/الوقف، كسر المستويات).")
+    else:
+        await update.message.reply_text("أنت مشترك بالفعل. لإيقاف التنبيهات: /unsubscribe")
+
+async def cmd_unsubscribe(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    if SUBSCRIBERS.remove(update.effective_chat.id):
+        await update.message.reply_text("تم إلغاء الاشتراك في التنبيهات.")
+    else:
+        await update.message.reply_text("لست مشتركاً في التنبيهات.")
+
+@METRICS.command("status")
 async def cmd_status(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
-    packs = await fetch_prices()
-    df1 = packs.get('1m', pd.DataFrame())
-    st = compute_setup(df1)
+    packs, st = await (await market()).load_setup()
     if not st:
         await update.message.reply_text(
             "لا تتوفر بيانات كافية الآن.\n"
@@ -97,84 +111,253 @@ async def cmd_status(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
         return
 
     note = "" if market_open_now_riyadh() else "ℹ️ السوق قد يكون مغلقًا الآن — هذه البيانات من آخر جلسة."
-    targets_str = ", ".join([f"T{i+1}:{t:.2f}" for i, t in enumerate(st['targets'])])
+    src = packs['1m'].attrs.get("source", INDEX_SYMBOL)
+    # جسم الرد ثابت ما دامت الشمعة وإغلاقها (وصف الأساس) نفسها؛ الوقت والملاحظة فقط يتغيران مع كل طلب
+    al = packs.get("aligned")
+    basis_key = tuple(al.iloc[-1].tolist()) if al is not None and not al.empty else None
+    key = ("status", st["bar"], basis_key, src, _risk_key())
+    body = RESPONSES.get(key)
+    if body is None:
+        targets_str = ", ".join([f"T{i+1}:{t:.2f}" for i, t in enumerate(st['targets'])])
+        src_note = f" ({src})" if src != INDEX_SYMBOL else ""
+        basis = ""
+        if basis_key is not None:
+            b = al.iloc[-1]
+            basis = f"📐 أساس {CFG['SYMBOL_FUTURES']}−{INDEX_SYMBOL}: {b.iloc[1] - b.iloc[0]:+.2f}\n"
+        body = (
+            f"📈 السعر: {st['price']:.2f}{src_note}\n"
+            f"🎯 الأهداف: {targets_str}\n"
+            f"🛡 وقف الخسارة: {st['stop']:.2f}\n"
+            f"📊 الانحياز: {st['bias']}\n"
+            f"{basis}"
+        )
+        RESPONSES.put(key, body)
     text = (
         f"{note}\n"
         f"⏱ {now_local():%Y-%m-%d %H:%M} ({CFG['TZ']})\n"
-        f"📈 السعر: {st['price']:.2f}\n"
-        f"🎯 الأهداف: {targets_str}\n"
-        f"🛡 وقف الخسارة: {st['stop']:.2f}\n"
-        f"📊 الانحياز: {st['bias']}\n"
+        f"{body}"
     ).strip()
-    await update.message.reply_text(text)
+    with METRICS.phase("send"):
+        await update.message.reply_text(text)
 
+@METRICS.command("chart")
 async def cmd_chart(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
-    packs = await fetch_prices()
-    df1 = packs.get('1m', pd.DataFrame())
-    st = compute_setup(df1)
-    if not st:
+    chart = await (await market()).load_chart()
+    if chart is None:
         await update.message.reply_text("لا تتوفر بيانات كافية الآن لعرض الشارت.")
         return
-    img_bytes = await make_chart(df1, st['targets'], st['stop'])
+    img_bytes, bar = chart
     caption = "شارت الساعة مع الأهداف و S/R"
     if not market_open_now_riyadh():
         caption += " — ℹ️ بيانات من آخر جلسة (السوق مغلق الآن)"
-    await update.message.reply_photo(photo=img_bytes, caption=caption)
+    # بعد أول رفع للصورة نفسها يعيد تيليجرام file_id؛ الطلبات التالية ترسله بدل البايتات
+    key = ("chart", bar, _risk_key())
+    file_id = RESPONSES.get(key)
+    with METRICS.phase("send"):
+        if file_id is not None:
+            try:
+                await update.message.reply_photo(photo=file_id, caption=caption)
+                return
+            except BadRequest:
+                log.warning("cached chart file_id rejected, re-uploading")
+                RESPONSES.discard(key)
+        msg = await update.message.reply_photo(photo=img_bytes, caption=caption)
+    if msg.photo:
+        RESPONSES.put(key, msg.photo[-1].file_id)
 
+@METRICS.command("news")
 async def cmd_news(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     # صيغة: /news [lang]  -> مثال: /news ar
     msg_text = (update.message.text or "").strip()
     parts = msg_text.split()
     lang = parts[1].lower() if len(parts) > 1 else "en"
-    items = await fetch_top_news(limit=5, lang=lang)
-    await update.message.reply_text("\n\n".join(items))
+    items = await (await market()).load_news(lang)
+    with METRICS.phase("send"):
+        await update.message.reply_text("\n\n".join(items))
+
+_TENORS = {"0dte": "0dte", "1dte": "1dte", "weekly": "weekly", "w": "weekly"}
 
+@METRICS.command("strike")
 async def cmd_strike(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
     # يعتمد على yfinance/SPY في options_provider.py — يعمل أفضل خلال ساعات السوق
+    # صيغة: /strike [0dte|1dte|weekly] [dmin dmax]  -> مثال: /strike weekly 0.15 0.25
+    parts = (update.message.text or "").split()[1:]
+    tenor = "0dte"
+    if parts and parts[0].lower() in _TENORS:
+        tenor = _TENORS[parts.pop(0).lower()]
+    dmin, dmax = CFG['OPT']['dmin'], CFG['OPT']['dmax']
+    if parts:
+        try:
+            dmin, dmax = float(parts[0]), float(parts[1])
+            if not 0 <= dmin <= dmax <= 1:
+                raise ValueError
+        except (ValueError, IndexError):
+            await update.message.reply_text("الصيغة: /strike [0dte|1dte|weekly] [dmin dmax] — مثال: /strike weekly 0.15 0.25 (0 ≤ dmin ≤ dmax ≤ 1)")
+            return
     try:
-        from options_provider import YFinanceOptionsProvider
-    except Exception:
+        chains, price, expiries = await (await market()).load_chain()
+        if not chains:
+            await update.message.reply_text("تعذر جلب سلاسل الخيارات حالياً — جرّب أثناء السوق.")
+            return
+    except ImportError:
         await update.message.reply_text("المزوّد غير متاح. تأكد من وجود options_provider.py.")
         return
-
-    prov = YFinanceOptionsProvider(CFG.get("OPTIONS_UNDERLYING", "SPY"))
-    df = prov.options_chain_df()
-    if df is None or df.empty:
-        await update.message.reply_text("تعذر جلب سلاسل الخيارات حالياً — جرّب أثناء السوق.")
+    except asyncio.TimeoutError:
+        await update.message.reply_text("انتهت مهلة مزوّد الخيارات — جرّب بعد قليل.")
+        return
+    snap = chains.get(tenor)
+    if snap is None or snap.empty:
+        await update.message.reply_text(f"لا توجد سلسلة {tenor} حالياً. المتاح: {' / '.join(chains)}")
         return
-    price = prov.spot_price()
 
-    best = pick_best_strike(
-        df, price,
-        dmin=CFG['OPT']['dmin'], dmax=CFG['OPT']['dmax'],
-        max_spread=CFG['OPT']['max_spread'], min_vol=CFG['OPT']['min_vol'], min_oi=CFG['OPT']['min_oi']
-    )
+    with METRICS.phase("compute"):
+        best = snap.best(
+            price, dmin=dmin, dmax=dmax,
+            max_spread=CFG['OPT']['max_spread'], min_vol=CFG['OPT']['min_vol'], min_oi=CFG['OPT']['min_oi']
+        )
 
     def fmt(c):
         if c is None: return "—"
         return f"{c.side} {c.strike} | Δ={c.delta:.2f} | bid/ask={c.bid:.2f}/{c.ask:.2f} | vol/oi={c.volume}/{c.oi}"
 
     msg = (
-        f"💡 أفضل Strike (0DTE) إرشادي عند سعر {price:.2f} ({CFG.get('OPTIONS_UNDERLYING','SPY')}):\n"
+        f"💡 أفضل Strike ({tenor.upper()} — انتهاء {expiries[tenor]}) إرشادي عند سعر {price:.2f} ({CFG.get('OPTIONS_UNDERLYING','SPY')}):\n"
         f"Calls: {fmt(best.call)}\n"
         f"Puts:  {fmt(best.put)}\n"
+        f"نطاق Δ: {dmin:.2f}–{dmax:.2f}\n"
         "\n⚠️ المصدر: yfinance (سلاسل SPY). للانتقال إلى Polygon/Finnhub أضف مفتاح API وعدّل OPTIONS_PROVIDER."
     )
-    await update.message.reply_text(msg)
+    with METRICS.phase("send"):
+        await update.message.reply_text(msg)
 
-def main():
-    token = CFG["TELEGRAM_TOKEN"]
-    if not token:
-        raise SystemExit("ضع TELEGRAM_BOT_TOKEN في .env")
-    application = Application.builder().token(token).build()
+@METRICS.command("scan")
+async def cmd_scan(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    # صيغة: /scan [n]  -> أقوى n أصول فقط
+    parts = (update.message.text or "").split()[1:]
+    top = int(parts[0]) if parts and parts[0].isdigit() else None
+    m = await market()
+    res = await m.load_scan()
+    if res.empty:
+        await update.message.reply_text("لا تتوفر بيانات كافية الآن للمسح.")
+        return
+    with METRICS.phase("send"):
+        await update.message.reply_text(m.format_scan(res, top))
+
+async def cmd_metrics(update: Update, ctx: ContextTypes.DEFAULT_TYPE):
+    # للمشرف فقط (TELEGRAM_ADMIN_ID) — لا رد لغيره
+    admin = CFG["TELEGRAM_ADMIN"]
+    if not admin or update.effective_user is None or update.effective_user.id != admin:
+        return
+    await update.message.reply_text(METRICS.summary())
+
+async def _first_update(update: object, ctx: ContextTypes.DEFAULT_TYPE):
+    if "first_update_ms" not in STARTUP:
+        STARTUP["first_update_ms"] = (time.perf_counter() - _T0) * 1000
+        log.info("first update after %.0f ms", STARTUP["first_update_ms"])
+
+async def _warmup(application: Application):
+    """بعد بدء الاستطلاع: استيراد خط البيانات، تسخين عمال الشارت، خادم المقاييس، ومهام التحديث."""
+    t0 = time.perf_counter()
+    try:
+        m = await market()
+    except Exception:
+        log.exception("market pipeline failed to load")
+        return
+    STARTUP["warm_import_ms"] = (time.perf_counter() - t0) * 1000
+    t1 = time.perf_counter()
+    m.RENDERER.start()
+    if not CFG["WEBHOOK"]["url"] and CFG["METRICS"]["port"]:
+        # وضع الاستطلاع: /healthz و /metrics فقط (في وضع الـ webhook يخدمهما خادم الـ webhook نفسه)
+        import webserver
+        application.bot_data["web_server"] = await webserver.start(
+            webserver.web_app(application, status=_health), CFG["METRICS"]["host"], CFG["METRICS"]["port"])
+    install_refresh_jobs(application, {
+        "fast": m.refresh_fast,
+        "med": lambda: m.load_chain(force=True),
+        "slow": m.refresh_news,
+        "chart": lambda: m.load_chart(force=True),
+    })
+    interval = CFG["SNAPSHOT"]["interval"]
+    if interval and application.job_queue is not None:
+        application.job_queue.run_repeating(_save_snapshot, interval=interval, first=interval, name="snapshot")
+    STARTUP["warm_services_ms"] = (time.perf_counter() - t1) * 1000
+    STARTUP["warm_total_ms"] = (time.perf_counter() - _T0) * 1000
+    log.info("warm-up done: %s", ", ".join(f"{k}={v:.0f}" for k, v in STARTUP.items()))
+
+async def _save_snapshot(ctx: ContextTypes.DEFAULT_TYPE = None):
+    import snapshot
+    try:
+        await snapshot.save()
+    except Exception:
+        log.exception("snapshot save failed")
+
+async def _startup(application: Application):
+    t0 = time.perf_counter()
+    BROADCAST.on_blocked = SUBSCRIBERS.remove
+    BROADCAST.start(application.bot)
+    # التسخين في الخلفية: /start و /subscribe يعملان فوراً
+    application.bot_data["warmup"] = asyncio.create_task(_warmup(application))
+    STARTUP["post_init_ms"] = (time.perf_counter() - t0) * 1000
+    STARTUP["ready_ms"] = (time.perf_counter() - _T0) * 1000
+    log.info("startup: %s", ", ".join(f"{k}={v:.0f}" for k, v in STARTUP.items()))
+
+async def _shutdown(application: Application):
+    warm = application.bot_data.get("warmup")
+    if warm is not None and not warm.done():
+        warm.cancel()
+    server = application.bot_data.get("web_server")
+    if server is not None:
+        await server.cleanup()
+    await BROADCAST.stop()
+    if _health()["market_loaded"]:
+        m = _MARKET.result()
+        if CFG["SNAPSHOT"]["interval"]:
+            await _save_snapshot()
+        from news import close_session
+        await close_session()
+        m.RENDERER.shutdown()
+    EXECUTOR.shutdown()
+
+def build_application(token: str) -> Application:
+    """التطبيق بكل معالجاته دون تشغيله (يستخدمه main و bench.loadtest)."""
+    webhook = CFG["WEBHOOK"]
+    builder = (Application.builder().token(token).post_init(_startup).post_shutdown(_shutdown)
+               .concurrent_updates(CFG["UPDATES_CONCURRENCY"]))
+    if CFG["TELEGRAM_API_URL"]:
+        builder = builder.base_url(CFG["TELEGRAM_API_URL"])
+    if webhook["url"]:
+        builder = builder.updater(None)
+    application = builder.build()
+
+    application.add_handler(TypeHandler(Update, _first_update), group=-1)
 
     application.add_handler(CommandHandler("start", cmd_start))
     application.add_handler(CommandHandler("status", cmd_status))
     application.add_handler(CommandHandler("chart", cmd_chart))
     application.add_handler(CommandHandler("news", cmd_news))
     application.add_handler(CommandHandler("strike", cmd_strike))
+    application.add_handler(CommandHandler("scan", cmd_scan))
+    application.add_handler(CommandHandler("subscribe", cmd_subscribe))
+    application.add_handler(CommandHandler("unsubscribe", cmd_unsubscribe))
+    application.add_handler(CommandHandler("metrics", cmd_metrics))
+    return application
+
+def main():
+    token = CFG["TELEGRAM_TOKEN"]
+    if not token:
+        raise SystemExit("ضع TELEGRAM_BOT_TOKEN في .env")
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s", level=logging.INFO)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    t0 = time.perf_counter()
+    application = build_application(token)
+    STARTUP["build_ms"] = (time.perf_counter() - t0) * 1000
 
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    webhook = CFG["WEBHOOK"]
+    if webhook["url"]:
+        from webserver import run_webhook
+        run_webhook(application, webhook, ALLOWED_UPDATES, status=_health)
+    else:
+        application.run_polling(allowed_updates=ALLOWED_UPDATES)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,166 @@
+"""
+طابور إرسال جماعي يحترم حدود تيليجرام:
+- حد عام (~30 رسالة/ثانية للبوت) عبر فواصل زمنية ثابتة بين الرسائل.
+- حد لكل محادثة (رسالة/ثانية للخاص، أبطأ للمجموعات).
+- تجميع: كل ما تراكم لمحادثة واحدة قبل دورها يُرسل كرسالة واحدة.
+- RetryAfter يوقف الإرسال كله للمدة المطلوبة ثم تُعاد المحاولة؛ Forbidden (أو محادثة محذوفة/معطّلة) يلغي الاشتراك.
+"""
+import asyncio
+import logging
+import time
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+
+from config import CFG
+
+log = logging.getLogger(__name__)
+
+_MAX_LEN = 4096  # حد طول رسالة تيليجرام
+
+# BadRequest لمحادثة لم تعد موجودة: إعادة المحاولة لا تفيد، نعاملها كـ Forbidden
+_GONE = ("chat not found", "deactivated")
+
+def _chat_gone(e: TelegramError) -> bool:
+    return isinstance(e, Forbidden) or (
+        isinstance(e, BadRequest) and any(m in str(e).lower() for m in _GONE))
+
+def _chunks(parts: list) -> list:
+    out, cur = [], ""
+    for p in parts:
+        p = p[:_MAX_LEN]
+        if cur and len(cur) + 2 + len(p) > _MAX_LEN:
+            out.append(cur)
+            cur = p
+        else:
+            cur = f"{cur}\n\n{p}" if cur else p
+    if cur:
+        out.append(cur)
+    return out
+
+class BroadcastQueue:
+    def __init__(self, global_rate: float = 25.0, private_interval: float = 1.0,
+                 group_interval: float = 3.0, workers: int = 4, max_retries: int = 3):
+        self.global_gap = 1.0 / global_rate
+        self.private_interval = private_interval
+        self.group_interval = group_interval
+        self.workers = workers
+        self.max_retries = max_retries
+        self.on_blocked = None  # callback(chat_id) عند حظر البوت أو حذف المحادثة
+        self._bot = None
+        self._queue = None
+        self._pending = {}     # chat_id -> [texts]
+        self._sending = set()  # محادثات يرسل لها عامل الآن: ما يصلها يُضاف لـ _pending ويُجدول بعد انتهائه
+        self._attempts = {}    # chat_id -> عدد المحاولات الفاشلة المتتالية
+        self._last_sent = {}   # chat_id -> وقت آخر إرسال
+        self._next_slot = 0.0  # أقرب وقت مسموح للرسالة التالية (الحد العام)
+        self._tasks = []
+        self.sent = 0
+        self.failed = 0
+        self.throttled = 0
+
+    def start(self, bot):
+        self._bot = bot
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def publish(self, chat_ids, text: str):
+        if self._queue is None:
+            return
+        for chat_id in chat_ids:
+            if chat_id not in self._pending:
+                self._pending[chat_id] = []
+                if chat_id not in self._sending:
+                    self._queue.put_nowait(chat_id)
+            self._pending[chat_id].append(text)
+
+    def backlog(self) -> int:
+        return sum(len(v) for v in self._pending.values())
+
+    async def _global_slot(self):
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.global_gap
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _chat_slot(self, chat_id: int):
+        gap = self.group_interval if chat_id < 0 else self.private_interval
+        wait = self._last_sent.get(chat_id, 0.0) + gap - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def _requeue(self, chat_id: int, texts: list):
+        if chat_id in self._pending:
+            self._pending[chat_id][:0] = texts
+        else:
+            self._pending[chat_id] = texts
+            if chat_id not in self._sending:
+                self._queue.put_nowait(chat_id)
+
+    async def _worker(self):
+        while True:
+            chat_id = await self._queue.get()
+            texts = self._pending.pop(chat_id, [])
+            if not texts:
+                continue
+            # محادثة واحدة لعامل واحد: لا إرسالان متزامنان لها (فاصل المحادثة والترتيب)
+            self._sending.add(chat_id)
+            try:
+                await self._send(chat_id, texts)
+            except Exception:
+                # خطأ غير متوقع (شبكة، تسلسل، _chunks) يُسقط رسائل هذه الدورة فقط ولا يوقف العامل
+                self.failed += 1
+                log.exception("broadcast to chat %s failed", chat_id)
+            finally:
+                self._sending.discard(chat_id)
+                if self._pending.get(chat_id):
+                    self._queue.put_nowait(chat_id)
+
+    async def _send(self, chat_id: int, texts: list):
+        await self._chat_slot(chat_id)
+        chunks = _chunks(texts)
+        done = 0
+        try:
+            for chunk in chunks:
+                await self._global_slot()
+                await self._bot.send_message(chat_id=chat_id, text=chunk)
+                self._last_sent[chat_id] = time.monotonic()
+                done += 1
+                self.sent += 1
+            self._attempts.pop(chat_id, None)
+        except RetryAfter as e:
+            # الحظر المؤقت يخص البوت كله: نؤجّل كل الإرسال
+            self.throttled += 1
+            ra = e.retry_after
+            retry = ra.total_seconds() if hasattr(ra, "total_seconds") else float(ra)
+            self._next_slot = max(self._next_slot, time.monotonic() + retry)
+            self._requeue(chat_id, chunks[done:])
+        except TelegramError as e:
+            if _chat_gone(e):
+                self.failed += 1
+                self._attempts.pop(chat_id, None)
+                self._pending.pop(chat_id, None)
+                if self.on_blocked:
+                    self.on_blocked(chat_id)
+                return
+            n = self._attempts.get(chat_id, 0) + 1
+            if n > self.max_retries:
+                self.failed += 1
+                self._attempts.pop(chat_id, None)
+                log.warning("dropping alert for chat %s: %s", chat_id, e)
+            else:
+                self._attempts[chat_id] = n
+                # تراجع أُسّي دون حجز عامل الإرسال أثناء الانتظار
+                asyncio.get_running_loop().call_later(2 ** n, self._requeue, chat_id, chunks[done:])
+
+BROADCAST = BroadcastQueue(
+    global_rate=CFG["ALERTS"]["global_rate"],
+    private_interval=CFG["ALERTS"]["private_interval"],
+    group_interval=CFG["ALERTS"]["group_interval"],
+    workers=CFG["ALERTS"]["workers"],
+)
@@ -0,0 +1,247 @@
+"""
+سجل لقطات سلاسل الخيارات خلال الجلسة بصيغة عمودية مضغوطة (append-only)، لتتبع تطور
+الدلتا/السبريد/الحجم/OI لعقود 0DTE عبر اليوم.
+
+مجلد لكل (يوم التداول بتوقيت نيويورك، تاريخ الانتهاء): DATA_DIR/chains/<symbol>/<day>/<expiry>/
+  لكل صف (عقد في لقطة):
+    strike.i4   رقم السترايك في قاموس strikes.f8 (يُلحق به كل سترايك جديد)
+    side.i1     0=CALL، 1=PUT
+    bid.f4 / ask.f4 / delta.f4 / iv.f4 / volume.i4 / oi.i4
+  لكل لقطة:
+    ends.i8     نهاية صفوف اللقطة (تراكمي) — اللقطة k = الصفوف [ends[k-1], ends[k])
+    spot.f8     سعر الأصل
+    times.i8    الطابع الزمني (نانوثانية UTC) — يُكتب أخيراً فهو العدد المعتمد للّقطات
+- تاريخ الانتهاء مفتاح التقسيم نفسه فلا يُخزَّن لكل صف؛ الجانب والسترايك مرمّزان بقاموس.
+- القراءة عبر np.memmap: الاستعلامات الزمنية تقرأ الأعمدة التي تحتاجها فقط دون بناء إطار اليوم كاملاً.
+- كتابة منقطعة تُصلح عند أول فتح للمجلد (كما في bar_store).
+"""
+import os
+import re
+import threading
+import time
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+from config import CFG
+
+SIDES = ("CALL", "PUT")
+_ROW = {
+    "strike": np.int32, "side": np.int8,
+    "bid": np.float32, "ask": np.float32, "delta": np.float32, "iv": np.float32,
+    "volume": np.int32, "oi": np.int32,
+}
+_SNAP = {"ends": np.int64, "spot": np.float64, "times": np.int64}
+_EXT = {np.int8: "i1", np.int32: "i4", np.int64: "i8", np.float32: "f4", np.float64: "f8"}
+_DERIVED = {
+    "spread": lambda c: np.clip(c("ask") - c("bid"), 0, None),
+    "mid": lambda c: (c("ask") + c("bid")) / 2,
+}
+
+def _safe(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+def _file(col: str) -> str:
+    dtype = _ROW.get(col) or _SNAP.get(col)
+    return f"{col}.{_EXT[dtype]}"
+
+def _ny_day(ts_ns: int) -> str:
+    return pd.Timestamp(ts_ns, tz="UTC").tz_convert("America/New_York").date().isoformat()
+
+class ChainStore:
+    def __init__(self, root: str = None):
+        self.root = root or os.path.join(CFG["DATA_DIR"], "chains")
+        self._lock = threading.Lock()
+        self._checked = set()
+        self._strikes = {}  # مجلد -> قاموس السترايكات (float64)
+
+    def _dir(self, symbol: str, day: str, expiry: str) -> str:
+        return os.path.join(self.root, _safe(symbol), _safe(day), _safe(expiry))
+
+    @staticmethod
+    def _size(d: str, col: str) -> int:
+        p = os.path.join(d, _file(col))
+        return os.path.getsize(p) // np.dtype((_ROW.get(col) or _SNAP.get(col))).itemsize if os.path.exists(p) else 0
+
+    def _count(self, d: str) -> tuple:
+        """(عدد اللقطات، عدد الصفوف) المعتمدان."""
+        if d not in self._checked:
+            self._repair(d)
+        k = self._size(d, "times")
+        return k, int(self._column(d, "ends", k)[-1]) if k else 0
+
+    def _repair(self, d: str):
+        k = min(self._size(d, c) for c in _SNAP)
+        rows = int(np.fromfile(os.path.join(d, _file("ends")), dtype=np.int64, count=k)[-1]) if k else 0
+        for cols, n in ((_SNAP, k), (_ROW, rows)):
+            for col, dtype in cols.items():
+                p = os.path.join(d, _file(col))
+                if os.path.exists(p) and os.path.getsize(p) != n * np.dtype(dtype).itemsize:
+                    with open(p, "r+b") as f:
+                        f.truncate(n * np.dtype(dtype).itemsize)
+        self._checked.add(d)
+
+    def _column(self, d: str, col: str, n: int) -> np.ndarray:
+        if n == 0:
+            return np.empty(0, dtype=_ROW.get(col) or _SNAP.get(col))
+        return np.memmap(os.path.join(d, _file(col)), dtype=_ROW.get(col) or _SNAP.get(col), mode="r", shape=(n,))
+
+    def _strike_dict(self, d: str) -> np.ndarray:
+        known = self._strikes.get(d)
+        if known is None:
+            p = os.path.join(d, "strikes.f8")
+            known = np.fromfile(p, dtype=np.float64) if os.path.exists(p) else np.empty(0)
+            self._strikes[d] = known
+        return known
+
+    def _encode_strikes(self, d: str, strikes: np.ndarray) -> np.ndarray:
+        known = self._strike_dict(d)
+        uniq = np.unique(strikes)
+        new = uniq[~np.isin(uniq, known)]
+        if len(new):
+            with open(os.path.join(d, "strikes.f8"), "ab") as f:
+                f.write(new.tobytes())
+            known = self._strikes[d] = np.concatenate([known, new])
+        order = np.argsort(known, kind="stable")
+        return order[np.searchsorted(known[order], strikes)].astype(np.int32)
+
+    # ===== الكتابة =====
+    def append(self, chain: pd.DataFrame, spot: float, ts: int = None) -> int:
+        """يضيف لقطة سلسلة (أعمدة options_chain_df) لكل تاريخ انتهاء فيها. يعيد عدد الصفوف المكتوبة."""
+        if chain is None or chain.empty:
+            return 0
+        ts = time.time_ns() if ts is None else int(ts)
+        day = _ny_day(ts)
+        symbol = str(chain["symbol"].iloc[0])
+        side = np.where(chain["side"].to_numpy() == "PUT", 1, 0).astype(np.int8)
+        expiry = chain["expiry"].astype(str).to_numpy()
+        written = 0
+        with self._lock:
+            for exp in np.unique(expiry):
+                sel = np.flatnonzero(expiry == exp)
+                strike = chain["strike"].to_numpy(dtype=np.float64)[sel]
+                order = sel[np.lexsort((strike, side[sel]))]  # داخل اللقطة: الجانب ثم السترايك
+                d = self._dir(symbol, day, exp)
+                os.makedirs(d, exist_ok=True)
+                k, rows = self._count(d)
+                if k and ts <= int(self._column(d, "times", k)[-1]):
+                    continue  # لقطة مكررة أو أقدم من آخر لقطة
+                cols = {
+                    "strike": self._encode_strikes(d, chain["strike"].to_numpy(dtype=np.float64)[order]),
+                    "side": side[order],
+                }
+                for c in ("bid", "ask", "delta", "iv", "volume", "oi"):
+                    cols[c] = chain[c].to_numpy()[order].astype(_ROW[c])
+                snap = {"ends": np.array([rows + len(order)], dtype=np.int64),
+                        "spot": np.array([spot], dtype=np.float64),
+                        "times": np.array([ts], dtype=np.int64)}
+                # صفوف اللقطة أولاً ثم بياناتها، و times أخيراً
+                for col, arr in list(cols.items()) + list(snap.items()):
+                    with open(os.path.join(d, _file(col)), "ab") as f:
+                        f.write(np.ascontiguousarray(arr).tobytes())
+                written += len(order)
+        return written
+
+    # ===== القراءة =====
+    def partitions(self, symbol: str, day: str = None) -> list:
+        """[(day, expiry)] المتاحة، مرتبة."""
+        base = os.path.join(self.root, _safe(symbol))
+        days = [day] if day else (sorted(os.listdir(base)) if os.path.isdir(base) else [])
+        out = []
+        for dd in days:
+            p = os.path.join(base, _safe(dd))
+            if os.path.isdir(p):
+                out.extend((dd, e) for e in sorted(os.listdir(p)))
+        return out
+
+    def _resolve(self, symbol: str, day: Optional[str], expiry: Optional[str]) -> str:
+        # الافتراضي: اليوم الحالي بتوقيت نيويورك، وانتهاء اليوم نفسه (0DTE) أو أقرب انتهاء مسجّل
+        day = day or _ny_day(time.time_ns())
+        if expiry is None:
+            exps = [e for _, e in self.partitions(symbol, day)]
+            later = [e for e in exps if e >= day]
+            expiry = later[0] if later else (exps[-1] if exps else day)
+        return self._dir(symbol, day, expiry)
+
+    def snapshot(self, symbol: str, day: str = None, expiry: str = None, at: int = -1) -> pd.DataFrame:
+        """لقطة واحدة (الأخيرة افتراضياً) كإطار صغير بالأعمدة المفكوكة."""
+        d = self._resolve(symbol, day, expiry)
+        k, rows = self._count(d)
+        if k == 0:
+            return pd.DataFrame()
+        at = at % k
+        ends = self._column(d, "ends", k)
+        sl = slice(int(ends[at - 1]) if at else 0, int(ends[at]))
+        out = {c: np.asarray(self._column(d, c, rows)[sl]) for c in _ROW}
+        out["strike"] = self._strike_dict(d)[out["strike"]]
+        out["side"] = np.asarray(SIDES, dtype=object)[out["side"]]
+        df = pd.DataFrame(out)
+        df["expiry"] = os.path.basename(d)
+        df.attrs["ts"] = pd.Timestamp(int(self._column(d, "times", k)[at]), tz="UTC")
+        df.attrs["spot"] = float(self._column(d, "spot", k)[at])
+        return df
+
+    def series(self, symbol: str, field: str = "spread", side: str = "CALL", delta: float = 0.25,
+               day: str = None, expiry: str = None, freq: str = None, tz: str = "America/New_York") -> pd.DataFrame:
+        """
+        لكل لقطة: العقد الأقرب دلتاه إلى delta في الجانب المطلوب، مع قيمة field
+        (عمود مخزّن أو spread/mid). freq (مثل "1min") يبقي آخر لقطة في كل فترة.
+        مثال: سبريد كول دلتا 0.25 لكل دقيقة اليوم -> series("SPY", "spread", "CALL", 0.25, freq="1min")
+        """
+        if field not in _ROW and field not in _DERIVED:
+            raise ValueError(f"unknown field {field!r}")
+        d = self._resolve(symbol, day, expiry)
+        k, rows = self._count(d)
+        if k == 0:
+            return pd.DataFrame(columns=["strike", "delta", field])
+        col = lambda c: self._column(d, c, rows)
+        ends = np.asarray(self._column(d, "ends", k))
+        idx = np.flatnonzero(col("side") == SIDES.index(side))
+        dist = np.abs(col("delta")[idx] - np.float32(delta))
+        dist = np.where(np.isnan(dist), np.inf, dist)
+        snap = np.searchsorted(ends, idx, side="right")  # رقم اللقطة لكل صف
+        order = np.lexsort((dist, snap))
+        first = np.r_[True, snap[order][1:] != snap[order][:-1]]
+        rows_sel = idx[order][first]
+        snaps = snap[order][first]
+
+        times = np.asarray(self._column(d, "times", k))[snaps]
+        if freq:
+            step = pd.Timedelta(freq).value
+            bucket = times // step
+            last = np.r_[bucket[1:] != bucket[:-1], True]
+            rows_sel, times = rows_sel[last], times[last]
+        if field in _DERIVED:
+            value = _DERIVED[field](lambda c: col(c)[rows_sel].astype(np.float64))
+        else:
+            value = col(field)[rows_sel]
+        index = pd.DatetimeIndex(times.view("M8[ns]")).tz_localize("UTC").tz_convert(tz)
+        return pd.DataFrame({
+            "strike": self._strike_dict(d)[col("strike")[rows_sel]],
+            "delta": col("delta")[rows_sel],
+            field: value,
+        }, index=index)
+
+CHAIN_STORE = ChainStore()
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="query the intraday option-chain history")
+    ap.add_argument("symbol", nargs="?", default=CFG.get("OPTIONS_UNDERLYING", "SPY"))
+    ap.add_argument("--field", default="spread", help="spread/mid/bid/ask/delta/iv/volume/oi")
+    ap.add_argument("--side", default="CALL", choices=SIDES)
+    ap.add_argument("--delta", type=float, default=0.25)
+    ap.add_argument("--day", help="YYYY-MM-DD (الافتراضي اليوم بتوقيت نيويورك)")
+    ap.add_argument("--expiry", help="الافتراضي انتهاء اليوم نفسه أو أقرب انتهاء مسجّل")
+    ap.add_argument("--freq", help="مثل 1min أو 5min")
+    ap.add_argument("--list", action="store_true", help="عرض الأقسام المسجلة فقط")
+    args = ap.parse_args(argv)
+    if args.list:
+        for day, exp in CHAIN_STORE.partitions(args.symbol):
+            print(day, exp)
+        return
+    print(CHAIN_STORE.series(args.symbol, args.field, args.side, args.delta,
+                             day=args.day, expiry=args.expiry, freq=args.freq).to_string())
+
+if __name__ == "__main__":
+    main()
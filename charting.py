@@ -1,10 +1,23 @@
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+import asyncio
 import io
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
 import pandas as pd
+
+from config import CFG
 from indicators import pivot_points, swing_levels
 
+log = logging.getLogger(__name__)
+
 def plot_hourly_with_targets(df_hour: pd.DataFrame, targets: list, stop: float, title: str = "SPX H1") -> bytes:
     fig, ax = plt.subplots(figsize=(10,5))
     df = df_hour.copy()
@@ -39,3 +52,188 @@ def plot_hourly_with_targets(df_hour: pd.DataFrame, targets: list, stop: float,
     plt.close(fig)
     buf.seek(0)
     return buf.read()
+
+# ========= رسم سريع عبر مجمع عمليات =========
+# كل عملية عاملة تبني الشكل والمحاور مرة واحدة، وبين الطلبات تُحدَّث بيانات الخط
+# ومواضع خطوط المستويات فقط (بدون plt.subplots/tight_layout في كل طلب).
+
+_PIVOT_KEYS = ("P", "R1", "S1", "R2", "S2", "R3", "S3")
+
+class ChartTemplate:
+    def __init__(self, tz: str = None):
+        self.fig, self.ax = plt.subplots(figsize=(10,5))
+        ax = self.ax
+        self.line, = ax.plot([], [], linewidth=1.5)
+        self.title = ax.set_title("SPX H1")
+        ax.set_xlabel('Time')
+        ax.set_ylabel('Price')
+        locator = mdates.AutoDateLocator(tz=tz)
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.AutoDateFormatter(locator, tz=tz))
+        self.pivots = [(ax.axhline(0, linestyle='--', linewidth=0.8),
+                        ax.text(0, 0, k, fontsize=8, va='bottom')) for k in _PIVOT_KEYS]
+        self.swings = []
+        self.targets = []
+        self.stop = (ax.axhline(0, linewidth=1.2), ax.text(0, 0, 'SL', fontsize=8))
+        # تخطيط ثابت محسوب مرة واحدة على نطاق أسعار نموذجي (عرض تسميات المحور y)
+        ax.set_xlim(mdates.date2num(np.datetime64("2024-01-01")), mdates.date2num(np.datetime64("2024-01-03")))
+        ax.set_ylim(4000, 6000)
+        for _, text in self.pivots + [self.stop]:
+            text.set_in_layout(False)
+        self.fig.tight_layout()
+        ax.set_autoscale_on(True)
+
+    def _pair(self, pool: list, i: int, label: str):
+        while len(pool) <= i:
+            text = self.ax.text(0, 0, "", fontsize=8)
+            text.set_in_layout(False)
+            pool.append((self.ax.axhline(0, linewidth=1.2), text))
+        line, text = pool[i]
+        text.set_text(label)
+        return line, text
+
+    @staticmethod
+    def _place(line, text, y, x_text, visible=True):
+        line.set_ydata([y, y])
+        line.set_visible(visible)
+        if text is not None:
+            text.set_position((x_text, y))
+            text.set_visible(visible)
+
+    def render(self, ts_ns: np.ndarray, close: np.ndarray, high: np.ndarray, low: np.ndarray,
+               targets: list, stop: float, title: str, fmt: str = "png", dpi: int = 150) -> bytes:
+        x = mdates.date2num(ts_ns.astype("M8[ns]"))
+        self.line.set_data(x, close)
+        self.title.set_text(title)
+
+        has_piv = len(close) >= 2
+        piv = pivot_points(float(high[-2]), float(low[-2]), float(close[-2])) if has_piv else {}
+        for k, (line, text) in zip(_PIVOT_KEYS, self.pivots):
+            self._place(line, text, piv.get(k, 0.0), x[0] if len(x) else 0, visible=has_piv)
+
+        sw = swing_levels(pd.Series(close), lookback=min(200, len(close))) if len(close) else []
+        for i, (_, price) in enumerate(sw):
+            while len(self.swings) <= i:
+                self.swings.append(self.ax.axhline(0, alpha=0.3, linewidth=0.8))
+            self._place(self.swings[i], None, price, 0)
+        for line in self.swings[len(sw):]:
+            line.set_visible(False)
+
+        for i, tg in enumerate(targets):
+            line, text = self._pair(self.targets, i, f'T{i+1}')
+            self._place(line, text, tg, x[-1])
+        for line, text in self.targets[len(targets):]:
+            self._place(line, text, 0.0, 0, visible=False)
+        self._place(*self.stop, stop, x[-1])
+
+        self.ax.relim(visible_only=True)
+        self.ax.autoscale_view()
+        buf = io.BytesIO()
+        self.fig.savefig(buf, format=fmt, dpi=dpi)
+        return buf.getvalue()
+
+_TEMPLATE = None
+
+def _init_worker(tz: str):
+    global _TEMPLATE
+    _TEMPLATE = ChartTemplate(tz)
+
+def _render_in_worker(*args):
+    t0 = time.perf_counter()
+    data = _TEMPLATE.render(*args)
+    return data, time.perf_counter() - t0
+
+class ChartRenderer:
+    """
+    مجمع عمليات لرسم الشارت خارج خيط البوت (وخارج GIL).
+    workers=0 يرسم داخل العملية نفسها (للتطوير والقياس).
+    stats() يعرض أزمنة الرسم والانتظار لتحديد حجم المجمع.
+    """
+    def __init__(self, workers: int = 1, fmt: str = "png", dpi: int = 150, tz: str = None):
+        self.workers = workers
+        self.fmt = fmt
+        self.dpi = dpi
+        self.tz = tz or CFG["TZ"]
+        self._pool = None
+        self._render_s = deque(maxlen=500)
+        self._wait_s = deque(maxlen=500)
+        self.count = 0
+        self.restarts = 0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_worker, initargs=(self.tz,))
+        return self._pool
+
+    def start(self):
+        # تسخين العمال مسبقاً حتى لا يدفع أول /chart كلفة الإقلاع
+        if self.workers > 0:
+            pool = self._executor()
+            for _ in range(self.workers):
+                pool.submit(time.sleep, 0)
+
+    async def render(self, df_hour: pd.DataFrame, targets: list, stop: float,
+                     title: str = "SPX H1", fmt: str = None, dpi: int = None) -> bytes:
+        args = (df_hour.index.asi8.copy(),
+                df_hour['Close'].to_numpy(dtype=float),
+                df_hour['High'].to_numpy(dtype=float),
+                df_hour['Low'].to_numpy(dtype=float),
+                [float(t) for t in targets], float(stop), title, fmt or self.fmt, dpi or self.dpi)
+        t0 = time.perf_counter()
+        if self.workers > 0:
+            data, busy = await self._submit(args)
+        else:
+            if _TEMPLATE is None:
+                _init_worker(self.tz)
+            data, busy = _render_in_worker(*args)
+        self.count += 1
+        self._render_s.append(busy)
+        self._wait_s.append(time.perf_counter() - t0 - busy)
+        return data
+
+    async def _submit(self, args: tuple):
+        # عامل قُتل (OOM مثلاً) يكسر المجمع نهائياً: نستبدله بمجمع جديد ونعيد المحاولة مرة واحدة
+        loop = asyncio.get_running_loop()
+        for attempt in (1, 2):
+            pool = self._executor()
+            try:
+                return await loop.run_in_executor(pool, _render_in_worker, *args)
+            except BrokenProcessPool:
+                if self._pool is pool:  # طلبات متزامنة: يستبدله أولها فقط
+                    log.warning("chart worker pool broken, restarting it")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = None
+                    self.restarts += 1
+                if attempt == 2:
+                    raise
+
+    def stats(self) -> dict:
+        def pct(vals, q):
+            if not vals:
+                return 0.0
+            s = sorted(vals)
+            return s[min(int(q * len(s)), len(s) - 1)]
+        r, w = list(self._render_s), list(self._wait_s)
+        return {
+            "workers": self.workers,
+            "renders": self.count,
+            "pool_restarts": self.restarts,
+            "render_p50_ms": pct(r, 0.50) * 1000,
+            "render_p95_ms": pct(r, 0.95) * 1000,
+            "render_max_ms": max(r, default=0.0) * 1000,
+            "wait_p50_ms": pct(w, 0.50) * 1000,
+            "wait_p95_ms": pct(w, 0.95) * 1000,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+RENDERER = ChartRenderer(
+    workers=CFG["CHART"]["workers"],
+    fmt=CFG["CHART"]["format"],
+    dpi=CFG["CHART"]["dpi"],
+)
@@ -5,24 +5,81 @@ load_dotenv()
 CFG = {
     "TELEGRAM_TOKEN": os.getenv("TELEGRAM_BOT_TOKEN", ""),
     "TELEGRAM_ADMIN": int(os.getenv("TELEGRAM_ADMIN_ID", "0")),
+    "TELEGRAM_API_URL": os.getenv("TELEGRAM_API_URL", ""),  # فارغ = api.telegram.org (غيّره لخادم محلي/وهمي)
+    "UPDATES_CONCURRENCY": int(os.getenv("UPDATES_CONCURRENCY", 32)),  # تحديثات تُعالج بالتوازي (1 = بالترتيب)
+    "WEBHOOK": {
+        "url": os.getenv("WEBHOOK_URL", ""),  # فارغ = استطلاع طويل؛ مثال: https://bot.example.com
+        "path": os.getenv("WEBHOOK_PATH", "/telegram"),
+        "secret": os.getenv("WEBHOOK_SECRET", ""),
+        "host": os.getenv("WEBHOOK_HOST", "0.0.0.0"),
+        "port": int(os.getenv("WEBHOOK_PORT", os.getenv("PORT", 8080))),
+        "max_connections": int(os.getenv("WEBHOOK_MAX_CONNECTIONS", 40)),
+    },
     "TZ": os.getenv("TZ", "Asia/Riyadh"),
     "SYMBOL_INDEX": os.getenv("SYMBOL_INDEX", "^GSPC"),
     "SYMBOL_FUTURES": os.getenv("SYMBOL_FUTURES", "ES=F"),
     "SYMBOL_ETF": os.getenv("SYMBOL_ETF", "SPY"),
+    "SCAN": {
+        # رموز /scan (المؤشر، ETF، ناسداك، العقود، والشركات الكبرى في news.NEWS_QUERY)
+        "symbols": [x.strip() for x in os.getenv("SCAN_SYMBOLS", "^GSPC,SPY,QQQ,ES=F,NVDA,AAPL,MSFT").split(",") if x.strip()],
+        "bars": int(os.getenv("SCAN_BARS", 390)),  # دقائق مشتركة تدخل الحساب
+    },
     "OPTIONS_PROVIDER": os.getenv("OPTIONS_PROVIDER", "yfinance"),
     "OPTIONS_UNDERLYING": os.getenv("OPTIONS_UNDERLYING", "SPY"),
+    "DATA_DIR": os.getenv("DATA_DIR", "data"),
+    "CHAIN_HISTORY": os.getenv("CHAIN_HISTORY", "1") == "1",  # تسجيل كل تحديث لسلسلة الخيارات في DATA_DIR/chains
+    "BREAKER": {
+        "threshold": int(os.getenv("BREAKER_THRESHOLD", 3)),    # مرات فراغ متتالية قبل تخطي الرمز
+        "cooldown": float(os.getenv("BREAKER_COOLDOWN", 300)),  # ثوانٍ
+    },
     "INTERVALS": {
         "fast": int(os.getenv("INTERVAL_FAST", 60)),
         "med": int(os.getenv("INTERVAL_MED", 300)),
         "slow": int(os.getenv("INTERVAL_SLOW", 900)),
         "chart": int(os.getenv("CHART_REFRESH", 600)),
     },
+    "EXEC": {
+        "workers": int(os.getenv("EXEC_WORKERS", 8)),
+        "timeout": float(os.getenv("EXEC_TIMEOUT", 20)),
+        "limits": {
+            "yfinance": int(os.getenv("EXEC_LIMIT_YFINANCE", 4)),
+        },
+    },
+    "CHART": {
+        "workers": int(os.getenv("CHART_WORKERS", 1)),
+        "format": os.getenv("CHART_FORMAT", "png"),  # png أو webp
+        "dpi": int(os.getenv("CHART_DPI", 150)),
+    },
+    "ALERTS": {
+        "global_rate": float(os.getenv("ALERT_GLOBAL_RATE", 25)),          # رسالة/ثانية للبوت كله
+        "private_interval": float(os.getenv("ALERT_PRIVATE_INTERVAL", 1.0)),  # ثوانٍ بين رسائل المحادثة الخاصة
+        "group_interval": float(os.getenv("ALERT_GROUP_INTERVAL", 3.0)),      # ثوانٍ بين رسائل المجموعة
+        "workers": int(os.getenv("ALERT_WORKERS", 4)),
+    },
+    "SNAPSHOT": {
+        "path": os.getenv("SNAPSHOT_PATH", os.path.join(os.getenv("DATA_DIR", "data"), "snapshot.pkl.z")),
+        "interval": float(os.getenv("SNAPSHOT_INTERVAL", 60)),        # ثوانٍ بين اللقطات (0 = تعطيل)
+        "max_age": float(os.getenv("SNAPSHOT_MAX_AGE", 900)),         # أقصى عمر مقبول والسوق مفتوح
+        "max_age_closed": float(os.getenv("SNAPSHOT_MAX_AGE_CLOSED", 259200)),  # والسوق مغلق (يغطي عطلة الأسبوع)
+    },
+    "METRICS": {
+        "host": os.getenv("METRICS_HOST", "0.0.0.0"),
+        "port": int(os.getenv("METRICS_PORT", 0)),  # 0 = بدون نقطة Prometheus
+    },
+    "NEWS": {
+        "budget": float(os.getenv("NEWS_BUDGET", 3.0)),        # ثوانٍ: أقصى انتظار لمصادر الأخبار
+        "cache_ttl": float(os.getenv("NEWS_CACHE_TTL", 300)),  # ثوانٍ
+    },
     "RISK": {
         "stop": float(os.getenv("DEFAULT_STOP_PCT", 0.01)),
         "t1": float(os.getenv("DEFAULT_TARGET1_PCT", 0.005)),
         "t2": float(os.getenv("DEFAULT_TARGET2_PCT", 0.01)),
         "t3": float(os.getenv("DEFAULT_TARGET3_PCT", 0.015)),
     },
+    "SIGNAL": {
+        "rsi_bull": float(os.getenv("RSI_BULL", 55)),  # RSI أعلى منه + MACD فوق الإشارة = صاعد
+        "rsi_bear": float(os.getenv("RSI_BEAR", 45)),  # RSI أدنى منه + MACD تحت الإشارة = هابط
+    },
     "OPT": {
         "dmin": float(os.getenv("OPT_PREFERRED_DELTA_MIN", 0.20)),
         "dmax": float(os.getenv("OPT_PREFERRED_DELTA_MAX", 0.35)),
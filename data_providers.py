@@ -1,12 +1,82 @@
 import asyncio
+import time
+from datetime import datetime
 from zoneinfo import ZoneInfo
 import pandas as pd
 import yfinance as yf
 import aiohttp
 
 from config import CFG
+from bar_store import BAR_STORE
+from executor import run_blocking
+from timeframes import cascade
 
 TZ = ZoneInfo(CFG["TZ"])
+NY = ZoneInfo("America/New_York")
+
+# مدة الشمعة بالثواني — تُستخدم كعمر افتراضي للكاش (الشمعة الجديدة تُبطل القديم)
+_INTERVAL_SECONDS = {
+    "1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800,
+    "60m": 3600, "90m": 5400, "1h": 3600, "1d": 86400, "5d": 432000,
+    "1wk": 604800, "1mo": 2592000, "3mo": 7776000,
+}
+
+class BarCache:
+    """
+    كاش مشترك على مستوى العملية للشموع بمفتاح (الرمز، الفريم).
+    - العمر (TTL) = مدة شمعة الفريم.
+    - single-flight: الطلبات المتزامنة على نفس المفتاح تنتظر جلباً واحداً جارياً.
+    - الإطارات المخزنة مشتركة بين المستدعين: لا تعدّلها في مكانها.
+    """
+    def __init__(self):
+        self._entries = {}   # key -> (expires_at, df)
+        self._inflight = {}  # key -> asyncio.Task
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def ttl_for(interval: str) -> float:
+        return float(_INTERVAL_SECONDS.get(interval, 60))
+
+    async def get(self, symbol: str, interval: str, fetch) -> pd.DataFrame:
+        key = (symbol, interval)
+        ent = self._entries.get(key)
+        if ent is not None and ent[0] > time.monotonic():
+            self.hits += 1
+            return ent[1]
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._fill(key, interval, fetch))
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+        # shield: إلغاء أحد المنتظرين لا يلغي الجلب المشترك
+        return await asyncio.shield(task)
+
+    async def _fill(self, key, interval: str, fetch) -> pd.DataFrame:
+        try:
+            df = await fetch()
+            # لا نخزّن النتائج الفارغة حتى يُعاد المحاولة في الطلب التالي
+            if isinstance(df, pd.DataFrame) and not df.empty:
+                self._entries[key] = (time.monotonic() + self.ttl_for(interval), df)
+            return df
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+        }
+
+BAR_CACHE = BarCache()
 
 class PriceProvider:
     """موحّد جلب الأسعار للفريمات المختلفة (مع دعم خارج ساعات السوق)."""
@@ -22,45 +92,153 @@ class PriceProvider:
             await self.session.close()
 
     async def get_recent(self, symbol: str, interval: str = "1m", lookback_minutes: int = 480) -> pd.DataFrame:
-        # نستخدم فترة أوسع حتى لو السوق مغلق (يضمن بيانات آخر جلسة)
-        period = "5d" if interval in ("1m", "2m") else "1mo"
-        data = yf.download(tickers=symbol, period=period, interval=interval, auto_adjust=False, progress=False)
-
-        # فوالبَك تلقائي: ETF ثم العقود في حال كان المؤشر فارغاً
-        if not isinstance(data, pd.DataFrame) or data.empty:
-            if symbol != CFG["SYMBOL_ETF"]:
-                data = yf.download(tickers=CFG["SYMBOL_ETF"], period=period, interval=interval, auto_adjust=False, progress=False)
-        if not isinstance(data, pd.DataFrame) or data.empty:
-            if symbol != CFG["SYMBOL_FUTURES"]:
-                data = yf.download(tickers=CFG["SYMBOL_FUTURES"], period=period, interval=interval, auto_adjust=False, progress=False)
-
-        if not isinstance(data, pd.DataFrame) or data.empty:
-            return pd.DataFrame()
+        data = await BAR_CACHE.get(symbol, interval, lambda: self._download(symbol, interval))
+        if data.empty:
+            return data
+        # آخر ~يوم عمل/يومين (كافي للشارت والإشارات)
+        return data.tail(int(lookback_minutes * 3))
 
-        data = data.rename(columns=str.title)
+    async def _download(self, symbol: str, interval: str) -> pd.DataFrame:
+        # المؤشر ثم ETF ثم العقود تُجلب معاً في طلب واحد، ونختار أفضل مصدر متاح
+        chain = list(dict.fromkeys((symbol, CFG["SYMBOL_ETF"], CFG["SYMBOL_FUTURES"])))
         try:
-            data.index = data.index.tz_localize("UTC").tz_convert(TZ)
-        except Exception:
-            # أحياناً تكون already tz-aware
-            data.index = data.index.tz_convert(TZ)
+            await run_blocking("yfinance", self._sync_batch, chain, interval)
+        except asyncio.TimeoutError:
+            pass
+        return pick_source(chain, interval)
 
-        # آخر ~يوم عمل/يومين (كافي للشارت والإشارات)
-        data = data.tail(int(lookback_minutes * 3))
-        return data
+    def _sync_batch(self, symbols: list, interval: str):
+        """
+        طلب yf.download واحد لكل الرموز المسموح بها (قاطع الدائرة)، بدءاً من أقدم
+        آخر طابع مخزّن بينها، ثم دمج كل رمز في مخزنه.
+        """
+        symbols = [s for s in symbols if BREAKER.allow(s)]
+        if not symbols:
+            return
+        lasts = [BAR_STORE.last_ts(s, interval) for s in symbols]
+        now = pd.Timestamp.now(tz="UTC")
+        if all(t is not None and now - t < _incremental_window(interval) for t in lasts):
+            kw = {"start": min(lasts).to_pydatetime()}
+        else:
+            # نستخدم فترة أوسع حتى لو السوق مغلق (يضمن بيانات آخر جلسة)
+            kw = {"period": "5d" if interval in ("1m", "2m") else "1mo"}
+        data = yf.download(tickers=symbols, interval=interval, group_by="ticker",
+                           auto_adjust=False, progress=False, threads=True, **kw)
+
+        got = {}
+        for sym in symbols:
+            part = _ticker_frame(data, sym, len(symbols))
+            got[sym] = part
+            if not part.empty:
+                BAR_STORE.merge(sym, interval, part)
+        # الفراغ فشل فقط خلال جلسة الرمز نفسه (أو إن كان مخزنه فارغاً)؛ خارجها لا يُحتسب نجاحاً ولا فشلاً.
+        # لا نستدل من شموع رموز أخرى: ES يتداول ~23 ساعة بينما المؤشر و SPY مغلقان
+        for sym, part in got.items():
+            if not part.empty:
+                BREAKER.record(sym, True)
+            elif session_open(sym) or BAR_STORE.size(sym, interval) == 0:
+                BREAKER.record(sym, False)
+
+    async def get_aligned(self, symbols: list, interval: str = "1m", lookback_minutes: int = 480) -> pd.DataFrame:
+        """
+        إغلاقات عدة رموز على الطوابع المشتركة فقط (مثلاً SPX و ES لعرض الأساس).
+        الرموز من سلسلة المؤشر/ETF/العقود: كلها تُجلب معاً في طلب symbols[0] نفسه.
+        """
+        await self.get_recent(symbols[0], interval, lookback_minutes)
+        cols = {}
+        for sym in symbols:
+            f = BAR_STORE.frame(sym, interval, tail=int(lookback_minutes * 3), tz=TZ)
+            if not f.empty:
+                cols[sym] = f["Close"]
+        if len(cols) < len(symbols):
+            return pd.DataFrame()
+        return pd.concat(cols, axis=1, join="inner")
+
+class CircuitBreaker:
+    """يتخطى رمزاً أعاد بيانات فارغة threshold مرات متتالية لمدة cooldown ثانية."""
+    def __init__(self, threshold: int = 3, cooldown: float = 300.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = {}
+        self._open_until = {}
+
+    def allow(self, key) -> bool:
+        return time.monotonic() >= self._open_until.get(key, 0.0)
+
+    def record(self, key, ok: bool):
+        if ok:
+            self._failures.pop(key, None)
+            self._open_until.pop(key, None)
+            return
+        n = self._failures.get(key, 0) + 1
+        if n >= self.threshold:
+            self._open_until[key] = time.monotonic() + self.cooldown
+            n = self.threshold - 1  # بعد انتهاء التبريد: فشل واحد يعيد الفتح
+        self._failures[key] = n
+
+    def stats(self) -> dict:
+        """open: رموز متخطاة الآن، cooldown_seconds: {الرمز: ما بقي من التبريد}."""
+        now = time.monotonic()
+        cooldown = {k: v - now for k, v in self._open_until.items() if v > now}
+        return {"open": len(cooldown), "failing": len(self._failures), "cooldown_seconds": cooldown}
+
+BREAKER = CircuitBreaker(threshold=CFG["BREAKER"]["threshold"], cooldown=CFG["BREAKER"]["cooldown"])
+
+def session_open(symbol: str, now: datetime = None) -> bool:
+    """
+    جلسة الرمز بتوقيت نيويورك (دون العطل الرسمية): العقود (=F) الأحد 18:00 – الجمعة 17:00
+    مع توقف يومي 17:00–18:00، وغيرها الإثنين–الجمعة 09:30–16:00.
+    """
+    now = (now or datetime.now(NY)).astimezone(NY)
+    wd, hm = now.weekday(), now.hour * 100 + now.minute
+    if symbol.endswith("=F"):
+        if wd == 5 or (wd == 6 and hm < 1800) or (wd == 4 and hm >= 1700):
+            return False
+        return not 1700 <= hm < 1800
+    return wd < 5 and 930 <= hm < 1600
+
+def _ticker_frame(data, sym: str, n_symbols: int) -> pd.DataFrame:
+    if not isinstance(data, pd.DataFrame) or data.empty:
+        return pd.DataFrame()
+    if isinstance(data.columns, pd.MultiIndex):
+        if sym not in data.columns.get_level_values(0):
+            return pd.DataFrame()
+        part = data[sym]
+    elif n_symbols == 1:
+        part = data
+    else:
+        return pd.DataFrame()
+    part = part.rename(columns=str.title).dropna(how="all")
+    return part.dropna(subset=["Close"]) if "Close" in part else pd.DataFrame()
+
+def pick_source(chain: list, interval: str) -> pd.DataFrame:
+    """
+    أول رمز بالترتيب المفضل لديه بيانات. خلال جلسة الرمز فقط يُشترط ألا يتأخر عن أحدث مصدر
+    بأكثر من 5 شموع (المؤشر مساءً متأخر دائماً عن ES لكن آخر جلسته هي المطلوبة).
+    attrs["source"] يحمل الرمز المختار.
+    """
+    frames = {s: BAR_STORE.frame(s, interval, tz=TZ) for s in chain}
+    frames = {s: f for s, f in frames.items() if not f.empty}
+    if not frames:
+        return pd.DataFrame()
+    freshest = max(f.index[-1] for f in frames.values())
+    lag = pd.Timedelta(seconds=5 * _INTERVAL_SECONDS.get(interval, 60))
+    for sym in chain:
+        f = frames.get(sym)
+        if f is not None and (not session_open(sym) or freshest - f.index[-1] <= lag):
+            f.attrs["source"] = sym
+            return f
+    return pd.DataFrame()
+
+def _incremental_window(interval: str) -> pd.Timedelta:
+    # ياهو يقبل start لشموع الدقيقة ضمن آخر ~7 أيام فقط
+    if _INTERVAL_SECONDS.get(interval, 60) < 86400:
+        return pd.Timedelta(days=6)
+    return pd.Timedelta(days=365)
 
 async def compact_timeframes(df_1m: pd.DataFrame) -> dict:
-    """ينتج 5m و 15m من 1m داخلياً."""
-    out = {"1m": df_1m}
-    if df_1m.empty:
-        out["5m"] = pd.DataFrame()
-        out["15m"] = pd.DataFrame()
-        return out
-
-    def resample(n):
-        return df_1m.resample(f"{n}T").agg({
-            "Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"
-        }).dropna()
-
-    out["5m"] = resample(5)
-    out["15m"] = resample(15)
-    return out
+    """
+    ينتج 5m و 15m و 1h من 1m داخلياً بتجميع متتالٍ واحد (timeframes.cascade).
+    الإطارات الناتجة نسخ مستقلة تبدأ من الحاوية التي تضم أول شمعة 1m.
+    """
+    return {"1m": df_1m, **cascade(df_1m)}
@@ -0,0 +1,66 @@
+"""
+طبقة تنفيذ للاستدعاءات الحاجبة (yfinance وما شابه) خارج حلقة asyncio.
+- مجمع خيوط محدود مشترك لكل المزوّدين.
+- حد تزامن لكل مزوّد: يبقى المقعد محجوزاً حتى ينتهي الخيط فعلاً (حتى بعد المهلة)،
+  فلا تتراكم استدعاءات معلّقة على مزوّد بطيء.
+- مهلة لكل استدعاء (تشمل انتظار المقعد): يُرفع asyncio.TimeoutError للمستدعي بينما يُترك الخيط ليكمل.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from config import CFG
+from metrics import METRICS
+
+class ProviderExecutor:
+    def __init__(self, workers: int, timeout: float, limits: dict = None, default_limit: int = 4):
+        self.workers = workers
+        self.timeout = timeout
+        self.limits = limits or {}
+        self.default_limit = default_limit
+        self._pool = None
+        self._sems = {}
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="provider")
+        return self._pool
+
+    def _sem(self, provider: str) -> asyncio.Semaphore:
+        sem = self._sems.get(provider)
+        if sem is None:
+            sem = self._sems[provider] = asyncio.Semaphore(self.limits.get(provider, self.default_limit))
+        return sem
+
+    async def run(self, provider: str, fn, *args, timeout: float = None, **kwargs):
+        # المهلة تشمل انتظار المقعد: مزوّد عالق لا يحبس المستدعين الجدد خلفه إلى ما لا نهاية
+        with METRICS.track(provider):
+            return await asyncio.wait_for(self._run(provider, fn, args, kwargs), timeout or self.timeout)
+
+    async def _run(self, provider: str, fn, args: tuple, kwargs: dict):
+        sem = self._sem(provider)
+        await sem.acquire()
+        try:
+            fut = asyncio.get_running_loop().run_in_executor(self.pool, functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            sem.release()
+            raise
+        fut.add_done_callback(lambda _: sem.release())
+        # shield: المهلة تلغي الانتظار فقط، والخيط يكمل ويحرر مقعده عند انتهائه
+        return await asyncio.shield(fut)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+EXECUTOR = ProviderExecutor(
+    workers=CFG["EXEC"]["workers"],
+    timeout=CFG["EXEC"]["timeout"],
+    limits=CFG["EXEC"]["limits"],
+)
+
+async def run_blocking(provider: str, fn, *args, timeout: float = None, **kwargs):
+    """ينفّذ fn الحاجبة في مجمع المزوّدين مع حد التزامن والمهلة الخاصين بـ provider."""
+    return await EXECUTOR.run(provider, fn, *args, timeout=timeout, **kwargs)
@@ -0,0 +1,111 @@
+"""
+Black-Scholes متجه (NumPy) لسلسلة خيارات كاملة في تمريرة واحدة.
+- bs_greeks: دلتا/غاما/ثيتا/فيغا لكل الصفوف.
+- implied_vol: حل IV متجه (نيوتن مع حماية بالتنصيف) للصفوف التي ينقصها IV من المصدر.
+المدخلات مصفوفات (أو أعداد) قابلة للبث؛ is_call مصفوفة منطقية.
+"""
+import numpy as np
+
+_SQRT2 = np.sqrt(2.0)
+_SQRT2PI = np.sqrt(2.0 * np.pi)
+
+def _erfc(x: np.ndarray) -> np.ndarray:
+    # تقريب Chebyshev (Numerical Recipes erfcc) — خطأ نسبي < 1.2e-7 على كامل المجال
+    z = np.abs(x)
+    t = 1.0 / (1.0 + 0.5 * z)
+    r = t * np.exp(-z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 +
+        t * (-0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 +
+        t * (-0.82215223 + t * 0.17087277)))))))))
+    return np.where(x >= 0, r, 2.0 - r)
+
+def norm_cdf(x):
+    return 0.5 * _erfc(-np.asarray(x, dtype=float) / _SQRT2)
+
+def norm_pdf(x):
+    x = np.asarray(x, dtype=float)
+    return np.exp(-0.5 * x * x) / _SQRT2PI
+
+def _d1_d2(spot, strike, t, iv, rate):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vt = iv * np.sqrt(t)
+        d1 = (np.log(spot / strike) + (rate + 0.5 * iv * iv) * t) / vt
+    return d1, d1 - vt
+
+def _valid(spot, strike, t, iv):
+    return (spot > 0) & (strike > 0) & (t > 0) & (iv > 0)
+
+def bs_price(spot, strike, t, iv, rate, is_call):
+    spot, strike, t, iv, rate = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (spot, strike, t, iv, rate)))
+    d1, d2 = _d1_d2(spot, strike, t, iv, rate)
+    disc = np.exp(-rate * t)
+    call = spot * norm_cdf(d1) - strike * disc * norm_cdf(d2)
+    put = strike * disc * norm_cdf(-d2) - spot * norm_cdf(-d1)
+    price = np.where(is_call, call, put)
+    # عند انعدام الزمن/التذبذب يبقى السعر = القيمة الذاتية
+    intrinsic = np.where(is_call, np.maximum(spot - strike, 0.0), np.maximum(strike - spot, 0.0))
+    return np.where(_valid(spot, strike, t, iv), price, intrinsic)
+
+def bs_greeks(spot, strike, t, iv, rate, is_call) -> dict:
+    """
+    يعيد dict من المصفوفات:
+    delta (بإشارتها: سالبة للـ PUT)، gamma، theta (لكل يوم تقويمي)، vega (لكل 1% تذبذب).
+    الصفوف غير الصالحة (سعر/زمن/IV <= 0) تُعاد أصفاراً كما في الحساب القديم.
+    """
+    spot, strike, t, iv, rate = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (spot, strike, t, iv, rate)))
+    is_call = np.broadcast_to(np.asarray(is_call, dtype=bool), spot.shape)
+    ok = _valid(spot, strike, t, iv)
+    d1, d2 = _d1_d2(spot, strike, t, iv, rate)
+    pdf = norm_pdf(d1)
+    disc = np.exp(-rate * t)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sqrt_t = np.sqrt(t)
+        delta = np.where(is_call, norm_cdf(d1), norm_cdf(d1) - 1.0)
+        gamma = pdf / (spot * iv * sqrt_t)
+        decay = -spot * pdf * iv / (2.0 * sqrt_t)
+        theta = np.where(is_call,
+                         decay - rate * strike * disc * norm_cdf(d2),
+                         decay + rate * strike * disc * norm_cdf(-d2)) / 365.0
+        vega = spot * pdf * sqrt_t / 100.0
+    zero = np.zeros_like(spot)
+    return {
+        "delta": np.where(ok, delta, zero),
+        "gamma": np.where(ok, gamma, zero),
+        "theta": np.where(ok, theta, zero),
+        "vega": np.where(ok, vega, zero),
+    }
+
+def implied_vol(price, spot, strike, t, rate, is_call,
+                lo: float = 1e-4, hi: float = 5.0, tol: float = 1e-6, max_iter: int = 50) -> np.ndarray:
+    """
+    IV متجه: خطوة نيوتن حين تبقى داخل المجال [lo, hi] وإلا تنصيف.
+    يعيد NaN للصفوف التي يقع سعرها خارج حدود عدم المراجحة.
+    """
+    price, spot, strike, t, rate = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (price, spot, strike, t, rate)))
+    is_call = np.broadcast_to(np.asarray(is_call, dtype=bool), price.shape)
+    lo_v = np.full(price.shape, lo)
+    hi_v = np.full(price.shape, hi)
+    p_lo = bs_price(spot, strike, t, lo_v, rate, is_call)
+    p_hi = bs_price(spot, strike, t, hi_v, rate, is_call)
+    solvable = (t > 0) & (spot > 0) & (strike > 0) & (price >= p_lo) & (price <= p_hi)
+
+    sigma = np.full(price.shape, 0.25)
+    active = solvable.copy()
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        p = bs_price(spot, strike, t, sigma, rate, is_call)
+        diff = p - price
+        done = np.abs(diff) < tol
+        active &= ~done
+        # تضييق المجال حول الجذر (السعر يتزايد مع التذبذب)
+        hi_v = np.where(active & (diff > 0), sigma, hi_v)
+        lo_v = np.where(active & (diff < 0), sigma, lo_v)
+        d1, _ = _d1_d2(spot, strike, t, sigma, rate)
+        vega = spot * norm_pdf(d1) * np.sqrt(t)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = sigma - diff / vega
+        inside = (newton > lo_v) & (newton < hi_v) & np.isfinite(newton)
+        nxt = np.where(inside, newton, 0.5 * (lo_v + hi_v))
+        sigma = np.where(active, nxt, sigma)
+        active &= (hi_v - lo_v) > tol
+    return np.where(solvable, sigma, np.nan)
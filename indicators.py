@@ -29,19 +29,223 @@ def pivot_points(h, l, c):
     s3 = l - 2*(h - p)
     return {"P":p, "R1":r1, "S1":s1, "R2":r2, "S2":s2, "R3":r3, "S3":s3}
 
-def swing_levels(close: pd.Series, lookback=50):
+def _prune_levels(prices: np.ndarray, thr: float) -> np.ndarray:
+    # الأسعار مرتبة تصاعدياً: نقفز مباشرة إلى أول مستوى يبعد أكثر من thr عن آخر مستوى محفوظ
+    keep = []
+    k = 0
+    while k < len(prices):
+        keep.append(k)
+        far = prices[k + 1:] - prices[k] > thr
+        if not far.any():
+            break
+        k = k + 1 + int(np.argmax(far))
+    return np.asarray(keep, dtype=np.int64)
+
+def swing_levels_batch(closes: dict, lookbacks=(50,), window: int = 5, keep: int = 12) -> dict:
+    """
+    مستويات القمم/القيعان لعدة فريمات وعدة lookback دفعة واحدة.
+    closes: {timeframe: pd.Series} — الناتج: {(timeframe, lookback): [(time, price), ...]}
+    القمة/القاع = سعر يساوي أعلى/أدنى نافذة منزلقة بعرض window متمركزة عليه.
+    """
+    rows = []
+    for tf, close in closes.items():
+        for lb in lookbacks:
+            rows.append((tf, lb, close.tail(lb)))
+    out = {(tf, lb): [] for tf, lb, _ in rows}
+    width = max((len(s) for _, _, s in rows), default=0)
+    if width < window:
+        return out
+
+    # مصفوفة ثنائية الأبعاد محاذاة لليمين ومكمّلة بـ NaN — النوافذ التي تلمس NaN تُستبعد تلقائياً
+    mat = np.full((len(rows), width), np.nan)
+    for r, (_, _, s) in enumerate(rows):
+        if len(s):
+            mat[r, width - len(s):] = s.to_numpy(dtype=float)
+    half = window // 2
+    win = np.lib.stride_tricks.sliding_window_view(mat, window, axis=1)
+    centers = mat[:, half:width - half]
+    with np.errstate(invalid="ignore"):
+        is_max = centers == win.max(axis=2)
+        is_min = centers == win.min(axis=2)
+        thr = np.nanmean(mat, axis=1) * 0.003
+
+    r_max, c_max = np.nonzero(is_max)
+    r_min, c_min = np.nonzero(is_min)
+    row = np.concatenate([r_max, r_min])
+    col = np.concatenate([c_max, c_min]) + half
+    kind = np.concatenate([np.zeros(len(r_max), np.int8), np.ones(len(r_min), np.int8)])
+    price = mat[row, col]
+    # نفس ترتيب الحلقة الأصلية: حسب السعر، ثم موضع الشمعة، ثم القمة قبل القاع
+    order = np.lexsort((kind, col, price, row))
+    row, col, price = row[order], col[order], price[order]
+    bounds = np.searchsorted(row, np.arange(len(rows) + 1))
+
+    for r, (tf, lb, s) in enumerate(rows):
+        a, b = bounds[r], bounds[r + 1]
+        if a == b:
+            continue
+        sel = _prune_levels(price[a:b], thr[r])[-keep:]
+        offset = width - len(s)
+        idx = s.index
+        out[(tf, lb)] = [(idx[c - offset], float(p)) for c, p in zip(col[a:b][sel], price[a:b][sel])]
+    return out
+
+def swing_levels(close: pd.Series, lookback=50, window: int = 5):
     if close.empty:
         return []
-    s = close.tail(lookback)
-    levels = []
-    for i in range(2, len(s)-2):
-        if s[i] == max(s[i-2:i+3]):
-            levels.append((s.index[i], float(s[i])))
-        if s[i] == min(s[i-2:i+3]):
-            levels.append((s.index[i], float(s[i])))
-    levels_sorted = sorted(levels, key=lambda x: x[1])
-    pruned = []
-    for t,price in levels_sorted:
-        if not pruned or abs(price - pruned[-1][1]) > np.mean(s)*0.003:
-            pruned.append((t,price))
-    return pruned[-12:]
+    return swing_levels_batch({"_": close}, lookbacks=(lookback,), window=window)[("_", lookback)]
+
+# ========= مؤشرات تراكمية (O(1) لكل شمعة) =========
+# تطابق دوال pandas أعلاه (ewm adjust=False) ضمن دقة الفاصلة العائمة.
+# update() يعتمد شمعة مكتملة ويغيّر الحالة، peek() يحسب قيمة الشمعة الجارية دون اعتمادها.
+
+class IncrementalEMA:
+    def __init__(self, n: int = None, alpha: float = None):
+        self.alpha = alpha if alpha is not None else 2.0 / (n + 1)
+        self.value = float("nan")
+        self.count = 0
+
+    def _next(self, x: float) -> float:
+        if self.count == 0:
+            return float(x)
+        return (1.0 - self.alpha) * self.value + self.alpha * float(x)
+
+    def update(self, x: float) -> float:
+        self.value = self._next(x)
+        self.count += 1
+        return self.value
+
+    def peek(self, x: float) -> float:
+        return self._next(x)
+
+    def seed(self, series: pd.Series) -> "IncrementalEMA":
+        s = series.dropna()
+        if not s.empty:
+            self.value = float(s.ewm(alpha=self.alpha, adjust=False).mean().iloc[-1])
+            self.count = len(s)
+        return self
+
+class IncrementalRSI:
+    def __init__(self, n: int = 14):
+        self.n = n
+        self.up = IncrementalEMA(alpha=1.0 / n)
+        self.down = IncrementalEMA(alpha=1.0 / n)
+        self.prev = None
+        self.value = float("nan")
+
+    @staticmethod
+    def _rsi(ma_up: float, ma_down: float) -> float:
+        if ma_down == 0 or ma_down != ma_down:
+            return float("nan")
+        return 100 - (100 / (1 + ma_up / ma_down))
+
+    def _deltas(self, close: float):
+        d = float(close) - self.prev
+        return max(d, 0.0), max(-d, 0.0)
+
+    def update(self, close: float) -> float:
+        if self.prev is not None:
+            u, d = self._deltas(close)
+            self.value = self._rsi(self.up.update(u), self.down.update(d))
+        self.prev = float(close)
+        return self.value
+
+    def peek(self, close: float) -> float:
+        if self.prev is None:
+            return float("nan")
+        u, d = self._deltas(close)
+        return self._rsi(self.up.peek(u), self.down.peek(d))
+
+    def seed(self, series: pd.Series) -> "IncrementalRSI":
+        s = series.dropna()
+        if s.empty:
+            return self
+        delta = s.diff().iloc[1:]
+        self.up.seed(delta.clip(lower=0))
+        self.down.seed(-1 * delta.clip(upper=0))
+        self.prev = float(s.iloc[-1])
+        self.value = self._rsi(self.up.value, self.down.value) if len(s) > 1 else float("nan")
+        return self
+
+class IncrementalMACD:
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = IncrementalEMA(fast)
+        self.slow = IncrementalEMA(slow)
+        self.signal = IncrementalEMA(signal)
+        self.value = (float("nan"),) * 3
+
+    def update(self, close: float):
+        m = self.fast.update(close) - self.slow.update(close)
+        s = self.signal.update(m)
+        self.value = (m, s, m - s)
+        return self.value
+
+    def peek(self, close: float):
+        m = self.fast.peek(close) - self.slow.peek(close)
+        s = self.signal.peek(m)
+        return (m, s, m - s)
+
+    def seed(self, series: pd.Series) -> "IncrementalMACD":
+        s = series.dropna()
+        if s.empty:
+            return self
+        line = (s.ewm(alpha=self.fast.alpha, adjust=False).mean()
+                - s.ewm(alpha=self.slow.alpha, adjust=False).mean())
+        self.fast.seed(s)
+        self.slow.seed(s)
+        self.signal.seed(line)
+        m = self.fast.value - self.slow.value
+        self.value = (m, self.signal.value, m - self.signal.value)
+        return self
+
+class IndicatorSet:
+    """RSI + MACD لفريم واحد تتزامن مع إطار شموع تتغير آخر شمعة فيه فقط."""
+    def __init__(self, rsi_n: int = 14, fast=12, slow=26, signal=9):
+        self._params = (rsi_n, fast, slow, signal)
+        self._reset()
+
+    def _reset(self):
+        rsi_n, fast, slow, signal = self._params
+        self.rsi = IncrementalRSI(rsi_n)
+        self.macd = IncrementalMACD(fast, slow, signal)
+        self.last_ts = None  # آخر شمعة مكتملة تم اعتمادها
+
+    def sync(self, df: pd.DataFrame) -> dict:
+        """
+        يعتمد الشموع المكتملة الجديدة (كل ما قبل الأخيرة) ثم يحسب قيمة الأخيرة الجارية.
+        إذا لم يعد الإطار يحتوي آخر شمعة معتمدة (فجوة/إعادة تشغيل) تُعاد التهيئة من التاريخ.
+        """
+        close = df["Close"].dropna() if not df.empty else pd.Series(dtype=float)
+        if len(close) < 2:
+            return {}
+        closed = close.iloc[:-1]
+        pos = -1
+        if self.last_ts is not None:
+            pos = closed.index.searchsorted(self.last_ts)
+            if pos >= len(closed) or closed.index[pos] != self.last_ts:
+                pos = -1
+        if pos < 0:
+            self._reset()
+            self.rsi.seed(closed)
+            self.macd.seed(closed)
+        else:
+            for x in closed.iloc[pos + 1:].to_numpy():
+                self.rsi.update(x)
+                self.macd.update(x)
+        self.last_ts = closed.index[-1]
+
+        x = float(close.iloc[-1])
+        m, s, h = self.macd.peek(x)
+        return {"rsi": self.rsi.peek(x), "macd": m, "signal": s, "hist": h}
+
+class MultiTimeframeIndicators:
+    """حالة مؤشرات مستقلة لكل فريم (1m/5m/15m من compact_timeframes)."""
+    def __init__(self, timeframes=("1m", "5m", "15m")):
+        self.sets = {tf: IndicatorSet() for tf in timeframes}
+
+    def __getitem__(self, tf: str) -> IndicatorSet:
+        return self.sets[tf]
+
+    def sync(self, packs: dict) -> dict:
+        return {tf: ind.sync(packs[tf]) for tf, ind in self.sets.items()
+                if isinstance(packs.get(tf), pd.DataFrame)}
@@ -0,0 +1,189 @@
+"""
+خط بيانات السوق: جلب الأسعار، حساب الإعداد، الشارت، الخيارات، الأخبار، ومهام التحديث.
+يحمّل pandas/matplotlib/yfinance/aiohttp — لذلك يستورده bot.py عند أول حاجة
+(أو في الخلفية بعد أن يبدأ البوت بالرد) وليس عند الإقلاع.
+"""
+import pandas as pd
+
+from config import CFG
+from data_providers import BAR_CACHE, BREAKER, PriceProvider, compact_timeframes
+from indicators import rsi, macd, MultiTimeframeIndicators
+from charting import RENDERER
+from options import ChainSnapshot
+from news import fetch_top_news, poll_breaking, cache_stats as news_cache_stats
+from state import STATE
+from alerts import AlertEngine
+from broadcast import BROADCAST
+from metrics import METRICS
+from subscriptions import SUBSCRIBERS
+from scanner import fetch_closes, scan, format_scan
+
+INDEX_SYMBOL = CFG["SYMBOL_INDEX"]  # ^GSPC افتراضياً
+
+# حالة RSI/MACD تراكمية لفريم 1m (الوحيد الذي يقرؤه compute_setup): تُحدَّث بالشموع الجديدة فقط
+# بدل إعادة حساب السلسلة كاملة.
+# الحالة والتنبيهات لكل مصدر: SPX و SPY و ES تتشارك الطوابع لا مستوى السعر،
+# فتبديل المصدر (إغلاق الجلسة، قاطع الدائرة) لا يغذّي EMA مصدر بسلسلة آخر ولا يقارن خطته بسعر آخر
+INDICATORS = {}  # source -> MultiTimeframeIndicators
+
+INTERVALS = CFG["INTERVALS"]
+
+ALERTS = {}  # source -> AlertEngine
+
+# تُقرأ عند طلب المقاييس فقط
+METRICS.register("bar_cache", BAR_CACHE.stats)
+METRICS.register("breaker", BREAKER.stats)
+METRICS.register("news_cache", news_cache_stats)
+METRICS.register("renderer", RENDERER.stats)
+
+# ========= Helpers =========
+async def fetch_prices():
+    async with PriceProvider() as prov:
+        # نجلب 1m مع فترة واسعة ليظهر آخر جلسة حتى لو السوق مغلق
+        df_1m = await prov.get_recent(INDEX_SYMBOL, interval="1m", lookback_minutes=600)
+        packs = await compact_timeframes(df_1m)
+        # إغلاقات المؤشر والعقود على الطوابع المشتركة (لحساب الأساس) — من نفس الطلب المجمّع
+        packs["aligned"] = await prov.get_aligned([INDEX_SYMBOL, CFG["SYMBOL_FUTURES"]], lookback_minutes=600)
+        return packs
+
+def compute_setup(df_1m: pd.DataFrame, ind: dict = None):
+    """
+    ind: قيم آخر شمعة من IndicatorSet.sync — إن لم تُمرَّر تُحسب من السلسلة كاملة.
+    "bar" = (طابع آخر شمعة 1m بالـ ns، إغلاقها) كما قُرئا هنا: مفتاح ذاكرة الردود في /status و /chart.
+    """
+    if df_1m.empty or len(df_1m) < 50:
+        return None
+    close = df_1m['Close']
+    if ind:
+        r_last, m_last, s_last = ind["rsi"], ind["macd"], ind["signal"]
+    else:
+        r = rsi(close)
+        m, s, _ = macd(close)
+        r_last, m_last, s_last = r.iloc[-1], m.iloc[-1], s.iloc[-1]
+    # نقرأ الإغلاق مرة واحدة: الإطار على memmap و BAR_STORE.merge يستبدل الشمعة الأخيرة في مكانها
+    last = float(close.iloc[-1])
+
+    t1 = last * (1 + CFG['RISK']['t1'])
+    t2 = last * (1 + CFG['RISK']['t2'])
+    t3 = last * (1 + CFG['RISK']['t3'])
+    sl = last * (1 - CFG['RISK']['stop'])
+
+    bias = "محايد"
+    if m_last > s_last and r_last > CFG['SIGNAL']['rsi_bull']:
+        bias = "صاعد"
+    elif m_last < s_last and r_last < CFG['SIGNAL']['rsi_bear']:
+        bias = "هابط"
+
+    return {
+        "price": float(last),
+        "targets": [float(t1), float(t2), float(t3)],
+        "stop": float(sl),
+        "bias": bias,
+        # الشمعة الأخيرة ما زالت تتكوّن وإغلاقها يتغير خلال الدقيقة، فالطابع وحده لا يكفي مفتاحاً
+        "bar": (int(df_1m.index[-1].value), last),
+    }
+
+def source_of(packs: dict) -> str:
+    df = packs.get('1m') if packs else None
+    return "" if df is None else df.attrs.get("source", "")
+
+async def make_chart(df_h: pd.DataFrame, targets: list, stop: float) -> bytes:
+    # شارت ساعة من محرك الفريمات (سيُظهر آخر جلسة عند إغلاق السوق)
+    with METRICS.phase("render"):
+        return await RENDERER.render(df_h, targets, stop, title="SPX H1 — Targets & S/R")
+
+# ========= Pre-computed state =========
+# كل load_* تعيد النتيجة من STATE إن كانت أحدث من فترة تحديثها، وإلا تجلبها وتخزنها.
+# مهام الجدولة تستدعيها بـ force=True.
+
+async def load_setup(force: bool = False):
+    """(packs, setup) — setup قد يكون None عند نقص البيانات."""
+    if not force:
+        hit = STATE.get("setup", INTERVALS["fast"])
+        if hit is not None:
+            return hit
+    with METRICS.phase("fetch"):
+        packs = await fetch_prices()
+    with METRICS.phase("compute"):
+        df1 = packs.get('1m', pd.DataFrame())
+        ind = INDICATORS.setdefault(source_of(packs), MultiTimeframeIndicators(("1m",)))
+        res = (packs, compute_setup(df1, ind.sync(packs).get('1m')))
+    STATE.put("setup", res)
+    return res
+
+async def load_chart(force: bool = False):
+    """(صورة شارت الساعة، setup["bar"] للشمعة التي رُسم عندها) أو None عند نقص البيانات."""
+    if not force:
+        hit = STATE.get("chart", INTERVALS["chart"])
+        if hit is not None:
+            return hit
+    packs, st = await load_setup()
+    if not st:
+        return None
+    img = await make_chart(packs['1h'], st['targets'], st['stop'])
+    res = (img, st["bar"])
+    STATE.put("chart", res)
+    return res
+
+async def load_chain(force: bool = False):
+    """
+    ({tenor: ChainSnapshot}, spot, {tenor: expiry}) لمزوّد الخيارات — جلب واحد لكل تحديث لكل الانتهاءات،
+    ولقطة واحدة لكل انتهاء تخدم كل استعلامات /strike.
+    """
+    if not force:
+        hit = STATE.get("chain", INTERVALS["med"])
+        if hit is not None:
+            return hit
+    from options_provider import YFinanceOptionsProvider
+    prov = YFinanceOptionsProvider(CFG.get("OPTIONS_UNDERLYING", "SPY"))
+    with METRICS.phase("fetch"):
+        df, spot, picks = await prov.chain_async()
+    if df.empty:
+        return {}, spot, {}
+    with METRICS.phase("compute"):
+        snaps = {e: ChainSnapshot.from_df(g) for e, g in df.groupby("expiry", sort=False)}
+        res = ({t: snaps[e] for t, e in picks.items() if e in snaps}, spot, picks)
+    STATE.put("chain", res)
+    return res
+
+async def load_scan(force: bool = False):
+    """جدول scan لرموز SCAN_SYMBOLS (فارغ عند نقص البيانات)."""
+    if not force:
+        hit = STATE.get("scan", INTERVALS["fast"])
+        if hit is not None:
+            return hit
+    with METRICS.phase("fetch"):
+        closes = await fetch_closes(CFG["SCAN"]["symbols"], CFG["SCAN"]["bars"])
+    with METRICS.phase("compute"):
+        res = scan(closes)
+    STATE.put("scan", res)
+    return res
+
+async def load_news(lang: str = "en", force: bool = False):
+    if not force:
+        hit = STATE.get(("news", lang), INTERVALS["slow"])
+        if hit is not None:
+            return hit
+    with METRICS.phase("fetch"):
+        items = await fetch_top_news(limit=5, lang=lang)
+    STATE.put(("news", lang), items)
+    return items
+
+async def refresh_prices():
+    packs, st = await load_setup(force=True)
+    msgs = ALERTS.setdefault(source_of(packs), AlertEngine()).evaluate(packs.get('1m'), st)
+    if msgs and len(SUBSCRIBERS):
+        BROADCAST.publish(SUBSCRIBERS.all(), "\n".join(msgs))
+
+async def refresh_fast():
+    await refresh_prices()
+    # عناوين FOMC/CPI العاجلة تُدفع دون انتظار دورة الأخبار البطيئة
+    msgs = await poll_breaking()
+    if msgs and len(SUBSCRIBERS):
+        BROADCAST.publish(SUBSCRIBERS.all(), "\n\n".join(msgs))
+
+async def refresh_news():
+    # نحدّث الإنجليزية دائماً + أي لغة طُلبت سابقاً
+    langs = {"en"} | {k[1] for k in STATE.keys() if isinstance(k, tuple) and k[0] == "news"}
+    for lang in sorted(langs):
+        await load_news(lang, force=True)
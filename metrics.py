@@ -0,0 +1,202 @@
+"""
+مقاييس داخلية خفيفة (بدون مكتبات خارجية) تُعرض عبر /metrics للمشرف وبصيغة Prometheus النصية (webserver.py).
+- command_seconds{command}: زمن الأمر كاملاً.
+- phase_seconds{command,phase}: fetch / compute / render / send داخل الأمر أو مهمة التحديث.
+- provider_calls_total / provider_errors_total / provider_seconds {provider}.
+- collectors: دوال تُستدعى وقت القراءة فقط (نسب إصابة الكاش وغيرها) فلا كلفة على المسار الساخن.
+  القيمة dict {مفتاح: رقم} تُعرض gauge واحداً بوسم key (مثل تبريد قاطع الدائرة لكل رمز).
+التسجيل = بحث في dict + bisect على حدود ثابتة.
+"""
+import bisect
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+
+# حدود الهستوغرام بالثواني
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# الأمر/المهمة الجارية — تُنسب إليها أزمنة المراحل في الدوال المشتركة (load_setup وغيرها)
+CURRENT = contextvars.ContextVar("metrics_command", default="background")
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # الأخير = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """تقدير من الحدود بالاستيفاء الخطي داخل الحاوية (كـ histogram_quantile)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if seen + c >= rank and c:
+                lo = BUCKETS[i - 1] if i > 0 else 0.0
+                hi = BUCKETS[i] if i < len(BUCKETS) else BUCKETS[-1]
+                return lo + (hi - lo) * (rank - seen) / c
+            seen += c
+        return BUCKETS[-1]
+
+_HELP = {
+    "command_seconds": "Telegram command latency",
+    "phase_seconds": "Latency per phase (fetch/compute/render/send)",
+    "provider_seconds": "Upstream provider call latency",
+    "provider_calls_total": "Upstream provider calls",
+    "provider_errors_total": "Upstream provider calls that raised or timed out",
+    "webhook_updates_total": "Updates received on the webhook endpoint",
+}
+
+def _fmt(v) -> str:
+    if isinstance(v, float):
+        return f"{v:.2f}"
+    if isinstance(v, dict):
+        return "{" + " ".join(f"{k}:{x:.0f}" for k, x in v.items()) + "}"
+    return str(v)
+
+class Metrics:
+    def __init__(self, prefix: str = "spxbot"):
+        self.prefix = prefix
+        self._hist = {}       # (name, labels) -> Histogram
+        self._counters = {}   # (name, labels) -> float
+        self._collectors = {} # اسم -> دالة تعيد {مفتاح: رقم}
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        h = self._hist.get(key)
+        if h is None:
+            h = self._hist[key] = Histogram()
+        h.observe(value)
+
+    def inc(self, name: str, n: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + n
+
+    def register(self, name: str, fn):
+        """fn() -> {metric: رقم أو {key: رقم}} — تُقرأ عند العرض فقط (مثل BAR_CACHE.stats)."""
+        self._collectors[name] = fn
+
+    @contextmanager
+    def phase(self, phase: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("phase_seconds", time.perf_counter() - t0, command=CURRENT.get(), phase=phase)
+
+    def command(self, name: str):
+        """مزخرف لأوامر البوت: يضبط CURRENT ويسجل الزمن الكلي."""
+        def deco(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                token = CURRENT.set(name)
+                t0 = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self.observe("command_seconds", time.perf_counter() - t0, command=name)
+                    CURRENT.reset(token)
+            return wrapper
+        return deco
+
+    @contextmanager
+    def track(self, provider: str):
+        """يحيط باستدعاء مزوّد خارجي: عدد، أخطاء (استثناء/مهلة)، وزمن."""
+        t0 = time.perf_counter()
+        self.inc("provider_calls_total", provider=provider)
+        try:
+            yield
+        except Exception:  # الإلغاء ليس خطأ مزوّد
+            self.inc("provider_errors_total", provider=provider)
+            raise
+        finally:
+            self.observe("provider_seconds", time.perf_counter() - t0, provider=provider)
+
+    def collect(self) -> dict:
+        out = {}
+        for name, fn in self._collectors.items():
+            try:
+                out[name] = fn()
+            except Exception as e:  # مقياس معطوب لا يُسقط العرض كله
+                out[name] = {"error": str(e)}
+        return out
+
+    # ===== العرض =====
+    @staticmethod
+    def _labels(labels: tuple, extra: str = "") -> str:
+        parts = [f'{k}="{v}"' for k, v in labels]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def prometheus(self) -> str:
+        p = self.prefix
+        lines = []
+        typed = set()
+
+        def header(name, kind, help_):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# HELP {p}_{name} {help_}")
+                lines.append(f"# TYPE {p}_{name} {kind}")
+
+        for (name, labels), h in sorted(self._hist.items()):
+            header(name, "histogram", _HELP.get(name, name))
+            cum = 0
+            for b, c in zip(BUCKETS + (float("inf"),), h.counts):
+                cum += c
+                le = 'le="+Inf"' if b == float("inf") else f'le="{b}"'
+                lines.append(f"{p}_{name}_bucket{self._labels(labels, le)} {cum}")
+            lines.append(f"{p}_{name}_sum{self._labels(labels)} {h.sum:.6f}")
+            lines.append(f"{p}_{name}_count{self._labels(labels)} {h.count}")
+        for (name, labels), v in sorted(self._counters.items()):
+            header(name, "counter", _HELP.get(name, name))
+            lines.append(f"{p}_{name}{self._labels(labels)} {v:g}")
+        for group, values in sorted(self.collect().items()):
+            for k, v in values.items():
+                if isinstance(v, dict):
+                    header(f"{group}_{k}", "gauge", f"{group} {k}")
+                    for key, x in sorted(v.items()):
+                        lines.append(f"{p}_{group}_{k}{self._labels((('key', key),))} {x:g}")
+                    continue
+                if isinstance(v, bool) or not isinstance(v, (int, float)):
+                    continue
+                header(f"{group}_{k}", "gauge", f"{group} {k}")
+                lines.append(f"{p}_{group}_{k} {v:g}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """نص مختصر لأمر /metrics."""
+        lines = ["⏱ الأوامر (p50/p95 ms, n):"]
+        for (name, labels), h in sorted(self._hist.items()):
+            if name != "command_seconds":
+                continue
+            cmd = dict(labels)["command"]
+            lines.append(f"/{cmd}: {h.quantile(0.5)*1e3:.0f}/{h.quantile(0.95)*1e3:.0f}, n={h.count}")
+            phases = [(dict(l)["phase"], ph) for (n, l), ph in sorted(self._hist.items())
+                      if n == "phase_seconds" and dict(l)["command"] == cmd]
+            if phases:
+                lines.append("   " + " | ".join(f"{ph} {x.quantile(0.5)*1e3:.0f}/{x.quantile(0.95)*1e3:.0f}"
+                                                for ph, x in phases))
+        calls = {dict(l)["provider"]: v for (n, l), v in self._counters.items() if n == "provider_calls_total"}
+        if calls:
+            lines.append("🌐 المزوّدون (استدعاءات، أخطاء، p95 ms):")
+            for prov, n in sorted(calls.items()):
+                err = self._counters.get(("provider_errors_total", (("provider", prov),)), 0)
+                h = self._hist.get(("provider_seconds", (("provider", prov),)))
+                p95 = h.quantile(0.95) * 1e3 if h else 0.0
+                lines.append(f"{prov}: {n:g}, {err:g} ({err / n:.0%}), {p95:.0f}")
+        for group, values in sorted(self.collect().items()):
+            vals = ", ".join(f"{k}={_fmt(v)}" for k, v in values.items())
+            lines.append(f"📦 {group}: {vals}")
+        return "\n".join(lines)
+
+METRICS = Metrics()
@@ -1,9 +1,19 @@
+import asyncio
+import logging
+import re
+import time
 import aiohttp
-from datetime import datetime, timedelta, timezone
+from collections import deque
+from datetime import datetime
 from typing import List
+from urllib.parse import urlsplit
 import yfinance as yf
 
 from config import CFG
+from executor import run_blocking
+from metrics import METRICS
+
+log = logging.getLogger(__name__)
 
 NEWS_KEY = CFG["API_KEYS"].get("newsapi", "")
 FINNHUB_KEY = CFG["API_KEYS"].get("finnhub", "")
@@ -26,94 +36,227 @@ def _fmt_lines(items: List[dict], limit: int = 5) -> List[str]:
         out.append(line)
     return out or ["لا توجد أخبار متاحة حالياً."]
 
+# ========= جلسة HTTP مشتركة =========
+_SESSION = None
+
+def _session() -> aiohttp.ClientSession:
+    """جلسة aiohttp واحدة (مجمع اتصالات keep-alive + كاش DNS) لكل مصادر الأخبار."""
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=CFG["NEWS"]["budget"]),
+        )
+    return _SESSION
+
+async def close_session():
+    global _SESSION
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+    _SESSION = None
+
+# ========= المصادر (تعيد عناصر خام: title/source/url/ts) =========
 async def _via_newsapi(limit: int = 5, lang: str = "en"):
     if not NEWS_KEY:
         return None
-    url = (
-        "https://newsapi.org/v2/everything"
-        f"?q={NEWS_QUERY}"
-        f"&language={lang}&sortBy=publishedAt&pageSize={limit}&apiKey={NEWS_KEY}"
-    )
-    try:
-        async with aiohttp.ClientSession() as s:
-            async with s.get(url, timeout=20) as r:
+    params = {"q": NEWS_QUERY, "language": lang, "sortBy": "publishedAt",
+              "pageSize": limit * 2, "apiKey": NEWS_KEY}
+    with METRICS.track("newsapi"):
+        async with _session().get("https://newsapi.org/v2/everything", params=params) as r:
+            js = await r.json()
+    arts = js.get("articles") or []
+    items = []
+    for a in arts:
+        try:
+            ts = datetime.fromisoformat((a.get("publishedAt") or "").replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            ts = 0
+        items.append({"title": a.get("title",""),
+                      "source": (a.get("source",{}) or {}).get("name",""),
+                      "url": a.get("url",""),
+                      "ts": ts})
+    return items
+
+# ========= Finnhub: استيعاب تزايدي =========
+# الكلمات المفتاحية وأوزانها في درجة الصلة؛ المطابقة جزئية وغير حساسة لحالة الأحرف
+KEYWORDS = {
+    "S&P": 2, "SPX": 3, "Fed": 2, "FOMC": 3, "CPI": 3, "inflation": 2,
+    "Treasury": 1, "Nvidia": 1, "Apple": 1, "Microsoft": 1,
+}
+BREAKING = ("fomc", "cpi")  # عناوين تُدفع فوراً للمشتركين
+_KEYWORD_RE = re.compile("|".join(re.escape(k) for k in sorted(KEYWORDS, key=len, reverse=True)), re.IGNORECASE)
+_WEIGHTS = {k.lower(): w for k, w in KEYWORDS.items()}
+
+class FinnhubIngester:
+    """
+    يطلب فقط الأخبار الأحدث من أعلى id شوهد (minId)، يطابق الكلمات بمطابق واحد مُجمّع،
+    ويحتفظ بحلقة محدودة من آخر العناصر المطابقة مع درجة صلة وعلامة "عاجل".
+    """
+    def __init__(self, maxlen: int = 200, breaking_max_age: float = 1800.0):
+        self.min_id = 0
+        self.ring = deque(maxlen=maxlen)
+        self.latest = []  # آخر دفعة كاملة غير مفلترة (بديل إن لم يطابق شيء)
+        self.breaking_max_age = breaking_max_age
+        self._breaking = []
+
+    @staticmethod
+    def match(text: str) -> set:
+        return {m.group(0).lower() for m in _KEYWORD_RE.finditer(text)}
+
+    async def poll(self) -> list:
+        """يعيد العناصر المطابقة الجديدة فقط (الأقدم أولاً)."""
+        params = {"category": "general", "token": FINNHUB_KEY}
+        if self.min_id:
+            params["minId"] = self.min_id
+        with METRICS.track("finnhub"):
+            async with _session().get("https://finnhub.io/api/v1/news", params=params) as r:
                 js = await r.json()
-                arts = js.get("articles") or []
-                items = [
-                    {"title": a.get("title",""),
-                     "source": (a.get("source",{}) or {}).get("name",""),
-                     "url": a.get("url","")}
-                    for a in arts
-                ]
-                return _fmt_lines(items, limit)
-    except Exception as e:
-        return [f"تعذّر جلب الأخبار عبر NewsAPI: {e}"]
+        if not isinstance(js, list) or not js:
+            return []
+        backfill = self.min_id == 0
+        js = sorted((x for x in js if int(x.get("id") or 0) > self.min_id), key=lambda x: int(x.get("id") or 0))
+        if not js:
+            return []
+        self.min_id = int(js[-1].get("id") or self.min_id)
+        now = time.time()
+        fresh = []
+        for x in js:
+            hits = self.match(f"{x.get('headline','')} {x.get('summary','')}")
+            item = {"title": x.get("headline",""),
+                    "source": x.get("source",""),
+                    "url": x.get("url",""),
+                    "ts": x.get("datetime") or 0,
+                    "id": x.get("id"),
+                    "score": sum(_WEIGHTS.get(h, 0) for h in hits),
+                    "breaking": any(b in hits for b in BREAKING)}
+            if hits:
+                self.ring.append(item)
+                fresh.append(item)
+                # لا ندفع ما جاء في التعبئة الأولى أو ما تقادم
+                if item["breaking"] and not backfill and now - float(item["ts"]) < self.breaking_max_age:
+                    self._breaking.append(item)
+        self.latest = [{"title": x.get("headline",""), "source": x.get("source",""),
+                        "url": x.get("url",""), "ts": x.get("datetime") or 0} for x in js]
+        return fresh
+
+    def top(self, limit: int = 5, max_age: float = 86400.0) -> list:
+        """الأعلى صلة (ثم الأحدث) بين عناصر آخر max_age ثانية — عنوان CPI قديم لا يتصدر أخبار اليوم."""
+        cutoff = time.time() - max_age
+        items = [x for x in self.ring if float(x["ts"] or 0) >= cutoff]
+        return sorted(items, key=lambda x: (x["score"], float(x["ts"] or 0)), reverse=True)[:limit]
+
+    def take_breaking(self) -> list:
+        out, self._breaking = self._breaking, []
+        return out
+
+FINNHUB = FinnhubIngester()
 
 async def _via_finnhub(limit: int = 5):
     if not FINNHUB_KEY:
         return None
-    # أخبار عامة (أسرع من company-news المتطلب لنطاق تاريخ)
-    url = f"https://finnhub.io/api/v1/news?category=general&token={FINNHUB_KEY}"
+    await FINNHUB.poll()
+    # أعلى العناصر صلة بمواضيع السوق الأمريكي؛ وإن لم يطابق شيء نعرض آخر الأخبار العامة
+    return FINNHUB.top(limit) or list(reversed(FINNHUB.latest))[:limit]
+
+async def poll_breaking() -> list:
+    """يستطلع Finnhub ويعيد نصوص العناوين العاجلة الجديدة (FOMC/CPI) للدفع."""
+    if not FINNHUB_KEY:
+        return []
     try:
-        async with aiohttp.ClientSession() as s:
-            async with s.get(url, timeout=20) as r:
-                js = await r.json()
-                if not isinstance(js, list):
-                    return ["تعذّر جلب الأخبار عبر Finnhub."]
-                # فرز بالأحدث وتخفيف الضجيج على مواضيع السوق الأمريكي
-                KEYWORDS = ("S&P", "SPX", "Fed", "FOMC", "CPI", "inflation", "Treasury", "Nvidia", "Apple", "Microsoft")
-                filt = [x for x in js if any(k.lower() in (x.get("headline","")+x.get("summary","")).lower() for k in KEYWORDS)]
-                items = [
-                    {"title": x.get("headline",""),
-                     "source": x.get("source",""),
-                     "url": x.get("url","")}
-                    for x in (filt or js)
-                ]
-                return _fmt_lines(items, limit)
+        await FINNHUB.poll()
     except Exception as e:
-        return [f"تعذّر جلب الأخبار عبر Finnhub: {e}"]
+        log.warning("finnhub poll failed: %s", e)
+        return []
+    return [f"🚨 عاجل: {x['title']}" + (f"\n{x['url']}" if x["url"] else "") for x in FINNHUB.take_breaking()]
 
 def _via_yfinance(limit: int = 5):
     # لا تحتاج أي مفتاح — نجلب أخبار SPY و ^GSPC ونوحّدها
-    try:
-        items = []
-        for sym in ("SPY", "^GSPC"):
-            tk = yf.Ticker(sym)
-            news = tk.news or []
-            for n in news:
-                t = n.get("title","")
-                link = n.get("link","") or n.get("url","")
-                src = (n.get("publisher","") or n.get("source","")).strip()
-                # وقت النشر (يونكس) لاختيار الأحدث
-                ts = n.get("providerPublishTime") or n.get("published_at")
-                items.append({
-                    "title": t, "url": link, "source": src, "ts": ts or 0
-                })
-        items = [x for x in items if x.get("title")]
-        items.sort(key=lambda x: x.get("ts", 0), reverse=True)
+    items = []
+    for sym in ("SPY", "^GSPC"):
+        tk = yf.Ticker(sym)
+        news = tk.news or []
+        for n in news:
+            t = n.get("title","")
+            link = n.get("link","") or n.get("url","")
+            src = (n.get("publisher","") or n.get("source","")).strip()
+            # وقت النشر (يونكس) لاختيار الأحدث
+            ts = n.get("providerPublishTime") or n.get("published_at")
+            items.append({
+                "title": t, "url": link, "source": src, "ts": ts or 0
+            })
+    return [x for x in items if x.get("title")]
+
+# ========= التجميع =========
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+def _title_key(title: str) -> str:
+    return _NON_WORD.sub(" ", title.lower()).strip()
+
+def _url_key(url: str) -> str:
+    # نتجاهل المعاملات والـ fragment (روابط التتبع) وبادئة www
+    p = urlsplit(url.strip())
+    host = p.netloc.lower().removeprefix("www.")
+    return f"{host}{p.path.rstrip('/')}" if host else ""
+
+def merge_items(groups: List[List[dict]]) -> List[dict]:
+    """يدمج عناصر عدة مصادر، يزيل المكرر بالعنوان المطبّع أو الرابط، ويرتب بالأحدث."""
+    seen_t, seen_u, out = set(), set(), []
+    for items in groups:
         for x in items:
-            # تطبيع الحقل للعارض
-            x["source"] = x.get("source","")
-        return _fmt_lines(items, limit)
-    except Exception:
-        return ["لا توجد أخبار متاحة حالياً."]
+            tk, uk = _title_key(x.get("title", "")), _url_key(x.get("url", ""))
+            if not tk or tk in seen_t or (uk and uk in seen_u):
+                continue
+            seen_t.add(tk)
+            if uk:
+                seen_u.add(uk)
+            out.append(x)
+    out.sort(key=lambda x: float(x.get("ts") or 0), reverse=True)
+    return out
+
+_CACHE = {}  # lang -> (expires_at, items)
+_CACHE_STATS = {"hits": 0, "misses": 0}
+
+def cache_stats() -> dict:
+    lookups = _CACHE_STATS["hits"] + _CACHE_STATS["misses"]
+    return {**_CACHE_STATS, "hit_ratio": _CACHE_STATS["hits"] / lookups if lookups else 0.0}
 
 async def fetch_top_news(limit: int = 5, lang: str = "en"):
     """
-    تفضيلات جلب الأخبار تلقائياً:
-    1) NewsAPI إذا NEWSAPI_KEY موجود.
-    2) Finnhub إذا FINNHUB_API_KEY موجود.
-    3) YFinance بدون أي مفتاح.
+    يستعلم كل المصادر المتاحة بالتوازي ضمن ميزانية زمنية (NEWS_BUDGET):
+    NewsAPI (إن وُجد NEWSAPI_KEY)، Finnhub (إن وُجد FINNHUB_API_KEY: أعلى limit عناصر بدرجة الصلة
+    عبر FINNHUB.top)، و YFinance دائماً.
+    ما يصل قبل انتهاء الميزانية يُدمج ويُزال تكراره، والنتيجة تُخزّن لكل لغة لمدة NEWS_CACHE_TTL.
+    لغير الإنجليزية تُفضَّل نتائج NewsAPI (المصدر الوحيد الداعم للغة) إن وُجدت.
     """
-    # 1) NewsAPI
-    if NEWS_KEY:
-        r = await _via_newsapi(limit=limit, lang=lang)
-        if r: return r
+    hit = _CACHE.get(lang)
+    if hit and hit[0] > time.monotonic():
+        _CACHE_STATS["hits"] += 1
+        return _fmt_lines(hit[1], limit)
+    _CACHE_STATS["misses"] += 1
 
-    # 2) Finnhub
+    sources = {}
+    if NEWS_KEY:
+        sources["newsapi"] = asyncio.ensure_future(_via_newsapi(limit=limit, lang=lang))
     if FINNHUB_KEY:
-        r = await _via_finnhub(limit=limit)
-        if r: return r
+        sources["finnhub"] = asyncio.ensure_future(_via_finnhub(limit=limit))
+    sources["yfinance"] = asyncio.ensure_future(run_blocking("yfinance", _via_yfinance, limit=limit))
+
+    done, pending = await asyncio.wait(sources.values(), timeout=CFG["NEWS"]["budget"])
+    for t in pending:
+        t.cancel()
+    results = {}
+    for name, task in sources.items():
+        if task in done:
+            if task.exception() is not None:
+                log.warning("news source %s failed: %s", name, task.exception())
+            elif task.result():
+                results[name] = task.result()
 
-    # 3) YFinance
-    return _via_yfinance(limit=limit)
+    if lang != "en" and results.get("newsapi"):
+        groups = [results["newsapi"]]
+    else:
+        groups = [results[n] for n in ("newsapi", "finnhub", "yfinance") if n in results]
+    items = merge_items(groups)
+    if items:
+        _CACHE[lang] = (time.monotonic() + CFG["NEWS"]["cache_ttl"], items)
+    return _fmt_lines(items, limit)
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from typing import Optional
+import numpy as np
 import pandas as pd
 
 @dataclass
@@ -21,29 +22,87 @@ class BestStrike:
     call: Optional[OptionCandidate]
     put: Optional[OptionCandidate]
 
+class ChainSnapshot:
+    """
+    لقطة ثابتة لسلسلة خيارات: أعمدة NumPy لكل جانب مرتبة حسب strike، مع spread محسوب مسبقاً
+    وفهرس مرتب حسب delta. كل استعلام = بحث ثنائي على نطاق الدلتا ثم تصفية الشريحة الصغيرة فقط،
+    فتُخدم استعلامات كثيرة بمعاملات مختلفة من سلسلة واحدة مخزنة دون نسخ الإطار.
+    """
+    _COLS = ("symbol", "strike", "delta", "bid", "ask", "spread", "volume", "oi", "expiry", "pos")
+
+    def __init__(self, sides: dict, size: int):
+        self._sides = sides
+        self.size = size
+
+    @classmethod
+    def from_df(cls, options_df: pd.DataFrame) -> "ChainSnapshot":
+        sides = {}
+        n = 0 if options_df is None else len(options_df)
+        if n:
+            side = options_df["side"].to_numpy()
+            cols = {
+                "symbol": options_df["symbol"].to_numpy(dtype=object),
+                "strike": options_df["strike"].to_numpy(dtype=float),
+                "delta": options_df["delta"].to_numpy(dtype=float),
+                "bid": options_df["bid"].to_numpy(dtype=float),
+                "ask": options_df["ask"].to_numpy(dtype=float),
+                "volume": options_df["volume"].to_numpy(dtype=np.int64),
+                "oi": options_df["oi"].to_numpy(dtype=np.int64),
+                "expiry": options_df["expiry"].astype(str).to_numpy(dtype=object),
+                "pos": np.arange(n),  # ترتيب الصف الأصلي لكسر التعادل كما في الفرز المستقر
+            }
+            cols["spread"] = np.clip(cols["ask"] - cols["bid"], 0, None)
+            for name in ("CALL", "PUT"):
+                idx = np.flatnonzero(side == name)
+                idx = idx[np.argsort(cols["strike"][idx], kind="stable")]
+                arr = {c: cols[c][idx] for c in cls._COLS}
+                # NaN في نهاية الترتيب فلا يدخل أي نطاق
+                by_delta = np.argsort(arr["delta"], kind="stable")
+                arr["by_delta"] = by_delta
+                arr["delta_sorted"] = arr["delta"][by_delta]
+                for a in arr.values():
+                    a.flags.writeable = False
+                sides[name] = arr
+        return cls(sides, n)
+
+    @property
+    def empty(self) -> bool:
+        return self.size == 0
+
+    def __len__(self):
+        return self.size
+
+    def choose(self, side: str, price: float, dmin=0.2, dmax=0.35, max_spread=0.3,
+               min_vol=200, min_oi=500) -> Optional[OptionCandidate]:
+        a = self._sides.get(side)
+        if a is None:
+            return None
+        lo = np.searchsorted(a["delta_sorted"], dmin, side="left")
+        hi = np.searchsorted(a["delta_sorted"], dmax, side="right")
+        if lo >= hi:
+            return None
+        band = a["by_delta"][lo:hi]
+        ok = ((a["spread"][band] <= max_spread) & (a["volume"][band] >= min_vol) & (a["oi"][band] >= min_oi))
+        cand = band[ok]
+        if not len(cand):
+            return None
+        # الأقرب للسعر، ثم الأضيق spread، ثم الأعلى حجماً، ثم ترتيب السلسلة الأصلي
+        kdist = np.abs(a["strike"][cand] - price)
+        i = cand[np.lexsort((a["pos"][cand], -a["volume"][cand], a["spread"][cand], kdist))[0]]
+        return OptionCandidate(symbol=a["symbol"][i], strike=float(a["strike"][i]), side=side,
+                               delta=float(a["delta"][i]), bid=float(a["bid"][i]), ask=float(a["ask"][i]),
+                               spread=float(a["spread"][i]), volume=int(a["volume"][i]), oi=int(a["oi"][i]),
+                               expiry=str(a["expiry"][i]))
+
+    def best(self, price: float, **filters) -> BestStrike:
+        return BestStrike(underlying=price, call=self.choose("CALL", price, **filters),
+                          put=self.choose("PUT", price, **filters))
+
 def pick_best_strike(options_df: pd.DataFrame, price: float,
                      dmin=0.2, dmax=0.35, max_spread=0.3,
                      min_vol=200, min_oi=500) -> BestStrike:
-    if options_df is None or options_df.empty:
-        return BestStrike(underlying=price, call=None, put=None)
-
-    options_df = options_df.copy()
-    options_df["spread"] = (options_df["ask"] - options_df["bid"]).clip(lower=0)
-
-    def choose(side):
-        sub = options_df[(options_df["side"]==side) &
-                         (options_df["delta"].between(dmin, dmax, inclusive='both')) &
-                         (options_df["spread"] <= max_spread) &
-                         (options_df["volume"] >= min_vol) &
-                         (options_df["oi"] >= min_oi)]
-        if sub.empty:
-            return None
-        sub["kdist"] = (sub["strike"] - price).abs()
-        sub = sub.sort_values(["kdist", "spread", "volume"], ascending=[True, True, False])
-        r = sub.iloc[0]
-        return OptionCandidate(symbol=r["symbol"], strike=float(r["strike"]), side=side,
-                               delta=float(r["delta"]), bid=float(r["bid"]), ask=float(r["ask"]),
-                               spread=float(r["spread"]), volume=int(r["volume"]), oi=int(r["oi"]),
-                               expiry=str(r["expiry"]))
-
-    return BestStrike(underlying=price, call=choose("CALL"), put=choose("PUT"))
+    if isinstance(options_df, ChainSnapshot):
+        snap = options_df
+    else:
+        snap = ChainSnapshot.from_df(options_df)
+    return snap.best(price, dmin=dmin, dmax=dmax, max_spread=max_spread, min_vol=min_vol, min_oi=min_oi)
@@ -1,58 +1,117 @@
-import math
-from datetime import datetime, timedelta
+import asyncio
+import logging
+from datetime import datetime, time, timedelta
 from zoneinfo import ZoneInfo
-from typing import Literal
+import numpy as np
 import pandas as pd
 import yfinance as yf
 
+from chain_store import CHAIN_STORE
 from config import CFG
+from executor import run_blocking
+from greeks import bs_greeks, implied_vol
+
+log = logging.getLogger(__name__)
 
 NY = ZoneInfo("America/New_York")
-_DEF_SQRT2 = math.sqrt(2.0)
+_DEF_IV = 0.25
+_MIN_IV = 0.01  # ياهو يضع قيماً شبه صفرية (1e-5) عند غياب IV الحقيقي
+TENORS = ("0dte", "1dte", "weekly")
+# قائمة الانتهاءات تتغير مرة في اليوم: نحفظها مع Ticker اليوم (tk.options يخزنها داخله، فلا يعيد
+# option_chain جلبها لكل انتهاء). سعر الأصل من Ticker جديد لكل تحديث: fast_info يحفظ last_price في الكائن
+_TICKERS = {}   # underlying -> (يوم نيويورك، yf.Ticker)
+_EXPIRIES = {}  # underlying -> (يوم نيويورك، (YYYY-MM-DD, ...))
+_INFLIGHT = {}  # (underlying, tenors) -> asyncio.Task: التحديثات المتزامنة تنتظر جلباً واحداً (كما في BarCache)
+
+def _years_to_close(expiry: str = None) -> float:
+    """السنوات حتى إغلاق 16:00 نيويورك يوم expiry (اليوم إن لم يُمرّر)."""
+    now = datetime.now(NY)
+    day = datetime.fromisoformat(expiry).date() if expiry else now.date()
+    mkt_close = datetime.combine(day, time(16, 0), NY)
+    if now > mkt_close:
+        mkt_close = now + timedelta(hours=6)
+    return max((mkt_close - now).total_seconds(), 60.0) / (365.0*24*3600)
 
-def _ndtr(x: float) -> float:
-    return 0.5 * (1.0 + math.erf(x / _DEF_SQRT2))
+def pick_expiries(expiries, today) -> dict:
+    """
+    {tenor: expiry} من قائمة تواريخ YYYY-MM-DD:
+    0dte = أقرب انتهاء اليوم أو بعده (كالسابق)، 1dte = الذي يليه، weekly = أول جمعة بعد 0dte.
+    """
+    days = []
+    for d in expiries:
+        try:
+            if datetime.fromisoformat(d).date() >= today:
+                days.append(d)
+        except ValueError:
+            continue
+    days.sort()
+    if not days:
+        return {}
+    out = {"0dte": days[0]}
+    if len(days) > 1:
+        out["1dte"] = days[1]
+    weekly = next((d for d in days[1:] if datetime.fromisoformat(d).weekday() == 4), None)
+    if weekly:
+        out["weekly"] = weekly
+    return out
 
-def _bs_delta(spot: float, strike: float, t_years: float, iv: float, rate: float, side: Literal["CALL","PUT"]) -> float:
-    if spot <= 0 or strike <= 0 or iv <= 0 or t_years <= 0:
-        return 0.0
-    d1 = (math.log(spot/strike) + (rate + 0.5*iv*iv)*t_years) / (iv*math.sqrt(t_years))
-    return _ndtr(d1) if side == "CALL" else _ndtr(d1) - 1.0
+def add_greeks(df: pd.DataFrame, spot: float, t_years: float, rate: float = 0.0) -> pd.DataFrame:
+    """
+    يضيف iv/delta/gamma/theta/vega لسلسلة كاملة في تمريرة متجهة واحدة.
+    t_years رقم واحد أو مصفوفة بطول السلسلة.
+    الصفوف بلا IV صالح من المصدر يُحل لها IV من منتصف السعر (أو آخر سعر).
+    """
+    is_call = (df["side"] == "CALL").to_numpy()
+    t = np.broadcast_to(np.asarray(t_years, dtype=float), is_call.shape)  # زمن لكل صف (سلسلة بعدة انتهاءات)
+    strike = df["strike"].to_numpy(dtype=float)
+    iv = df["iv"].to_numpy(dtype=float, copy=True)
+    missing = ~(iv >= _MIN_IV)
+    if missing.any():
+        mid = ((df["bid"] + df["ask"]) / 2.0).to_numpy(dtype=float)
+        if "lastprice" in df:
+            last = df["lastprice"].to_numpy(dtype=float)
+            mid = np.where(mid > 0, mid, last)
+        solved = implied_vol(mid[missing], spot, strike[missing], t[missing], rate, is_call[missing])
+        iv[missing] = np.where(np.isfinite(solved) & (solved >= _MIN_IV), solved, _DEF_IV)
+    g = bs_greeks(spot, strike, t, iv, rate, is_call)
+    df["iv"] = iv
+    df["delta"] = np.abs(g["delta"])
+    df["gamma"] = g["gamma"]
+    df["theta"] = g["theta"]
+    df["vega"] = g["vega"]
+    return df
 
 class YFinanceOptionsProvider:
+    """
+    كل تحديث: سعر الأصل مرة واحدة وسلاسل انتهاءات TENORS بالتوازي في مجمع المزوّدين
+    (زمن التحديث ≈ أبطأ طلب لا مجموعها) على Ticker اليوم. قائمة الانتهاءات تُجلب مرة في اليوم،
+    والطلبات المتزامنة تشترك في تحديث واحد. الانتهاء الذي يفشل جلبه يغيب وحده عن النتيجة.
+    """
     def __init__(self, underlying: str = None):
         self.underlying = underlying or CFG.get("OPTIONS_UNDERLYING", "SPY")
 
-    def _pick_same_day_expiry(self, tk: yf.Ticker) -> str:
-        opts = tk.options or []
-        if not opts:
-            return ""
-        today_ny = datetime.now(NY).date()
-        same = [d for d in opts if d == today_ny.isoformat()]
-        if same:
-            return same[0]
-        for d in opts:
-            try:
-                if datetime.fromisoformat(d).date() >= today_ny:
-                    return d
-            except Exception:
-                continue
-        return opts[0] if opts else ""
-
-    def options_chain_df(self) -> pd.DataFrame:
-        tk = yf.Ticker(self.underlying)
-        expiry = self._pick_same_day_expiry(tk)
-        if not expiry:
-            return pd.DataFrame()
+    def _ticker(self, today) -> yf.Ticker:
+        hit = _TICKERS.get(self.underlying)
+        if hit is None or hit[0] != today:
+            hit = _TICKERS[self.underlying] = (today, yf.Ticker(self.underlying))
+        return hit[1]
+
+    def list_expiries(self, tk: yf.Ticker) -> tuple:
+        return tuple(tk.options)
+
+    async def expiries_async(self, tk: yf.Ticker, today) -> tuple:
+        """تواريخ YYYY-MM-DD — من الكاش اليومي، وإلا جلب واحد."""
+        hit = _EXPIRIES.get(self.underlying)
+        if hit is not None and hit[0] == today:
+            return hit[1]
+        exp = await run_blocking("yfinance", self.list_expiries, tk)
+        if exp:
+            _EXPIRIES[self.underlying] = (today, exp)
+        return exp
+
+    def chain(self, tk: yf.Ticker, expiry: str) -> pd.DataFrame:
+        """سلسلة انتهاء واحد (CALL+PUT) قبل الإغريقيات."""
         chain = tk.option_chain(expiry)
-        calls = chain.calls.copy()
-        puts = chain.puts.copy()
-        spot = tk.fast_info.get("last_price")
-        if spot is None:
-            hist = tk.history(period="1d")
-            if hist.empty:
-                return pd.DataFrame()
-            spot = float(hist["Close"].iloc[-1])
 
         def prep(df, side):
             if df is None or df.empty:
@@ -66,26 +125,75 @@ class YFinanceOptionsProvider:
             df["volume"] = df.get("volume", 0).fillna(0).astype(int)
             df["oi"] = df.get("openinterest", 0).fillna(0).astype(int)
             df["strike"] = df.get("strike").astype(float)
-
-            now = datetime.now(NY)
-            mkt_close = now.replace(hour=16, minute=0, second=0, microsecond=0)
-            if now > mkt_close:
-                mkt_close = now + timedelta(hours=6)
-            t_years = max((mkt_close - now).total_seconds(), 60.0) / (365.0*24*3600)
-
-            iv = df.get("impliedvolatility")
-            iv = iv.fillna(0.25).astype(float) if iv is not None else pd.Series([0.25]*len(df))
-            df["delta"] = [abs(_bs_delta(spot, k, t_years, max(v, 0.01), 0.0, side)) for k, v in zip(df["strike"], iv)]
+            df["iv"] = df["impliedvolatility"].astype(float) if "impliedvolatility" in df else np.nan
             df = df[(df["ask"] >= df["bid"]) & (df["ask"] > 0)]
-            return df[["symbol","strike","side","delta","bid","ask","volume","oi","expiry"]]
+            return df
 
-        out = pd.concat([prep(calls, "CALL"), prep(puts, "PUT")], ignore_index=True)
-        return out
+        return pd.concat([prep(chain.calls, "CALL"), prep(chain.puts, "PUT")], ignore_index=True)
 
-    def spot_price(self) -> float:
-        tk = yf.Ticker(self.underlying)
+    def spot_price(self, tk: yf.Ticker = None) -> float:
+        tk = tk or yf.Ticker(self.underlying)
         p = tk.fast_info.get("last_price")
         if p:
             return float(p)
         h = tk.history(period="1d").tail(1)
         return float(h["Close"].iloc[-1]) if not h.empty else float("nan")
+
+    async def chain_async(self, tenors=TENORS):
+        """
+        (سلسلة مجمّعة لكل الانتهاءات، spot، {tenor: expiry}). السلسلة فارغة إن تعذّر الجلب.
+        """
+        key = (self.underlying, tuple(tenors))
+        task = _INFLIGHT.get(key)
+        if task is None:
+            task = _INFLIGHT[key] = asyncio.ensure_future(self._refresh(tenors))
+            task.add_done_callback(lambda _: _INFLIGHT.pop(key, None))
+        # shield: إلغاء أحد المنتظرين لا يلغي الجلب المشترك
+        return await asyncio.shield(task)
+
+    async def _refresh(self, tenors):
+        empty = (pd.DataFrame(), float("nan"), {})
+        today = datetime.now(NY).date()
+        tk = self._ticker(today)
+        try:
+            exp = await self.expiries_async(tk, today)
+        except Exception as e:
+            log.warning("%s expiries unavailable: %r", self.underlying, e)
+            return empty
+        picks = {t: e for t, e in pick_expiries(exp, today).items() if t in tenors}
+        if not picks:
+            return empty
+        wanted = sorted(set(picks.values()))
+        # فشل انتهاء واحد (مثلاً الأسبوعي) يُسقطه وحده؛ فشل سعر الأصل يُسقط التحديث (لا إغريقيات بدونه)
+        spot, *chains = await asyncio.gather(
+            run_blocking("yfinance", self.spot_price),
+            *(run_blocking("yfinance", self.chain, tk, e) for e in wanted),
+            return_exceptions=True,
+        )
+        failed = set()
+        for e, c in zip(wanted, chains):
+            if isinstance(c, Exception):
+                log.warning("%s chain %s unavailable: %r", self.underlying, e, c)
+                failed.add(e)
+        if isinstance(spot, Exception):
+            log.warning("%s spot unavailable: %r", self.underlying, spot)
+            return empty
+        chains = [c for c in chains if not isinstance(c, Exception)]
+        picks = {t: e for t, e in picks.items() if e not in failed}
+        if not chains:
+            return empty
+        # الإغريقيات وكتابة السجل حساب CPU: خارج حلقة الأحداث
+        out = await asyncio.to_thread(self._finish, chains, spot)
+        return (out, spot, picks) if not out.empty else empty
+
+    def _finish(self, chains: list, spot: float) -> pd.DataFrame:
+        out = pd.concat(chains, ignore_index=True)
+        if out.empty or not np.isfinite(spot):
+            return pd.DataFrame()
+        t_years = out["expiry"].map({e: _years_to_close(e) for e in out["expiry"].unique()}).to_numpy(dtype=float)
+        out = add_greeks(out, float(spot), t_years)
+        out = out[["symbol","strike","side","delta","bid","ask","volume","oi","expiry",
+                   "iv","gamma","theta","vega"]]
+        if CFG["CHAIN_HISTORY"]:
+            CHAIN_STORE.append(out, float(spot))
+        return out
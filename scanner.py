@@ -0,0 +1,72 @@
+"""
+ماسح عدة أصول: إغلاقات 1m لكل الرموز في مصفوفة واحدة (صف لكل دقيقة مشتركة، عمود لكل رمز)،
+و RSI/MACD/الانحياز/الأهداف محسوبة لكل الأعمدة معاً بعمليات متجهة — بدل compute_setup لكل سلسلة.
+- الجلب: طلب yf.download مجمّع واحد لكل الرموز (نفس PriceProvider._sync_batch: قاطع الدائرة،
+  الجلب التزايدي، والدمج في BAR_STORE).
+- المحاذاة: الطوابع المشتركة فقط (كما في get_aligned)؛ الرمز بلا شموع كافية يُستبعد بدل إفراغ المصفوفة.
+- القوة: z لهستوغرام MACD (بانحراف العمود نفسه، فتُقارن أصول بتقلبات مختلفة) + بُعد RSI عن 50.
+"""
+import numpy as np
+import pandas as pd
+
+from config import CFG
+from bar_store import BAR_STORE
+from data_providers import TZ, PriceProvider
+from executor import run_blocking
+from indicators import rsi, macd
+
+_MIN_BARS = 50  # نفس حد compute_setup
+
+async def fetch_closes(symbols: list, bars: int) -> pd.DataFrame:
+    """إطار (دقائق × رموز) لآخر bars دقيقة مشتركة. الرموز غير المتاحة لا تظهر كأعمدة."""
+    await run_blocking("yfinance", PriceProvider()._sync_batch, list(symbols), "1m")
+    cols = {}
+    for sym in symbols:
+        f = BAR_STORE.frame(sym, "1m", tail=bars * 3, tz=TZ)
+        if len(f) >= _MIN_BARS:
+            cols[sym] = f["Close"]
+    if not cols:
+        return pd.DataFrame()
+    return pd.concat(cols, axis=1, join="inner").dropna().tail(bars)
+
+def scan(closes: pd.DataFrame) -> pd.DataFrame:
+    """صف لكل رمز: السعر، RSI، MACD، الانحياز، الأهداف/الوقف، والقوة — مرتب حسب |القوة| تنازلياً."""
+    if len(closes) < _MIN_BARS:
+        return pd.DataFrame()
+    r = rsi(closes)
+    m, s, h = macd(closes)
+    price = closes.to_numpy(dtype=float)[-1]
+    r_last = r.to_numpy(dtype=float)[-1]
+    m_last, s_last = m.to_numpy(dtype=float)[-1], s.to_numpy(dtype=float)[-1]
+    hist = h.to_numpy(dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = hist[-1] / np.nanstd(hist, axis=0)
+    z = np.nan_to_num(z)
+
+    sig = CFG["SIGNAL"]
+    bull = (m_last > s_last) & (r_last > sig["rsi_bull"])
+    bear = (m_last < s_last) & (r_last < sig["rsi_bear"])
+    direction = np.where(bull, 1, np.where(bear, -1, 0))
+    # الأهداف باتجاه الانحياز (مرآة للهابط كما في backtest)، والمحايد كالصاعد كما في compute_setup
+    d = np.where(direction < 0, -1.0, 1.0)[:, None]
+    risk = CFG["RISK"]
+    targets = price[:, None] * (1 + d * np.array([risk["t1"], risk["t2"], risk["t3"]]))
+    stop = price * (1 - d[:, 0] * risk["stop"])
+
+    out = pd.DataFrame({
+        "price": price, "rsi": r_last, "macd": m_last, "signal": s_last, "hist_z": z,
+        "bias": np.where(bull, "صاعد", np.where(bear, "هابط", "محايد")),
+        "t1": targets[:, 0], "t2": targets[:, 1], "t3": targets[:, 2], "stop": stop,
+        "strength": z + (np.nan_to_num(r_last, nan=50.0) - 50) / 10,
+    }, index=closes.columns)
+    out.attrs["ts"] = closes.index[-1]
+    return out.iloc[np.argsort(-out["strength"].abs().to_numpy(), kind="stable")]
+
+def format_scan(res: pd.DataFrame, top: int = None) -> str:
+    rows = res.head(top) if top else res
+    lines = [f"🔎 مسح {len(res)} أصول — آخر شمعة {res.attrs['ts']:%H:%M} (الأقوى أولاً):"]
+    arrow = {"صاعد": "🟢", "هابط": "🔴", "محايد": "⚪"}
+    for sym, x in rows.iterrows():
+        lines.append(f"{arrow[x['bias']]} {sym}: {x['price']:.2f} | قوة {x['strength']:+.2f} | "
+                     f"RSI {x['rsi']:.0f} | T1 {x['t1']:.2f} | SL {x['stop']:.2f}")
+    return "\n".join(lines)
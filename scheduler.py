@@ -0,0 +1,48 @@
+"""
+جدولة تحديث البيانات مسبقاً عبر JobQueue في python-telegram-bot.
+الفترات من CFG["INTERVALS"]: fast للأسعار، med للخيارات، slow للأخبار، chart لشارت الساعة.
+التحديث يتم خلال ساعات السوق فقط، مع تعبئة أولية مرة واحدة (بيانات آخر جلسة) عند الإقلاع.
+"""
+import logging
+from telegram.ext import Application, ContextTypes
+
+from config import CFG
+from metrics import CURRENT
+from utils import market_open_now_riyadh
+
+log = logging.getLogger(__name__)
+
+def _gated(name: str, refresh):
+    warmed = False
+
+    async def job(ctx: ContextTypes.DEFAULT_TYPE):
+        nonlocal warmed
+        if warmed and not market_open_now_riyadh():
+            return
+        # أزمنة المراحل داخل التحديث تُنسب إلى refresh:<name> لا إلى الأوامر
+        token = CURRENT.set(f"refresh:{name}")
+        try:
+            await refresh()
+            warmed = True
+        except Exception:
+            log.exception("refresh job %s failed", name)
+        finally:
+            CURRENT.reset(token)
+    return job
+
+def install_refresh_jobs(application: Application, jobs: dict):
+    """
+    jobs: {اسم الفترة في INTERVALS: دالة async بلا معاملات}
+    تُنفّذ أول مرة مباشرة بعد الإقلاع بفارق بسيط بينها لتوزيع الحمل.
+    """
+    jq = application.job_queue
+    if jq is None:
+        log.warning("JobQueue غير متاح — ثبّت python-telegram-bot[job-queue] لتفعيل التحديث المسبق")
+        return
+    for i, (interval_key, refresh) in enumerate(jobs.items()):
+        jq.run_repeating(
+            _gated(interval_key, refresh),
+            interval=CFG["INTERVALS"][interval_key],
+            first=1 + 2 * i,
+            name=f"refresh:{interval_key}",
+        )
@@ -0,0 +1,138 @@
+"""
+لقطة دافئة لحالة السوق في الذاكرة تُكتب دورياً وتُستعاد عند الإقلاع، فيُجاب أول /status بعد
+إعادة التشغيل أو النشر من الحالة المحلية بدل جلب بارد.
+- المحتوى: مدخلات STATE (الإعداد مع شموع 1m وفريماتها، آخر سلسلة خيارات، الأخبار، المسح، الشارت)،
+  حالة المؤشرات التراكمية، محرك التنبيهات (فلا يتكرر آخر تنبيه بعد الإقلاع)،
+  والردود الجاهزة (file_id الشارت).
+- pickle مضغوط بـ zlib، والكتابة ذرية (ملف مؤقت ثم os.replace).
+- الالتقاط على حلقة الأحداث (لا تتغير الكائنات أثناءه)، والضغط والكتابة في خيط.
+- الاستعادة ترفض اللقطة كاملة إن اختلفت الصيغة، أو بصمة كود الوحدات التي تعرّف الكائنات المحفوظة
+  (_CODE_MODULES: أي نشر يغيّرها يبدأ بارداً)، أو إصدارات pandas و numpy، أو تعذّرت قراءتها، أو كانت
+  أقدم من max_age (أو max_age_closed والسوق مغلق: بيانات آخر جلسة لا تتغير)؛ وكذلك كل مدخل أقدم من الحد.
+  المدخلات المقبولة تُعلَّم حديثة فتخدم الأوامر إلى أن تستبدلها أول دورة تحديث بعد الإقلاع،
+  لكنها تُكتب في اللقطات التالية بوقتها الأصلي فلا تتجدد عبر إعادات التشغيل المتتالية.
+- شموع 1m تُدمج أيضاً في BAR_STORE (إن فُقد DATA_DIR) ليبقى الجلب التالي تزايدياً.
+"""
+import asyncio
+import functools
+import hashlib
+import importlib.util
+import logging
+import os
+import pickle
+import time
+import zlib
+import numpy as np
+import pandas as pd
+
+import market
+from bar_store import BAR_STORE
+from config import CFG
+from state import STATE, RESPONSES
+from utils import market_open_now_riyadh
+
+log = logging.getLogger(__name__)
+
+FORMAT = 3  # تخطيط الملف نفسه؛ تغيّر الكائنات المحفوظة يغطيه _code_hash
+# الوحدات التي تعرّف الكائنات المحفوظة أو تبني قيم STATE/RESPONSES: أي تعديل فيها (نشر جديد) يُبطل اللقطة
+_CODE_MODULES = ("indicators", "timeframes", "alerts", "options", "options_provider", "scanner",
+                 "data_providers", "market", "state", "bot", "snapshot")
+_RESTORED = {}  # key -> (وقت التحديث الأصلي، القيمة المستعادة)
+STATS = {"saves": 0, "bytes": 0, "save_ms": 0.0, "restored": 0, "restore_ms": 0.0, "age_s": 0.0}
+
+@functools.lru_cache(maxsize=1)
+def _code_hash() -> str:
+    h = hashlib.sha256()
+    for name in _CODE_MODULES:
+        spec = importlib.util.find_spec(name)
+        with open(spec.origin, "rb") as f:
+            h.update(name.encode() + b"\0" + f.read())
+    return h.hexdigest()[:16]
+
+def _versions() -> tuple:
+    return (FORMAT, _code_hash(), pd.__version__, np.__version__)
+
+def capture() -> bytes:
+    state = STATE.items()
+    for key, (ts, value) in _RESTORED.items():
+        if key in state and state[key][1] is value:
+            state[key] = (ts, value)
+    return pickle.dumps({
+        "versions": _versions(),
+        "saved_at": time.time(),
+        "state": state,
+        "indicators": market.INDICATORS,
+        "alerts": market.ALERTS,
+        "responses": RESPONSES.items(),
+    }, protocol=pickle.HIGHEST_PROTOCOL)
+
+def write(path: str, raw: bytes) -> int:
+    blob = zlib.compress(raw, 1)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(blob)
+
+async def save(path: str = None) -> int:
+    """يلتقط الحالة ويكتبها ذرياً؛ يعيد حجم الملف بالبايت (0 إن لم يكن هناك ما يُحفظ)."""
+    if not STATE.keys():
+        return 0  # إقلاع بلا بيانات بعد: لا نستبدل لقطة سابقة صالحة بلقطة فارغة
+    t0 = time.perf_counter()
+    size = await asyncio.to_thread(write, path or CFG["SNAPSHOT"]["path"], capture())
+    STATS.update(saves=STATS["saves"] + 1, bytes=size, save_ms=(time.perf_counter() - t0) * 1000)
+    return size
+
+def load(path: str = None):
+    path = path or CFG["SNAPSHOT"]["path"]
+    try:
+        with open(path, "rb") as f:
+            data = pickle.loads(zlib.decompress(f.read()))
+    except FileNotFoundError:
+        return None
+    except Exception as e:  # لقطة تالفة أو من إصدار كود مختلف: نبدأ بارداً
+        log.warning("snapshot %s unreadable: %s", path, e)
+        return None
+    if data.get("versions") != _versions():
+        log.info("snapshot %s ignored: format/code/library versions changed", path)
+        return None
+    return data
+
+def restore(data: dict, now: float = None) -> int:
+    """يعيد عدد مدخلات STATE المستعادة (0 إن كانت اللقطة قديمة)."""
+    now = time.time() if now is None else now
+    cfg = CFG["SNAPSHOT"]
+    limit = cfg["max_age"] if market_open_now_riyadh() else cfg["max_age_closed"]
+    STATS["age_s"] = now - data["saved_at"]
+    if STATS["age_s"] > limit:
+        log.info("snapshot is %.0f s old (limit %.0f s) — starting cold", STATS["age_s"], limit)
+        return 0
+
+    n = 0
+    for key, (ts, value) in data["state"].items():
+        if now - ts <= limit:
+            STATE.put(key, value)
+            _RESTORED[key] = (ts, value)
+            n += 1
+    setup = data["state"].get("setup")
+    if setup is not None:
+        df = setup[1][0].get("1m")
+        if df is not None and not df.empty:
+            BAR_STORE.merge(df.attrs.get("source", market.INDEX_SYMBOL), "1m", df)
+    market.INDICATORS = data["indicators"]
+    market.ALERTS = data["alerts"]
+    for key, value in data["responses"]:
+        RESPONSES.put(key, value)
+    return n
+
+def restore_file(path: str = None) -> int:
+    t0 = time.perf_counter()
+    data = load(path)
+    n = restore(data) if data is not None else 0
+    STATS.update(restored=n, restore_ms=(time.perf_counter() - t0) * 1000)
+    if n:
+        log.info("snapshot restored: %d entries, %.0f s old, %.0f ms", n, STATS["age_s"], STATS["restore_ms"])
+    return n
@@ -0,0 +1,79 @@
+"""
+حالة السوق المحسوبة مسبقاً في الذاكرة (أسعار/إعداد/خيارات/أخبار/شارت).
+تملؤها مهام الجدولة، وتقرأ منها الأوامر إن كانت حديثة بما يكفي.
+RESPONSES: ردود جاهزة مفتاحها (الأمر، طابع آخر شمعة، إعدادات RISK) — نص /status و file_id شارت /chart.
+"""
+import time
+from collections import OrderedDict
+
+class MarketState:
+    def __init__(self):
+        self._items = {}  # key -> (updated_at, value)
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, key, value, ts: float = None):
+        self._items[key] = (time.time() if ts is None else ts, value)
+
+    def get(self, key, max_age: float = None):
+        """القيمة إن وُجدت وكان عمرها <= max_age ثانية (None = بلا حد)، وإلا None."""
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        ts, value = item
+        if max_age is not None and time.time() - ts > max_age:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def keys(self):
+        return list(self._items)
+
+    def items(self) -> dict:
+        """{key: (updated_at, value)} — نسخة سطحية (لـ snapshot)."""
+        return dict(self._items)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0, "entries": len(self._items)}
+
+STATE = MarketState()
+
+class ResponseMemo:
+    """LRU صغير: القيمة صالحة ما دامت الشمعة نفسها، فلا حاجة لمهلة؛ الشموع الأقدم تُطرد تلقائياً."""
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self._items.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def discard(self, key):
+        self._items.pop(key, None)
+
+    def items(self) -> list:
+        return list(self._items.items())
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0, "entries": len(self._items)}
+
+RESPONSES = ResponseMemo()
@@ -0,0 +1,47 @@
+"""
+قائمة المحادثات المشتركة في التنبيهات — خفيفة (بدون pandas) لتعمل أوامر الاشتراك فور الإقلاع.
+"""
+import json
+import os
+
+from config import CFG
+
+class Subscriptions:
+    """قائمة المحادثات المشتركة — تُحفظ في DATA_DIR/subscribers.json."""
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(CFG["DATA_DIR"], "subscribers.json")
+        self._ids = set()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._ids = set(int(x) for x in json.load(f))
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(sorted(self._ids), f)
+        os.replace(tmp, self.path)
+
+    def add(self, chat_id: int) -> bool:
+        if chat_id in self._ids:
+            return False
+        self._ids.add(chat_id)
+        self._save()
+        return True
+
+    def remove(self, chat_id: int) -> bool:
+        if chat_id not in self._ids:
+            return False
+        self._ids.discard(chat_id)
+        self._save()
+        return True
+
+    def all(self) -> list:
+        return sorted(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+SUBSCRIBERS = Subscriptions()
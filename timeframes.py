@@ -0,0 +1,65 @@
+"""
+فريمات متتالية: 1m → 5m → 15m → 1h بتجميعات NumPy (reduceat) في تمريرة واحدة.
+
+- كل فريم يُبنى من الفريم الأصغر منه مباشرة (5m من 1m، 15m من 5m، 1h من 15m).
+- الحدود بتوقيت الجدار المحلي (مثل resample على فهرس tz-aware).
+- يُعاد البناء كاملاً مع كل استدعاء: تحديث الشمعة المفتوحة فقط لم يوفّر شيئاً يُذكر في
+  bench (بناء إطارات pandas هو الكلفة الغالبة لا التجميع)، والإطارات الناتجة مستقلة
+  فلا تتغير تحت STATE أو الذاكرة المؤقتة التي تحتفظ بها.
+"""
+import numpy as np
+import pandas as pd
+
+_MIN = 60 * 10**9
+# (الفريم، الفريم الأصغر المصدر، عرض الشمعة بالنانوثانية)
+CASCADE = (("5m", "1m", 5 * _MIN), ("15m", "5m", 15 * _MIN), ("1h", "15m", 60 * _MIN))
+_FIELDS = ("ts", "key", "Open", "High", "Low", "Close", "Volume")
+_OHLCV = ("Open", "High", "Low", "Close", "Volume")
+
+def _columns(df: pd.DataFrame) -> dict:
+    """أعمدة NumPy لإطار 1m مع إسقاط الإغلاق المفقود؛ key = الطابع بتوقيت الجدار المحلي."""
+    idx = df.index
+    out = {
+        "ts": idx.asi8,
+        "key": idx.tz_localize(None).asi8 if idx.tz is not None else idx.asi8,
+        **{c: df[c].to_numpy(dtype=np.float64) for c in _OHLCV},
+    }
+    ok = ~np.isnan(out["Close"])
+    return out if ok.all() else {f: a[ok] for f, a in out.items()}
+
+def _group(src: dict, width: int) -> dict:
+    """يجمع أعمدة فريم أصغر إلى شموع بعرض width (حسب key المحلي)."""
+    key = src["key"] // width * width
+    if not len(key):
+        return {f: np.empty(0, dtype=np.int64 if f in ("ts", "key") else np.float64) for f in _FIELDS}
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    ends = np.r_[starts[1:], len(key)] - 1
+    return {
+        # طابع UTC لبداية الشمعة = طابع أول شمعة فرعية مطروحاً منه إزاحتها عن بداية الحاوية
+        "ts": src["ts"][starts] - (src["key"][starts] - key[starts]),
+        "key": key[starts],
+        "Open": src["Open"][starts],
+        "High": np.maximum.reduceat(src["High"], starts),
+        "Low": np.minimum.reduceat(src["Low"], starts),
+        "Close": src["Close"][ends],
+        "Volume": np.add.reduceat(src["Volume"], starts),
+    }
+
+def _frame(cols: dict, tz) -> pd.DataFrame:
+    if not len(cols["ts"]):
+        return pd.DataFrame()
+    index = pd.DatetimeIndex(cols["ts"], tz="UTC")
+    if tz is not None:
+        index = index.tz_convert(tz)
+    return pd.DataFrame(np.column_stack([cols[c] for c in _OHLCV]), index=index, columns=list(_OHLCV))
+
+def cascade(df_1m: pd.DataFrame) -> dict:
+    """{5m/15m/1h: إطار OHLCV} من إطار 1m؛ كل فريم يبدأ من الحاوية التي تضم أول شمعة 1m."""
+    if df_1m is None or df_1m.empty:
+        return {tf: pd.DataFrame() for tf, _, _ in CASCADE}
+    bars = {"1m": _columns(df_1m)}
+    out = {}
+    for tf, child, width in CASCADE:
+        bars[tf] = _group(bars[child], width)
+        out[tf] = _frame(bars[tf], df_1m.index.tz)
+    return out
@@ -6,3 +6,14 @@ TZ = ZoneInfo(CFG["TZ"])
 
 def now_local():
     return datetime.now(TZ)
+
+def market_open_now_riyadh() -> bool:
+    """
+    تقدير بسيط لساعات السوق الأمريكي بتوقيت الرياض:
+    الإثنين-الجمعة 16:30–23:00 (قد يتأثر بالتوقيت الصيفي، لكنها كافية للتنبيه).
+    """
+    now = now_local()
+    if now.weekday() >= 5:  # 5=السبت, 6=الأحد
+        return False
+    hm = now.hour * 100 + now.minute
+    return 1630 <= hm <= 2305
@@ -0,0 +1,106 @@
+"""
+خادم aiohttp مدمج واحد للبوت:
+- GET /healthz: حالة البوت (JSON) لفحوص المنصة.
+- GET /metrics: نص Prometheus (METRICS).
+- POST WEBHOOK_PATH: تحديثات تيليجرام في وضع الـ webhook (بدل الاستطلاع الطويل).
+  التحديث يُتحقق من سرّه ثم يوضع في update_queue ويُرد 200 فوراً؛ المعالجة متوازية حسب concurrent_updates.
+"""
+import asyncio
+import json
+import logging
+import signal
+import time
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+from metrics import METRICS
+
+log = logging.getLogger(__name__)
+
+_SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+def web_app(application: Application, webhook_path: str = "", secret: str = "", status=None) -> web.Application:
+    """status(): dict إضافي يُدمج في /healthz."""
+    started = time.monotonic()
+
+    async def health(request):
+        body = {
+            "ok": True,
+            "mode": "webhook" if webhook_path else "polling",
+            "uptime_s": round(time.monotonic() - started, 1),
+            "running": application.running,
+            "pending_updates": application.update_queue.qsize(),
+        }
+        if status is not None:
+            body.update(status())
+        return web.json_response(body)
+
+    async def metrics(request):
+        return web.Response(body=METRICS.prometheus().encode(),
+                            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    async def update(request):
+        if secret and request.headers.get(_SECRET_HEADER) != secret:
+            return web.Response(status=403)
+        try:
+            data = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return web.Response(status=400)
+        METRICS.inc("webhook_updates_total")
+        await application.update_queue.put(Update.de_json(data, application.bot))
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_get("/healthz", health)
+    app.router.add_get("/metrics", metrics)
+    if webhook_path:
+        app.router.add_post(webhook_path, update)
+    return app
+
+async def start(app: web.Application, host: str, port: int) -> web.AppRunner:
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+async def serve(application: Application, cfg: dict, allowed_updates: list, status=None,
+                stop: asyncio.Event = None):
+    """
+    نفس دورة حياة run_polling: initialize → post_init → start ... stop → shutdown → post_shutdown.
+    يعمل حتى SIGINT/SIGTERM، أو حتى stop إن مُرّر (للتشغيل داخل حلقة قائمة كما في bench.loadtest).
+    """
+    path = cfg["path"]
+    if stop is None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+    await application.initialize()
+    runner = None
+    try:
+        if application.post_init:
+            await application.post_init(application)
+        runner = await start(web_app(application, path, cfg["secret"], status), cfg["host"], cfg["port"])
+        await application.bot.set_webhook(
+            url=cfg["url"].rstrip("/") + path,
+            allowed_updates=allowed_updates,
+            secret_token=cfg["secret"] or None,
+            max_connections=cfg["max_connections"],
+        )
+        await application.start()
+        log.info("webhook mode: listening on %s:%s%s", cfg["host"], cfg["port"], path)
+        await stop.wait()
+    finally:
+        if application.running:
+            await application.stop()
+        if runner is not None:
+            await runner.cleanup()
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+def run_webhook(application: Application, cfg: dict, allowed_updates: list, status=None):
+    """بديل application.run_webhook (الذي يتطلب tornado) على خادم aiohttp المشترك."""
+    asyncio.run(serve(application, cfg, allowed_updates, status))